@@ -5,7 +5,7 @@ import os
 hidden_imports = [
     'imaging', 'workers', 'ui_helpers', 'catalog', 'export_dialog', 
     'cropper', 'curve_widget', 'histogram_widget', 'library_view', 
-    'cache_manager', 'rawpy', 'exifread'
+    'cache_manager', 'pyramid', 'image_store', 'rawfile', 'exiftool_service', 'decode_pool', 'decode_scheduler', 'prefetch', 'fused_pipeline', 'tile_engine', 'lut3d', 'denoise', 'grain', 'masks', 'stage_cache', 'precision', 'image_writers', 'export_engine', 'render_scale', 'jpeg_size', 'export_manifest', 'rawpy', 'exifread'
 ]
 hidden_imports += collect_submodules('scipy')
 
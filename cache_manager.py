@@ -3,10 +3,23 @@ Preview Cache Manager
 
 Handles disk-based caching of decoded preview images and thumbnails
 to speed up subsequent application launches.
+
+Cache files are stored uncompressed so they can be opened with
+``np.memmap`` without inflating or copying the pixel data. Each file is:
+
+    [ fixed 4096-byte header ][ array 0 ][ array 1 ] ...
+
+The header starts with a packed struct (magic, format version, pipeline
+version, source mtime, source size, table length) followed by a small JSON
+table describing every stored array (offset, shape, dtype). Arrays are
+aligned to 4096 bytes so each one can be mapped independently.
 """
 
 import os
+import json
+import struct
 import hashlib
+import threading
 import numpy as np
 from pathlib import Path
 import time
@@ -15,116 +28,226 @@ import time
 CACHE_DIR = Path.home() / ".ninlab_cache" / "previews"
 CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
-def get_cache_key(file_path):
-    """Generate cache key from file path using MD5 hash"""
-    return hashlib.md5(str(file_path).encode('utf-8')).hexdigest()
+CACHE_EXT = ".nlc"
+LEGACY_EXT = ".npz"
+
+CACHE_MAGIC = b"NLCACHE\x00"
+FORMAT_VERSION = 2
+# Bump when decode_image output changes (orientation, demosaic params, ...)
+# so stale pixels are never served from an older build's cache.
+PIPELINE_VERSION = 3
 
-def get_cache_path(file_path):
-    """Get the cache file path for a given source file"""
-    cache_key = get_cache_key(file_path)
-    return CACHE_DIR / f"{cache_key}.npz"
+HEADER_SIZE = 4096
+ALIGN = 4096
+_HEADER_STRUCT = struct.Struct("<8sIIdQI")  # magic, fmt ver, pipeline ver, mtime, size, table len
+
+
+def get_cache_key(file_path, variant=None):
+    """Generate cache key from file path (and optional variant name) using MD5 hash"""
+    key = str(file_path) if not variant else f"{file_path}|{variant}"
+    return hashlib.md5(key.encode('utf-8')).hexdigest()
+
+def get_cache_path(file_path, variant=None):
+    """
+    Get the cache file path for a given source file.
+
+    ``variant`` keeps alternative renderings of the same source apart, e.g.
+    the embedded-JPEG proxy of a RAW ("proxy") next to its real decode.
+    """
+    cache_key = get_cache_key(file_path, variant)
+    return CACHE_DIR / f"{cache_key}{CACHE_EXT}"
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+def read_header(cache_path):
+    """
+    Read and validate the fixed header of a cache file.
+
+    Returns:
+        dict with 'pipeline_version', 'mtime', 'size' and 'arrays' (the entry
+        table), or None if the file is missing or not a valid cache file.
+    """
+    try:
+        with open(cache_path, "rb") as f:
+            raw = f.read(HEADER_SIZE)
+    except OSError:
+        return None
+
+    if len(raw) < HEADER_SIZE:
+        return None
+
+    magic, fmt_ver, pipe_ver, mtime, size, table_len = _HEADER_STRUCT.unpack_from(raw, 0)
+    if magic != CACHE_MAGIC or fmt_ver != FORMAT_VERSION:
+        return None
+
+    start = _HEADER_STRUCT.size
+    if table_len > HEADER_SIZE - start:
+        return None
+    try:
+        table = json.loads(raw[start:start + table_len].decode("utf-8"))
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+    return {"pipeline_version": pipe_ver, "mtime": mtime, "size": size, "arrays": table}
 
 def is_cache_valid(file_path, cache_path):
     """
-    Check if cache is valid by comparing modification times
-    Returns True if cache exists and is newer than source file
+    Check if cache is valid by comparing the source mtime/size and pipeline
+    version recorded in the header with the current source file.
     """
-    if not cache_path.exists():
+    header = read_header(cache_path)
+    if header is None:
         return False
-    
+
     try:
-        source_mtime = os.path.getmtime(file_path)
-        cache_mtime = os.path.getmtime(cache_path)
-        
-        # Cache is valid if it's newer than source
-        return cache_mtime >= source_mtime
+        st = os.stat(file_path)
     except (OSError, FileNotFoundError):
         return False
 
-def save_to_cache(file_path, full_array, thumb_array):
+    return (header["pipeline_version"] == PIPELINE_VERSION
+            and header["mtime"] == st.st_mtime
+            and header["size"] == st.st_size)
+
+def save_to_cache(file_path, full_array, thumb_array, extra_arrays=None, variant=None):
     """
     Save decoded arrays to cache
-    
+
     Args:
         file_path: Path to original image file
-        full_array: Full preview numpy array
+        full_array: Full preview numpy array, or None for a thumbnail-only entry
         thumb_array: Thumbnail numpy array
+        extra_arrays: Optional dict of additional named arrays to store
+        variant: Optional cache variant name (see get_cache_path)
     """
+    tmp_path = None
     try:
-        cache_path = get_cache_path(file_path)
-        
-        # Get source file modification time
-        source_mtime = os.path.getmtime(file_path)
-        
-        # Save arrays with metadata
-        np.savez_compressed(
-            cache_path,
-            full=full_array,
-            thumb=thumb_array,
-            mtime=source_mtime
-        )
-        
-        # Set cache file mtime to match source for easier validation
-        os.utime(cache_path, (source_mtime, source_mtime))
-        
+        cache_path = get_cache_path(file_path, variant)
+        st = os.stat(file_path)
+
+        arrays = {"full": full_array, "thumb": thumb_array}
+        if extra_arrays:
+            arrays.update(extra_arrays)
+
+        # Build entry table with aligned offsets
+        table = {}
+        offset = HEADER_SIZE
+        contiguous = {}
+        for name, arr in arrays.items():
+            if arr is None:
+                continue
+            arr = np.ascontiguousarray(arr)
+            contiguous[name] = arr
+            table[name] = {"offset": offset, "shape": list(arr.shape), "dtype": arr.dtype.str}
+            offset = _align(offset + arr.nbytes)
+
+        table_bytes = json.dumps(table, separators=(",", ":")).encode("utf-8")
+        if _HEADER_STRUCT.size + len(table_bytes) > HEADER_SIZE:
+            raise ValueError("cache entry table does not fit in header")
+
+        header = bytearray(HEADER_SIZE)
+        _HEADER_STRUCT.pack_into(header, 0, CACHE_MAGIC, FORMAT_VERSION, PIPELINE_VERSION,
+                                 st.st_mtime, st.st_size, len(table_bytes))
+        header[_HEADER_STRUCT.size:_HEADER_STRUCT.size + len(table_bytes)] = table_bytes
+
+        # Write to a private temp file and swap in atomically, so readers
+        # never map a half-written file.
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            for name, arr in contiguous.items():
+                f.seek(table[name]["offset"])
+                f.write(arr.data)
+            f.truncate(offset)
+        os.replace(tmp_path, cache_path)
+        tmp_path = None
+
     except Exception as e:
         # Silently fail - cache is optional
         print(f"Cache save failed for {file_path}: {e}")
-        pass
+    finally:
+        if tmp_path is not None:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
 
-def load_from_cache(file_path):
+def load_from_cache(file_path, keys=("full", "thumb"), variant=None):
     """
-    Load cached arrays if valid
-    
+    Load cached arrays if valid.
+
+    Large arrays are returned as read-only ``np.memmap`` views, so pixels are
+    only paged in when touched. The thumbnail is small and copied into memory.
+
+    Args:
+        file_path: Path to original image file
+        keys: Names of the arrays to load, or None for every stored array
+        variant: Optional cache variant name (see get_cache_path)
+
     Returns:
-        dict with 'full' and 'thumb' keys, or None if cache invalid/missing
+        dict with the requested keys, or None if cache invalid/missing
     """
     try:
-        cache_path = get_cache_path(file_path)
-        
-        # Check if cache is valid
-        if not is_cache_valid(file_path, cache_path):
+        cache_path = get_cache_path(file_path, variant)
+        header = read_header(cache_path)
+        if header is None:
             return None
-        
-        # Load cache
-        data = np.load(cache_path)
-        
-        return {
-            'full': data['full'],
-            'thumb': data['thumb']
-        }
-        
+
+        st = os.stat(file_path)
+        if (header["pipeline_version"] != PIPELINE_VERSION
+                or header["mtime"] != st.st_mtime or header["size"] != st.st_size):
+            return None
+
+        table = header["arrays"]
+        if keys is None:
+            keys = list(table.keys())
+        out = {}
+        for key in keys:
+            entry = table.get(key)
+            if entry is None:
+                return None
+            arr = np.memmap(cache_path, dtype=np.dtype(entry["dtype"]), mode="r",
+                            offset=entry["offset"], shape=tuple(entry["shape"]))
+            out[key] = np.array(arr) if key == "thumb" else arr
+        return out
+
     except Exception as e:
         # Cache miss or corrupted - will re-decode
         return None
 
+def _iter_cache_files():
+    for pattern in (f"*{CACHE_EXT}", f"*{LEGACY_EXT}"):
+        yield from CACHE_DIR.glob(pattern)
+
 def clear_old_cache(max_age_days=30):
     """
     Remove cache files older than max_age_days
-    
+
+    Legacy compressed .npz caches are no longer read and are always removed.
+
     Args:
         max_age_days: Maximum age in days before cache is deleted
     """
     try:
         cutoff_time = time.time() - (max_age_days * 24 * 60 * 60)
-        
+
         removed_count = 0
         removed_size = 0
-        
-        for cache_file in CACHE_DIR.glob("*.npz"):
+
+        for cache_file in _iter_cache_files():
             try:
-                if cache_file.stat().st_mtime < cutoff_time:
-                    size = cache_file.stat().st_size
+                stat = cache_file.stat()
+                if cache_file.suffix == LEGACY_EXT or stat.st_mtime < cutoff_time:
                     cache_file.unlink()
                     removed_count += 1
-                    removed_size += size
+                    removed_size += stat.st_size
             except Exception:
                 continue
-        
+
         if removed_count > 0:
             size_mb = removed_size / (1024 * 1024)
             print(f"Cache cleanup: Removed {removed_count} files ({size_mb:.1f} MB)")
-            
+
     except Exception as e:
         print(f"Cache cleanup failed: {e}")
 
@@ -133,14 +256,14 @@ def get_cache_stats():
     try:
         total_size = 0
         file_count = 0
-        
-        for cache_file in CACHE_DIR.glob("*.npz"):
+
+        for cache_file in _iter_cache_files():
             try:
                 total_size += cache_file.stat().st_size
                 file_count += 1
             except Exception:
                 continue
-        
+
         return {
             'file_count': file_count,
             'total_size_mb': total_size / (1024 * 1024),
@@ -88,3 +88,15 @@ def save_global_presets(presets: dict):
     meta = load_projects_meta()
     meta["presets"] = presets
     save_projects_meta(meta)
+
+def load_app_settings():
+    """Load application-wide settings (memory budget, worker counts, ...) from _meta.json"""
+    meta = load_projects_meta()
+    settings = meta.get("settings", {})
+    return settings if isinstance(settings, dict) else {}
+
+def save_app_settings(settings: dict):
+    """Save application-wide settings to _meta.json"""
+    meta = load_projects_meta()
+    meta["settings"] = settings
+    save_projects_meta(meta)
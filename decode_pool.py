@@ -0,0 +1,181 @@
+"""
+Decode Pool
+
+Optional multi-process decode backend. Decoding is largely Python-level
+byte scanning, PIL conversion and NumPy work that holds the GIL, so thread
+workers barely scale past a few cores. Here each decode runs in its own
+process (one per physical core).
+
+Pixels never travel back through pickling: the child writes its result to
+the on-disk preview cache (cache_manager) as it always does, and the parent
+maps it back in with ``np.memmap``. If the cache could not be written (disk
+full, read-only home), the child hands the full image over through
+``multiprocessing.shared_memory`` instead.
+
+DecodeWorker uses this when a pool is passed in; the Qt signal contract is
+unchanged.
+"""
+
+import os
+import sys
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def physical_cores():
+    """Number of physical CPU cores (logical count / 2 as a guess without psutil)."""
+    if psutil is not None:
+        try:
+            n = psutil.cpu_count(logical=False)
+            if n:
+                return n
+        except Exception:
+            pass
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+# ------- child side -------
+def _use_cache_dir(cache_dir):
+    import cache_manager
+    from pathlib import Path
+    if cache_dir and Path(cache_dir) != cache_manager.CACHE_DIR:
+        cache_manager.CACHE_DIR = Path(cache_dir)
+        cache_manager.CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+
+def _share(arr):
+    """Copy an array into a new shared-memory block; the parent unlinks it."""
+    from multiprocessing import shared_memory
+    arr = np.ascontiguousarray(arr)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, arr.nbytes))
+    np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+    desc = {"shm": shm.name, "shape": arr.shape, "dtype": arr.dtype.str}
+    shm.close()
+    return desc
+
+
+def _decode_task(path, thumb_size, proxy, cache_dir):
+    """Runs in a worker process. Returns a small, picklable description."""
+    _use_cache_dir(cache_dir)
+    from imaging import decode_image, decode_proxy
+    from cache_manager import load_from_cache
+
+    if proxy:
+        full, thumb, levels, is_proxy = decode_proxy(path, thumb_size)
+    else:
+        full, thumb, levels = decode_image(path, thumb_size, return_levels=True)
+        is_proxy = False
+    variant = "proxy" if is_proxy else None
+
+    cached = load_from_cache(path, keys=("full",), variant=variant)
+    if cached is not None and cached["full"].shape == full.shape:
+        return {"source": "cache", "variant": variant, "proxy": is_proxy}
+    # Not cached (error image or cache write failed): hand pixels over directly.
+    # Windows destroys a shared-memory block once its creator closes it, so
+    # there the (rare) fallback is a plain pickle.
+    if sys.platform == "win32":
+        return {"source": "inline", "full": np.asarray(full), "thumb": np.asarray(thumb),
+                "proxy": is_proxy}
+    return {"source": "shm", "full": _share(full), "thumb": np.asarray(thumb),
+            "proxy": is_proxy}
+
+
+def _thumb_task(path, thumb_size, cache_dir):
+    _use_cache_dir(cache_dir)
+    from imaging import load_thumbnail
+    from cache_manager import load_from_cache
+
+    thumb = load_thumbnail(path, thumb_size)
+    cached = load_from_cache(path, keys=("thumb",))
+    if cached is not None and cached["thumb"].shape == thumb.shape:
+        return {"source": "cache"}
+    return {"source": "inline", "thumb": thumb}  # thumbnails are small
+
+
+# ------- parent side -------
+def _attach(desc):
+    """Copy a shared-memory array out and release the block."""
+    from multiprocessing import shared_memory
+    shm = shared_memory.SharedMemory(name=desc["shm"])
+    try:
+        arr = np.ndarray(tuple(desc["shape"]), dtype=np.dtype(desc["dtype"]), buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+    return arr
+
+
+class DecodePool:
+    def __init__(self, workers=None):
+        self.workers = int(workers or physical_cores())
+        # spawn: never fork a process that has Qt threads running
+        ctx = multiprocessing.get_context("spawn")
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx)
+
+    def submit_decode(self, path, thumb_size=(256, 170), proxy=False):
+        import cache_manager
+        return self._executor.submit(_decode_task, path, tuple(thumb_size), proxy,
+                                     str(cache_manager.CACHE_DIR))
+
+    def submit_thumb(self, path, thumb_size=(256, 170)):
+        import cache_manager
+        return self._executor.submit(_thumb_task, path, tuple(thumb_size),
+                                     str(cache_manager.CACHE_DIR))
+
+    def decode(self, path, thumb_size=(256, 170), proxy=False):
+        """Blocking decode in a worker process: (full, thumb, levels, is_proxy)."""
+        res = self.submit_decode(path, thumb_size, proxy).result()
+        if res["source"] in ("shm", "inline"):
+            from pyramid import build_pyramid
+            full = _attach(res["full"]) if res["source"] == "shm" else res["full"]
+            return full, res["thumb"], build_pyramid(full), res["proxy"]
+
+        from cache_manager import load_from_cache
+        from pyramid import levels_from_cache
+        cached = load_from_cache(path, keys=None, variant=res["variant"])
+        if cached is None or "full" not in cached:
+            raise RuntimeError(f"decoded image vanished from the cache: {path}")
+        return cached["full"], cached["thumb"], levels_from_cache(cached), res["proxy"]
+
+    def thumbnail(self, path, thumb_size=(256, 170)):
+        """Blocking thumbnail in a worker process."""
+        res = self.submit_thumb(path, thumb_size).result()
+        if res["source"] == "inline":
+            return res["thumb"]
+        from cache_manager import load_from_cache
+        cached = load_from_cache(path, keys=("thumb",))
+        if cached is None:
+            raise RuntimeError(f"thumbnail vanished from the cache: {path}")
+        return cached["thumb"]
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The shared pool, started on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DecodePool()
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
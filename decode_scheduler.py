@@ -0,0 +1,93 @@
+"""
+Decode Scheduler
+
+Priorities and cancellation for thumbnail / full-decode jobs on a
+QThreadPool. Jobs are keyed by (kind, name) so the same image is never
+queued twice; asking again only raises the priority of the queued job.
+
+Re-prioritizing uses ``QThreadPool.tryTake`` + ``start(runnable, priority)``:
+a job that is still queued is pulled out and re-queued at its new
+priority, a job that already runs is left alone. Cancelling takes queued
+jobs out of the pool; results of jobs that were already running are
+ignored by the window because their item is gone.
+
+The pool only needs ``start(runnable, priority)`` and ``tryTake(runnable)``,
+so this module does not import Qt. All methods are meant to be called from
+the GUI thread.
+"""
+
+# Higher runs first (QThreadPool semantics)
+PRIORITY_CURRENT = 30     # image open in Develop
+PRIORITY_NEIGHBOUR = 20   # filmstrip neighbours of the current image
+PRIORITY_VISIBLE = 10     # on screen in the library grid
+PRIORITY_BACKGROUND = 0   # everything else, in submission (catalog) order
+PRIORITY_PREFETCH = -10   # speculative neighbour renders; below every real job
+
+
+class DecodeScheduler:
+    def __init__(self, pool):
+        self.pool = pool
+        self._jobs = {}  # (kind, name) -> [runnable, priority]
+
+    def submit(self, kind, name, runnable, priority=PRIORITY_BACKGROUND):
+        """
+        Queue ``runnable`` unless a job for (kind, name) already exists, in
+        which case that job is re-prioritized instead. Returns True if queued.
+        """
+        key = (kind, name)
+        if key in self._jobs:
+            if priority > self._jobs[key][1]:
+                self._requeue(key, priority)
+            return False
+        # The scheduler owns the runnable until finished(); Qt must not delete
+        # it behind our back or tryTake would touch a dead object.
+        if hasattr(runnable, "setAutoDelete"):
+            runnable.setAutoDelete(False)
+        self._jobs[key] = [runnable, priority]
+        self.pool.start(runnable, priority)
+        return True
+
+    def finished(self, kind, name):
+        """Forget a job once it has emitted done/error."""
+        self._jobs.pop((kind, name), None)
+
+    def reprioritize(self, priority_for, kinds=None):
+        """
+        Re-queue every waiting job whose ``priority_for(name)`` changed.
+        ``kinds`` limits this to those job kinds (default: all).
+        """
+        for key, (_, prio) in list(self._jobs.items()):
+            if kinds is not None and key[0] not in kinds:
+                continue
+            new = priority_for(key[1])
+            if new != prio:
+                self._requeue(key, new)
+
+    def _requeue(self, key, priority):
+        job = self._jobs[key]
+        if self.pool.tryTake(job[0]):
+            job[1] = priority
+            self.pool.start(job[0], priority)
+
+    def cancel(self, name):
+        """Drop all queued jobs for ``name``. Returns how many were removed."""
+        removed = 0
+        for key in [k for k in self._jobs if k[1] == name]:
+            runnable = self._jobs.pop(key)[0]
+            if self.pool.tryTake(runnable):
+                removed += 1
+        return removed
+
+    def cancel_all(self):
+        removed = 0
+        for runnable, _ in self._jobs.values():
+            if self.pool.tryTake(runnable):
+                removed += 1
+        self._jobs.clear()
+        return removed
+
+    def is_scheduled(self, kind, name):
+        return (kind, name) in self._jobs
+
+    def __len__(self):
+        return len(self._jobs)
@@ -0,0 +1,148 @@
+"""
+Denoise
+
+Selectable noise reduction with a quality ladder:
+
+    "guided"         fast guided filter (He & Sun): luminance-guided,
+                     coefficients solved at 1/GUIDED_SCALE resolution;
+                     the cheapest
+    "box_bilateral"  single-pass bilateral approximation: box blur blended
+                     back by colour similarity
+    "bilateral"      the original edge-aware Gaussian bilateral, one
+                     pass (imaging.apply_denoise); highest quality
+
+The cost of every method is independent of ``amount``. Each method
+filters at full strength and ``amount`` only sets the blend with the
+input. For "bilateral" that is a single pass, which is what
+imaging.apply_denoise runs for any slider value (it adds passes only
+above amount 4/3). Box filters cost the same for any radius. Every method reads a
+fixed number of rows around each pixel (``halo``), so tile_engine can run
+it on strips in parallel. The guided filter works on GUIDED_SCALE x
+GUIDED_SCALE blocks counted from the first row, so strips must start on
+even rows. tile_engine.strips keeps strip heights even, and the halos here
+are even.
+
+Previews use PREVIEW_METHOD and export uses EXPORT_METHOD.
+"""
+
+import numpy as np
+from scipy.ndimage import uniform_filter
+
+METHODS = ("guided", "box_bilateral", "bilateral")
+PREVIEW_METHOD = "guided"
+EXPORT_METHOD = "bilateral"
+
+GUIDED_RADIUS = 2        # in full-resolution pixels
+GUIDED_SCALE = 2
+GUIDED_EPS = 0.01        # variance below which detail counts as noise
+BOX_RADIUS = 2
+BILATERAL_HALO = 6
+
+
+def method_for(quality):
+    return PREVIEW_METHOD if quality == "preview" else EXPORT_METHOD
+
+
+def halo(method, amount=1.0):
+    """Rows of context ``method`` reads around each output pixel"""
+    if method == "guided":
+        # two low-res boxes (input, then a/b) plus the block itself
+        r = max(1, GUIDED_RADIUS // GUIDED_SCALE)
+        return GUIDED_SCALE * (2 * r + 1)
+    if method == "box_bilateral":
+        return BOX_RADIUS + BOX_RADIUS % 2
+    # bilateral: 4 for the Gaussian (sigma 1, truncate 4), rounded up to even
+    return BILATERAL_HALO
+
+
+def _box(a, radius):
+    size = 2 * radius + 1
+    if a.ndim == 3:
+        return uniform_filter(a, size=(size, size, 1), mode='nearest')
+    return uniform_filter(a, size=size, mode='nearest')
+
+
+def _pad_blocks(a, scale):
+    """Edge-pad rows/columns up to a multiple of ``scale``"""
+    ph, pw = -a.shape[0] % scale, -a.shape[1] % scale
+    if ph or pw:
+        a = np.pad(a, ((0, ph), (0, pw)) + ((0, 0),) * (a.ndim - 2), mode='edge')
+    return a
+
+
+def _block_mean(a, scale):
+    # strided sums: much faster than reshape(...).mean(axis=(1, 3))
+    out = a[0::scale, 0::scale].copy()
+    for dy in range(scale):
+        for dx in range(scale):
+            if dy or dx:
+                out += a[dy::scale, dx::scale]
+    out *= 1.0 / (scale * scale)
+    return out
+
+
+def guided(rgb, radius=GUIDED_RADIUS, eps=GUIDED_EPS, scale=GUIDED_SCALE):
+    """
+    Fast guided filter of each channel with luminance as the guide: the
+    linear coefficients a, b are fitted on block means, and
+    q = a * I + b is evaluated at full resolution.
+    """
+    from imaging import rgb_to_lum
+    h, w = rgb.shape[:2]
+    I = _pad_blocks(np.clip(rgb_to_lum(rgb), 0, 1).astype(np.float32), scale)
+    r = max(1, radius // scale)
+    I_lo = _block_mean(I, scale)
+    p_lo = _block_mean(_pad_blocks(rgb, scale), scale)
+
+    mean_I = _box(I_lo, r)
+    var_I = _box(I_lo * I_lo, r) - mean_I * mean_I
+    mean_p = _box(p_lo, r)
+    cov = _box(p_lo * I_lo[..., None], r) - mean_I[..., None] * mean_p
+    a = cov / (var_I + eps)[..., None]
+    b = mean_p - a * mean_I[..., None]
+    A, B = _box(a, r), _box(b, r)
+
+    # q = A * I + B with A, B constant over each block
+    hb, wb = I_lo.shape
+    q = np.empty((hb, scale, wb, scale, 3), np.float32)
+    np.multiply(A[:, None, :, None], I.reshape(hb, scale, wb, scale, 1), out=q)
+    q += B[:, None, :, None]
+    return q.reshape(hb * scale, wb * scale, 3)[:h, :w]
+
+
+def box_bilateral(rgb, radius=BOX_RADIUS):
+    """Box blur, blended back in where it stays close to the original colour"""
+    blur = _box(rgb, radius)
+    diff = np.sum(np.abs(rgb - blur), axis=2, keepdims=True)
+    w = np.exp(-diff * 5.0)
+    return rgb + (blur - rgb) * w
+
+
+def bilateral(rgb):
+    """One pass of the edge-aware Gaussian bilateral of imaging.apply_denoise, unblended"""
+    from scipy.ndimage import gaussian_filter
+    from imaging import rgb_to_lum
+    y = np.clip(rgb_to_lum(rgb), 0, 1)
+    gy, gx = np.gradient(y)
+    edge = np.exp(-np.sqrt(gy * gy + gx * gx) * 10.0)[..., None]
+    blur = gaussian_filter(rgb, sigma=(1.0, 1.0, 0.0), mode='nearest')
+    w = edge * np.exp(-np.sum(np.abs(rgb - blur), axis=2, keepdims=True) * 5.0)
+    return rgb + (blur - rgb) * w
+
+
+def denoise(rgb, amount, method=EXPORT_METHOD):
+    """Blend ``amount`` of the ``method``-filtered image into ``rgb``, clamped to [0,1]"""
+    if amount <= 1e-6:
+        return rgb
+    if method == "bilateral":
+        filtered = bilateral(rgb)
+    elif method == "guided":
+        filtered = guided(rgb)
+    elif method == "box_bilateral":
+        filtered = box_bilateral(rgb)
+    else:
+        raise ValueError(f"unknown denoise method: {method}")
+    filtered -= rgb
+    filtered *= amount
+    filtered += rgb
+    return np.clip(filtered, 0, 1, out=filtered).astype(np.float32, copy=False)
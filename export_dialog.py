@@ -1,11 +1,14 @@
+import os
 from PySide6.QtWidgets import QDialog, QVBoxLayout, QFormLayout, QComboBox, QHBoxLayout, QSpinBox, QCheckBox, QLineEdit, QDialogButtonBox
 
 class ExportOptionsDialog(QDialog):
+    RENDER_MODES = {"Auto": None, "Resize first (fast)": "resize_first", "Full resolution": "full"}
+
     def __init__(self, parent=None):
         super().__init__(parent); self.setWindowTitle("Export Options")
         lay=QVBoxLayout(self); form=QFormLayout()
 
-        self.cmb_fmt=QComboBox(); self.cmb_fmt.addItems(["JPEG","PNG"]); form.addRow("Format", self.cmb_fmt)
+        self.cmb_fmt=QComboBox(); self.cmb_fmt.addItems(["JPEG","PNG","TIFF 16-bit","PNG 16-bit"]); form.addRow("Format", self.cmb_fmt)
         rowQ=QHBoxLayout(); self.sp_quality=QSpinBox(); self.sp_quality.setRange(1,100); self.sp_quality.setValue(92)
         self.chk_prog=QCheckBox("Progressive"); self.chk_prog.setChecked(True)
         self.chk_opt=QCheckBox("Optimize"); self.chk_opt.setChecked(True)
@@ -17,6 +20,10 @@ class ExportOptionsDialog(QDialog):
         self.sp_long=QSpinBox(); self.sp_long.setRange(320,20000); self.sp_long.setValue(2048); self.sp_long.setEnabled(False)
         rowL.addWidget(self.cmb_long); rowL.addWidget(self.sp_long); form.addRow("Long Edge", rowL)
 
+        # Resize before render (render_scale.py); Auto = resize first for web sizes
+        self.cmb_render=QComboBox(); self.cmb_render.addItems(list(self.RENDER_MODES))
+        form.addRow("Render", self.cmb_render)
+
         # File Naming
         self.cmb_naming = QComboBox()
         self.cmb_naming.addItems(["Original Name", "Custom Name + Sequence"])
@@ -51,6 +58,16 @@ class ExportOptionsDialog(QDialog):
         rowLimit.addWidget(self.sp_limit_size)
         form.addRow("File Size", rowLimit)
 
+        # Parallel renders (export_engine); each full-size render needs its own memory
+        import export_engine
+        self.sp_workers = QSpinBox(); self.sp_workers.setRange(1, max(1, os.cpu_count() or 1))
+        self.sp_workers.setValue(export_engine.default_workers())
+        form.addRow("Parallel Renders", self.sp_workers)
+
+        # export_manifest.py: re-running a job only renders what changed
+        self.chk_incremental = QCheckBox("Skip unchanged images (resume)"); self.chk_incremental.setChecked(True)
+        form.addRow("Re-export", self.chk_incremental)
+
         lay.addLayout(form)
 
         def on_fmt():
@@ -72,9 +89,11 @@ class ExportOptionsDialog(QDialog):
         self.chk_limit_size.toggled.connect(lambda _: on_fmt())
         self.cmb_naming.currentTextChanged.connect(lambda _: on_naming())
         self.cmb_long.currentTextChanged.connect(lambda _: self.sp_long.setEnabled(self.cmb_long.currentText()=="Custom"))
+        self.cmb_long.currentTextChanged.connect(lambda t: self.cmb_render.setEnabled(t!="No resize"))
         
         on_fmt()
         on_naming()
+        self.cmb_render.setEnabled(self.cmb_long.currentText()!="No resize")
 
         btns=QDialogButtonBox(QDialogButtonBox.Ok|QDialogButtonBox.Cancel); lay.addWidget(btns)
         btns.accepted.connect(self.accept); btns.rejected.connect(self.reject)
@@ -94,5 +113,8 @@ class ExportOptionsDialog(QDialog):
             "progressive":bool(self.chk_prog.isChecked()),"optimize":bool(self.chk_opt.isChecked()),
             "long_edge":long_edge,"suffix":self.ed_suffix.text().strip(),
             "naming_mode": naming_mode, "custom_text": custom_text, "start_num": start_num,
-            "limit_size_kb": limit_size_kb
+            "limit_size_kb": limit_size_kb,
+            "render_mode": self.RENDER_MODES[self.cmb_render.currentText()],
+            "workers": int(self.sp_workers.value()),
+            "incremental": bool(self.chk_incremental.isChecked())
         }
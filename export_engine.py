@@ -0,0 +1,256 @@
+"""
+Export Engine
+
+Qt-free batch export. ExportWorker (GUI) is a thin wrapper around
+``run``, and the same engine serves any headless caller.
+
+    items -> [render workers] -> bounded queue -> [encoder/writer] -> files
+
+* ``workers`` render threads each take the next item, render it
+  (process_image_fast, apply_transforms, resize) and put the pixels on a
+  queue that holds at most ``queue_size`` images. When the encoders fall
+  behind, the renderers block. At most workers + queue_size rendered
+  images are alive at any time, whatever the batch size.
+* ``encoders`` threads encode and write. JPEG/PNG encoding in Pillow
+  releases the GIL, so encoding overlaps with rendering.
+* File names depend only on the item's position in ``items`` (see
+  ``output_stem``), so "Custom Name + Sequence" numbering stays
+  deterministic when images finish out of order.
+* ``progress(done, total)`` is called from an encoder thread after each
+  written file. ``cancel`` (a threading.Event) stops the job between
+  images. Files already written stay on disk.
+* The first failure cancels the rest of the job and is re-raised from
+  ``run``.
+* With a ``manifest`` (export_manifest.ExportManifest), items whose
+  output is still current are skipped (unless opts["incremental"] is
+  False), and every written file is recorded. Re-running an interrupted
+  or edited job only renders what changed.
+"""
+
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+import image_writers
+import jpeg_size
+import render_scale
+
+DEFAULT_QUEUE_SIZE = 2
+MAX_DEFAULT_WORKERS = 4     # full-resolution renders are memory-hungry
+
+
+def default_workers():
+    return max(1, min(MAX_DEFAULT_WORKERS, os.cpu_count() or 1))
+
+
+def output_stem(it, index, opts):
+    """File name (no extension) for item number ``index`` (0-based) of the batch"""
+    if opts.get("naming_mode", "Original Name") == "Custom Name + Sequence":
+        seq = int(opts.get("start_num", 1)) + index
+        return f"{opts.get('custom_text', 'Photo')}-{seq:03d}"
+    return os.path.splitext(os.path.basename(it["name"]))[0]
+
+
+def load_source(it, loader=None):
+    """(full, pyramid levels) for an item: item dict, then loader (store/disk cache), then decode"""
+    full, levels = it.get("full"), it.get("levels")
+    if full is None and loader is not None:
+        got = loader(it["name"])
+        if got is not None:
+            full, levels = got[0], got[1]
+    if full is None:
+        from imaging import decode_image
+        full, thumb, levels = decode_image(it["name"], (256, 170), return_levels=True)
+        if full is thumb:
+            # decode_image hands back one placeholder as full and thumb on failure
+            raise RuntimeError(f"cannot decode {it['name']}")
+    return full, levels
+
+
+def load_full(it, loader=None):
+    return load_source(it, loader)[0]
+
+
+def out_dtype_for(opts):
+    fmt = opts.get("fmt", "JPEG").upper()
+    return np.uint16 if fmt in image_writers.FORMATS else np.uint8
+
+
+def render_mode(opts):
+    """"resize_first" or "full" (render_scale.py); web-sized exports default to resize_first"""
+    return opts.get("render_mode") or render_scale.default_mode(opts)
+
+
+def render_item(it, opts, loader=None):
+    """Finished export pixels for one item"""
+    from imaging import process_image_fast, apply_transforms, resize_long_edge
+    full, levels = load_source(it, loader)
+    long_edge = opts.get("long_edge", None)
+    if long_edge and render_mode(opts) == "resize_first":
+        return render_scale.render(full, it["settings"], long_edge, out_dtype_for(opts), levels)
+    out = process_image_fast(full, it["settings"], out_dtype=out_dtype_for(opts))
+    out = apply_transforms(out, it["settings"])
+    return resize_long_edge(out, long_edge)
+
+
+def _jpeg_kwargs(opts, quality=None):
+    return {
+        "quality": max(1, min(100, int(quality if quality is not None else opts.get("quality", 92)))),
+        "progressive": bool(opts.get("progressive", True)),
+        "optimize": bool(opts.get("optimize", True)),
+        "subsampling": "4:2:0",
+    }
+
+
+def write_output(arr, out_stem, opts, stats=None):
+    """Encode ``arr`` in the requested format and write it; returns the path"""
+    from PIL import Image
+    fmt = opts.get("fmt", "JPEG").upper()
+    if fmt in image_writers.FORMATS:
+        return image_writers.write(out_stem, arr, fmt)
+    if fmt == "PNG":
+        path = f"{out_stem}.png"
+        Image.fromarray(arr).save(path, "PNG", compress_level=6, optimize=True)
+        return path
+
+    # JPEG, optionally fitted to a size limit (jpeg_size.py)
+    path = f"{out_stem}.jpg"
+    save_kwargs = _jpeg_kwargs(opts)
+    limit_size_kb = int(opts.get("limit_size_kb", 0))
+    stats = stats if stats is not None else {}
+    if limit_size_kb > 0:
+        data = jpeg_size.fit(arr, limit_size_kb * 1024, save_kwargs, stats)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+    Image.fromarray(arr).save(path, "JPEG", **save_kwargs)
+    stats["encodes"] = 1
+    return path
+
+
+def run(items, out_dir, opts, loader=None, workers=None, encoders=1, queue_size=None,
+        progress=None, cancel=None, manifest=None):
+    """
+    Export ``items`` into ``out_dir``. Returns a dict:
+        "outputs":   output path per item (None where not written)
+        "cancelled": True if ``cancel`` was set before the job finished
+        "stats":     per-item dicts (render_s, encode_s, ...) and totals;
+                     "skipped" counts items the manifest found current
+    """
+    items = list(items)
+    total = len(items)
+    workers = max(1, int(workers or opts.get("workers") or default_workers()))
+    encoders = max(1, int(encoders))
+    cancel = cancel if cancel is not None else threading.Event()
+    q = queue.Queue(maxsize=max(1, int(queue_size or DEFAULT_QUEUE_SIZE)))
+    lock = threading.Lock()
+    outputs = [None] * total
+    item_stats = [None] * total
+    errors = []
+    t_start = time.perf_counter()
+
+    skipped = set()
+    if manifest is not None and opts.get("incremental", True):
+        for i, it in enumerate(items):
+            if manifest.is_current(it, os.path.join(out_dir, output_stem(it, i, opts))):
+                outputs[i] = manifest.output_for(it)
+                skipped.add(i)
+        if skipped:
+            print(f"⏭️ Export: {len(skipped)}/{total} unchanged, skipped")
+            if progress is not None:
+                progress(len(skipped), total)
+    todo = iter([(i, it) for i, it in enumerate(items) if i not in skipped])
+    done = [len(skipped)]
+
+    def fail(e):
+        with lock:
+            errors.append(e)
+        cancel.set()
+
+    def put(job):
+        # Blocking put that gives up when the job is cancelled
+        while not cancel.is_set():
+            try:
+                q.put(job, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def render_loop():
+        while not cancel.is_set():
+            with lock:
+                nxt = next(todo, None)
+            if nxt is None:
+                return
+            i, it = nxt
+            try:
+                t0 = time.perf_counter()
+                arr = render_item(it, opts, loader)
+                st = {"name": it["name"], "render_s": time.perf_counter() - t0}
+            except Exception as e:
+                fail(e)
+                return
+            if not put((i, arr, st)):
+                return
+
+    def encode_loop():
+        while True:
+            job = q.get()
+            if job is None:
+                return
+            if cancel.is_set():
+                continue        # drain
+            i, arr, st = job
+            try:
+                t0 = time.perf_counter()
+                outputs[i] = write_output(arr, os.path.join(out_dir, output_stem(items[i], i, opts)), opts, st)
+                st["encode_s"] = time.perf_counter() - t0
+                if manifest is not None:
+                    manifest.record(items[i], outputs[i])
+            except Exception as e:
+                fail(e)
+                continue
+            del arr, job
+            item_stats[i] = st
+            with lock:
+                done[0] += 1
+                n = done[0]
+            if progress is not None:
+                progress(n, total)
+
+    enc_threads = [threading.Thread(target=encode_loop, name=f"export-encode-{k}", daemon=True)
+                   for k in range(encoders)]
+    ren_threads = [threading.Thread(target=render_loop, name=f"export-render-{k}", daemon=True)
+                   for k in range(min(workers, max(1, total - len(skipped))))]
+    for t in enc_threads + ren_threads:
+        t.start()
+    for t in ren_threads:
+        t.join()
+    for _ in enc_threads:
+        q.put(None)
+    for t in enc_threads:
+        t.join()
+
+    if manifest is not None:
+        manifest.save(finished=not errors and not cancel.is_set())
+    if errors:
+        raise errors[0]
+    written = [s for s in item_stats if s is not None]
+    return {
+        "outputs": outputs,
+        "cancelled": cancel.is_set(),
+        "stats": {
+            "items": item_stats,
+            "written": len(written),
+            "skipped": len(skipped),
+            "workers": workers,
+            "elapsed_s": time.perf_counter() - t_start,
+            "render_s": sum(s["render_s"] for s in written),
+            "encode_s": sum(s.get("encode_s", 0.0) for s in written),
+            "encodes": sum(s.get("encodes", 0) for s in written),
+        },
+    }
@@ -0,0 +1,186 @@
+"""
+Export Manifest
+
+A batch export that failed at image 612 of 800, or was interrupted by
+closing the app, used to start again from the first image. Re-exporting
+a gallery after fixing three images re-rendered all of it.
+
+Each export job (output folder + export options) is now recorded in
+MANIFEST_NAME in the project directory. Every item that is written gets
+an entry:
+
+    source path -> source signature (size, mtime), settings hash,
+                   output path, output size/mtime and SHA-1
+
+Entries are saved as images finish (at most every SAVE_INTERVAL seconds,
+and at the end), so an interrupted job keeps what it already wrote. When
+the same job runs again, an item is skipped if its source, settings and
+expected output path match its entry and the output file is still
+there, unchanged. Only new, edited or missing images are rendered.
+
+The manifest is a plain JSON file. A damaged or unknown one is treated
+as empty.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+MANIFEST_NAME = "export_manifest.json"
+VERSION = 1
+SAVE_INTERVAL = 2.0             # seconds between saves while a job runs
+IGNORED_OPTIONS = ("workers", "incremental")  # options that do not change the output
+MAX_JOBS = 32                   # oldest jobs are dropped beyond this
+
+
+def _json_default(v):
+    if isinstance(v, np.ndarray):
+        return v.tolist()
+    if isinstance(v, np.generic):
+        return v.item()
+    return str(v)
+
+
+def digest(obj):
+    """Stable SHA-1 of a JSON-able value (numpy arrays included)"""
+    data = json.dumps(obj, sort_keys=True, default=_json_default, separators=(",", ":"))
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def settings_hash(settings):
+    return digest(settings)
+
+
+def job_options(opts):
+    return {k: v for k, v in opts.items() if k not in IGNORED_OPTIONS}
+
+
+def job_id(out_dir, opts):
+    return digest([os.path.abspath(out_dir), job_options(opts)])
+
+
+def source_signature(path):
+    """[size, mtime_ns] of a source file, or None if it is not a file on disk"""
+    try:
+        st = os.stat(path)
+        return [st.st_size, st.st_mtime_ns]
+    except (OSError, TypeError, ValueError):
+        return None
+
+
+def file_sha1(path, chunk=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _stat(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+class ExportManifest:
+    """The record of one export job (``out_dir`` + ``opts``) in ``project_dir``"""
+
+    def __init__(self, project_dir, out_dir, opts):
+        self.path = Path(project_dir) / MANIFEST_NAME
+        self.out_dir = os.path.abspath(out_dir)
+        self.id = job_id(out_dir, opts)
+        self._lock = threading.Lock()
+        self._data = self._load()
+        job = self._data["jobs"].get(self.id)
+        if job is None:
+            job = {"out_dir": self.out_dir, "options": job_options(opts), "entries": {}}
+            self._data["jobs"][self.id] = job
+        self.job = job
+        self._save_lock = threading.Lock()
+        self._saved_at = 0.0
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get("version") == VERSION and isinstance(data.get("jobs"), dict):
+                return data
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Export manifest unreadable, starting fresh: {e}")
+        return {"version": VERSION, "jobs": {}}
+
+    def entries(self):
+        return self.job["entries"]
+
+    def is_current(self, it, out_stem):
+        """True if ``it`` was exported to ``out_stem`` (+ extension) with its current inputs"""
+        e = self.job["entries"].get(it["name"])
+        if e is None:
+            return False
+        out = e.get("output", "")
+        if os.path.splitext(out)[0] != os.path.abspath(out_stem):
+            return False
+        if e.get("settings") != settings_hash(it["settings"]):
+            return False
+        if e.get("source") != source_signature(it["name"]):
+            return False
+        try:
+            size, mtime = _stat(out)
+        except OSError:
+            return False
+        if [size, mtime] == e.get("output_stat"):
+            return True
+        # touched since: unchanged only if the content still matches
+        return size == (e.get("output_stat") or [None])[0] and file_sha1(out) == e.get("output_sha1")
+
+    def output_for(self, it):
+        e = self.job["entries"].get(it["name"])
+        return e and e.get("output")
+
+    def record(self, it, output):
+        """Record a written output; saves at most every SAVE_INTERVAL seconds"""
+        entry = {
+            "source": source_signature(it["name"]),
+            "settings": settings_hash(it["settings"]),
+            "output": os.path.abspath(output),
+            "output_stat": list(_stat(output)),
+            "output_sha1": file_sha1(output),
+            "exported": datetime.now().isoformat(timespec="seconds"),
+        }
+        with self._lock:
+            self.job["entries"][it["name"]] = entry
+            due = time.monotonic() - self._saved_at >= SAVE_INTERVAL
+        if due:
+            self.save()
+
+    def save(self, finished=None):
+        """Write the manifest atomically; ``finished`` marks the job complete or not"""
+        with self._save_lock:
+            # other jobs may have saved since we loaded: merge into the current file
+            data = self._load()
+            with self._lock:
+                if finished is not None:
+                    self.job["complete"] = bool(finished)
+                self.job["updated"] = datetime.now().isoformat(timespec="seconds")
+                jobs = data["jobs"]
+                jobs[self.id] = self.job
+                for old in sorted(jobs, key=lambda k: jobs[k].get("updated", ""))[:max(0, len(jobs) - MAX_JOBS)]:
+                    if old != self.id:
+                        del jobs[old]
+                text = json.dumps(data, ensure_ascii=False, indent=1, default=_json_default)
+                self._saved_at = time.monotonic()
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(text)
+                os.replace(tmp, self.path)
+            except Exception as e:
+                print(f"⚠️ Export manifest not saved: {e}")
@@ -0,0 +1,421 @@
+"""
+Fused Pipeline
+
+Single-pass execution of ``imaging.pipeline`` for the NumPy fallback (no
+``ninlab_core``). The reference pipeline runs every stage over the whole
+image and each one allocates full-size float temporaries; on a 24 MP image
+that is gigabytes of allocation per render.
+
+Here the point-wise stages (exposure, white balance, tone regions, dehaze,
+saturation/vibrance, contrast/gamma, curve LUT, mid-contrast, HSL mixer,
+vignette, defringe, film grain) are grouped into segments and run tile by
+tile (a strip of rows that fits in cache) in place on preallocated scratch
+buffers. Only stages that need neighbouring pixels (denoise, clarity,
+texture) run full-frame between segments, exactly where the reference
+pipeline runs them. With none of those active, the common case, an 8-bit
+image goes in and an 8-bit image comes out without a full-size float
+buffer ever existing.
+
+Tolerance against ``imaging.pipeline_reference``:
+    float output: max abs difference < 1e-4 (identity stages are skipped);
+    8-bit output: at most 1 code value, except at curve-LUT bin edges where
+    a value that sits on the boundary may land in the neighbouring bin.
+"""
+
+import numpy as np
+
+import precision
+
+# Target size of one float32 RGB tile
+TILE_BYTES = 4 * 1024 * 1024
+MIN_TILE_ROWS = 16
+
+_EPS = 1e-6
+
+
+class _Scratch:
+    """Preallocated per-tile buffers; views are cut to the tile height"""
+
+    def __init__(self, rows, width):
+        self.t = np.empty((rows, width, 3), np.float32)
+        self.rgb = np.empty((rows, width, 3), np.float32)
+        self.lum = np.empty((rows, width), np.float32)
+        self.m = np.empty((rows, width), np.float32)
+        self.m2 = np.empty((rows, width), np.float32)
+
+
+def tile_rows_for(width):
+    return max(MIN_TILE_ROWS, TILE_BYTES // max(1, width * 3 * 4))
+
+
+def _lum(t, out, tmp):
+    # Same operation order as imaging.rgb_to_lum
+    np.multiply(t[..., 0], 0.2126, out=out)
+    np.multiply(t[..., 1], 0.7152, out=tmp); out += tmp
+    np.multiply(t[..., 2], 0.0722, out=tmp); out += tmp
+    return out
+
+
+# ------- point-wise kernels: k(t, s, r0, frame) works in place on tile t -------
+# r0 is the tile's first row in the array being rendered; frame is
+# (frame_h, frame_w, y0, x0): that array's place in the whole image.
+def _wb(temperature, tint):
+    r = 1 + 0.8 * temperature - 0.2 * tint
+    g = 1 - 0.1 * temperature + 0.4 * tint
+    b = 1 - 0.8 * temperature - 0.2 * tint
+
+    def k(t, s, r0, frame):
+        t[..., 0] *= r; t[..., 1] *= g; t[..., 2] *= b
+    return k
+
+
+def _knee(t, s, r0, frame):
+    # Soft-clip HDR values when no tone region is set
+    over = t > 1.0
+    if over.any():
+        np.log(t, out=t, where=over)
+        np.add(t, 1.0, out=t, where=over)
+
+
+def _tone_regions(hi, sh, wh, bl):
+    def k(t, s, r0, frame):
+        n = t.shape[0]
+        y = _lum(t, s.lum[:n], s.m2[:n])
+        m, m2, rgb = s.m[:n], s.m2[:n], s.rgb[:n]
+        if abs(sh) > _EPS:
+            lift = 1.0 + sh * 4.0
+            np.subtract(0.5, y, out=m); m *= 2.0; np.clip(m, 0, 1, out=m); m *= m
+            m *= (lift - 1.0); m += 1.0
+            t *= m[..., None]
+        if abs(hi) > _EPS:
+            np.subtract(y, 0.5, out=m); m *= 2.0; np.clip(m, 0, 1, out=m); m *= m
+            if hi > 0:
+                np.divide(t, 1.0 + hi * 3.0, out=rgb)
+            else:
+                np.multiply(t, 1.0 + abs(hi) * 2.5, out=rgb)
+            rgb *= m[..., None]
+            np.subtract(1.0, m, out=m2)
+            t *= m2[..., None]
+            t += rgb
+        if abs(wh) > _EPS:
+            t *= (1.0 + wh * 0.5)
+        if abs(bl) > _EPS:
+            t += bl * 0.1
+    return k
+
+
+def _dehaze(amount):
+    contrast = 0.4 * amount
+
+    def k(t, s, r0, frame):
+        n = t.shape[0]
+        y = _lum(t, s.lum[:n], s.m2[:n])
+        np.clip(y, 0, 1, out=y)
+        y *= (0.6 * amount)
+        t -= y[..., None]
+        np.clip(t, 0, 1, out=t)
+        if abs(contrast) > _EPS:
+            t -= 0.5; t *= (1.0 + contrast); t += 0.5
+    return k
+
+
+def _clamp(t, s, r0, frame):
+    np.clip(t, 0, 1, out=t)
+
+
+def _sat_vib(saturation, vibrance):
+    def k(t, s, r0, frame):
+        n = t.shape[0]
+        gray = np.mean(t, axis=2, out=s.lum[:n])[..., None]
+        if abs(vibrance) > _EPS:
+            # Weight comes from the saturation before this stage
+            rgb, w = s.rgb[:n], s.m[:n]
+            np.subtract(t, gray, out=rgb); np.abs(rgb, out=rgb); np.maximum(rgb, 1e-6, out=rgb)
+            np.mean(rgb, axis=2, out=w)
+            w *= 2.0; np.subtract(1.0, w, out=w); np.clip(w, 0, 1, out=w)
+        t -= gray; t *= (1.0 + saturation); t += gray
+        if abs(vibrance) > _EPS:
+            w *= vibrance; w += 1.0
+            t -= gray; t *= w[..., None]; t += gray
+    return k
+
+
+def _contrast_gamma(contrast, gamma):
+    def k(t, s, r0, frame):
+        if abs(contrast) > _EPS:
+            t -= 0.5; t *= (1.0 + contrast); t += 0.5
+        if abs(gamma - 1.0) > _EPS:
+            np.clip(t, 0, 1, out=t)
+            np.power(t, 1.0 / gamma, out=t)
+    return k
+
+
+def _curve_lut(lut):
+    table = np.asarray(lut, dtype=np.uint8).astype(np.float32) / 255.0
+
+    def k(t, s, r0, frame):
+        np.clip(t, 0, 1, out=t)
+        t *= 255
+        idx = t.astype(np.uint8)
+        np.take(table, idx, out=t)
+    return k
+
+
+def _mid_contrast(amount):
+    gain = 1.0 + 1.6 * amount
+
+    def k(t, s, r0, frame):
+        t -= 0.5; t *= gain; t += 0.5
+        np.clip(t, 0, 1, out=t)
+    return k
+
+
+def _hsl(adj):
+    from imaging import apply_hsl_mixer
+
+    def k(t, s, r0, frame):
+        t[...] = apply_hsl_mixer(t, adj)
+    return k
+
+
+def _vignette(amount):
+    import masks
+
+    def k(t, s, r0, frame):
+        h, w, y0, x0 = frame
+        n, tw = t.shape[:2]
+        m = s.m[:n]
+        np.multiply(masks.r2_window(h, w, y0 + r0, y0 + r0 + n, x0, x0 + tw), -amount, out=m)
+        m += 1.0
+        np.clip(m, 0.2, 1.0, out=m)
+        t *= m[..., None]
+        np.clip(t, 0, 1, out=t)
+    return k
+
+
+def _defringe(amount):
+    def k(t, s, r0, frame):
+        n = t.shape[0]
+        m, lum = s.m[:n], s.lum[:n]
+        np.minimum(t[..., 0], t[..., 2], out=m)
+        m -= t[..., 1]; np.maximum(m, 0, out=m)
+        m *= 3.0; np.clip(m, 0, 1, out=m)
+        m *= amount
+        _lum(t, lum, s.m2[:n])
+        # t*(1-m) + lum*m == t + (lum - t)*m
+        rgb = s.rgb[:n]
+        np.subtract(lum[..., None], t, out=rgb)
+        rgb *= m[..., None]
+        t += rgb
+    return k
+
+
+def _grain(adj):
+    # Same as imaging.apply_film_grain; the final clamp follows in plan()
+    import grain
+    tex = grain.texture(adj.get("grain_size", 0.5), adj.get("grain_roughness", 0.5))
+    strength = adj["grain_amount"] * 0.12
+    seed = adj.get("grain_seed")
+
+    def k(t, s, r0, frame):
+        n, w = t.shape[:2]
+        fh, fw, y0, x0 = frame
+        noise = grain.sample(tex, seed, y0 + r0, y0 + r0 + n, x0, x0 + w, fh, fw)
+        lum = _lum(t, s.lum[:n], s.m[:n])
+        m = s.m2[:n]
+        lum -= 0.5
+        np.abs(lum, out=m)
+        m *= -2.0; m += 1.0
+        np.clip(m, 0.3, 1.0, out=m)
+        m *= strength
+        noise *= m
+        t += noise[..., None]
+    return k
+
+
+# ------- plan -------
+def _has_hsl(adj):
+    from imaging import _COLORS
+    return any(abs(float(adj.get(f"{p}_{c}", 0.0))) > _EPS for c in _COLORS for p in "hsl")
+
+
+def denoise_halo(amount, method=None):
+    """Rows of context the denoise stage needs (see denoise.halo)"""
+    import denoise
+    return denoise.halo(method or denoise.EXPORT_METHOD, amount)
+
+
+def _full(stage, fn):
+    """Tag a full-frame step with its stage name (stage_cache checkpoints)"""
+    fn.stage = stage
+    return fn
+
+
+def plan(adj, fast_mode=False, denoise_method=None):
+    """
+    Stage list in reference-pipeline order as (kind, fn, halo) tuples:
+    ("point", kernel, 0) for functions of the pixel's RGB alone, ("pos",
+    kernel, 0) for point-wise stages that also depend on the pixel position,
+    or ("full", fn, halo), where halo is the rows of context a full-frame
+    stage reads around each output pixel (None: it needs the whole frame).
+    Stages that are identities here are left out.
+
+    ``denoise_method`` selects the denoise algorithm (denoise.METHODS);
+    None means denoise.EXPORT_METHOD.
+    """
+    import denoise
+    from imaging import apply_clarity, apply_texture
+    steps = [("point", _gain(2.0 ** adj["exposure"]), 0),
+             ("point", _wb(adj["temperature"], adj["tint"]), 0)]
+    tone = (adj["highlights"], adj["shadows"], adj["whites"], adj["blacks"])
+    if all(abs(v) < _EPS for v in tone):
+        steps.append(("point", _knee, 0))
+    else:
+        steps.append(("point", _tone_regions(*tone), 0))
+    if abs(adj["dehaze"]) >= _EPS:
+        steps.append(("point", _dehaze(adj["dehaze"]), 0))
+    if fast_mode:
+        steps.append(("point", _clamp, 0))
+    elif adj["denoise"] > _EPS:
+        method = denoise_method or denoise.EXPORT_METHOD
+        steps.append(("full", _full("denoise", lambda x: denoise.denoise(x, adj["denoise"], method)),
+                      denoise.halo(method, adj["denoise"])))
+    if abs(adj["saturation"]) > _EPS or abs(adj["vibrance"]) > _EPS:
+        steps.append(("point", _sat_vib(adj["saturation"], adj["vibrance"]), 0))
+    if abs(adj["contrast"]) > _EPS or abs(adj["gamma"] - 1.0) > _EPS:
+        steps.append(("point", _contrast_gamma(adj["contrast"], adj["gamma"]), 0))
+    if adj.get("curve_lut") is not None:
+        steps.append(("point", _curve_lut(adj["curve_lut"]), 0))
+    if abs(adj["mid_contrast"]) >= _EPS:
+        steps.append(("point", _mid_contrast(adj["mid_contrast"]), 0))
+    if abs(adj["clarity"]) >= _EPS:
+        # Clarity sees the unclamped values and clamps its result
+        steps.append(("full", _full("clarity", lambda x: apply_clarity(x, adj["clarity"])), 1))
+    else:
+        steps.append(("point", _clamp, 0))
+    if abs(adj["texture"]) >= _EPS:
+        steps.append(("full", _full("texture", lambda x: apply_texture(x, adj["texture"])), 1))
+    if _has_hsl(adj):
+        steps.append(("point", _hsl(adj), 0))
+    if abs(adj["vignette"]) >= _EPS:
+        steps.append(("pos", _vignette(adj["vignette"]), 0))
+    if not fast_mode:
+        if adj.get("defringe", 0.0) > _EPS:
+            steps.append(("point", _defringe(adj["defringe"]), 0))
+        if adj.get("grain_amount", 0.0) > _EPS:
+            steps.append(("pos", _grain(adj), 0))
+    steps.append(("point", _clamp, 0))
+    return steps
+
+
+def _segments(steps):
+    """Merge runs of point/pos kernels: [("point", [k, ...]) | ("full", fn)]"""
+    segs = []
+    for kind, fn, _halo in steps:
+        if kind == "full":
+            segs.append(("full", fn))
+        elif segs and segs[-1][0] == "point":
+            segs[-1][1].append(fn)
+        else:
+            segs.append(("point", [fn]))
+    return segs
+
+
+# ------- execution -------
+def _loader(src):
+    """Point kernel that fills a tile from ``src``, with the reference rounding steps"""
+    if src.dtype == np.uint8:
+        scale = 255.0
+    elif src.dtype == np.uint16:
+        scale = 65535.0
+    else:
+        scale = 1.0
+
+    def k(t, s, r0, frame):
+        np.copyto(t, src[r0:r0 + t.shape[0]], casting="unsafe")
+        if scale != 1.0:
+            t /= scale
+    return k
+
+
+def _gain(gain):
+    def k(t, s, r0, frame):
+        t *= gain
+    return k
+
+
+def _store(dst, t):
+    if dst.dtype == np.uint8:
+        t *= 255.0; t += 0.5
+    elif dst.dtype == np.uint16:
+        t *= 65535.0; t += 0.5
+    np.copyto(dst, t, casting="unsafe")
+
+
+def _tiles(h, rows):
+    for r0 in range(0, h, rows):
+        yield r0, min(h, r0 + rows)
+
+
+def _run_segments(x, segs, s, rows, frame):
+    for kind, what in segs:
+        if kind == "full":
+            y = precision.check(what(x), getattr(what, "stage", "full-frame stage"))
+            x = np.ascontiguousarray(y, dtype=np.float32)
+            continue
+        for r0, r1 in _tiles(x.shape[0], rows):
+            t = x[r0:r1]
+            for k in what:
+                k(t, s, r0, frame)
+    return x
+
+
+def _finish(x, out_dtype, rows):
+    if out_dtype == np.float32:
+        return x
+    out = np.empty(x.shape, dtype=out_dtype)
+    for r0, r1 in _tiles(x.shape[0], rows):
+        _store(out[r0:r1], x[r0:r1])
+    return out
+
+
+def run(src, adj, fast_mode=False, out_dtype=np.float32, tile_rows=None, steps=None, frame=None,
+        denoise_method=None):
+    """
+    Render ``src`` (uint8, uint16 or float in [0,1]) with ``adj``.
+    Returns float32 in [0,1] or, with ``out_dtype=np.uint8`` / ``np.uint16``,
+    8-bit / 16-bit pixels.
+
+    ``steps`` runs part of a plan() instead of all of it; ``frame`` is
+    (frame_h, frame_w, y0, x0) when ``src`` is a crop of a larger image
+    (position-dependent stages such as the vignette use it).
+    ``denoise_method`` is passed to plan().
+    """
+    h, w = src.shape[:2]
+    frame = frame or (h, w, 0, 0)
+    rows = int(tile_rows or tile_rows_for(w))
+    if steps is None:
+        steps = plan(adj, fast_mode, denoise_method)
+    segs = _segments([("point", _loader(src), 0)] + list(steps))
+    s = _Scratch(min(rows, h), w)
+
+    if len(segs) == 1:
+        # Point-wise only: source tile -> scratch -> output, nothing full-size
+        out = np.empty((h, w, 3), dtype=out_dtype)
+        for r0, r1 in _tiles(h, rows):
+            t = s.t[:r1 - r0]
+            for k in segs[0][1]:
+                k(t, s, r0, frame)
+            _store(out[r0:r1], t)
+        return out
+
+    x = _run_segments(np.empty((h, w, 3), np.float32), segs, s, rows, frame)
+    return _finish(x, out_dtype, rows)
+
+
+def run_steps(x, steps, out_dtype=np.float32, tile_rows=None, frame=None):
+    """Continue a render: apply ``steps`` to float image ``x`` (modified in place)"""
+    h, w = x.shape[:2]
+    rows = int(tile_rows or tile_rows_for(w))
+    x = _run_segments(x, _segments(steps), _Scratch(min(rows, h), w), rows, frame or (h, w, 0, 0))
+    return _finish(x, out_dtype, rows)
@@ -0,0 +1,141 @@
+"""
+Film Grain Textures
+
+Grain used to be a fresh ``np.random.normal`` field, upsampled to the
+frame on every render. That made every export different and cost about a
+second per 6 MP frame. Now:
+
+* one tileable TEXTURE_SIZE^2 texture per (grain scale, roughness) is
+  generated once with a fixed seed and cached in memory (LRU of
+  MAX_TEXTURES) and on disk (GRAIN_DIR);
+* an image samples that texture in frame-relative coordinates: REF_EDGE
+  texels span the long edge, so a preview is a decimated view of the
+  export's grain rather than a different pattern;
+* the frame is cut into TEXTURE_SIZE cells and each cell reads the texture
+  at its own offset, drawn from the per-image ``grain_seed`` setting, so
+  the texture does not visibly repeat and different images get different
+  grain.
+
+Rendering grain is then one gather plus an add per pixel. It works on any
+row range of the frame, so it runs tile by tile like the other point-wise
+stages.
+"""
+
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+TEXTURE_SIZE = 480      # divisible by every grain scale (1-5)
+REF_EDGE = 6000         # long edge (px) at which one texel is one pixel
+OFFSET_CELLS = 64       # offsets wrap after this many cells per axis
+TEXTURE_SEED = 20240601
+TEXTURE_VERSION = 1     # bump when _generate changes
+MAX_TEXTURES = 8
+
+GRAIN_DIR = Path.home() / ".ninlab_cache" / "grain"
+
+_textures = OrderedDict()
+_lock = threading.Lock()
+stats = {"hits": 0, "loads": 0, "generated": 0}
+
+
+def noise_scale(size):
+    """Grain size slider (0-1) -> texels per noise sample (1-5)"""
+    return max(1, int(1 + size * 4))
+
+
+def seed_for(name):
+    """Stable default seed for an image, from its file name"""
+    return zlib.crc32(os.path.basename(str(name)).encode("utf-8"))
+
+
+def _generate(scale, roughness):
+    rng = np.random.default_rng((TEXTURE_SEED, scale))
+    n = TEXTURE_SIZE // scale
+    noise = rng.standard_normal((n, n))
+    # Periodic bilinear upsampling keeps the texture tileable
+    from scipy.ndimage import zoom
+    noise = zoom(noise, scale, order=1, mode='grid-wrap', grid_mode=True)
+    # Roughness controls the distribution (as the original apply_film_grain)
+    if roughness > 0.5:
+        power = 1.0 - (roughness - 0.5) * 0.8
+        noise = np.sign(noise) * np.power(np.abs(noise), power)
+    else:
+        noise = noise * (0.5 + roughness)
+    return noise.astype(np.float32)
+
+
+def _disk_path(scale, roughness_key):
+    return GRAIN_DIR / f"grain_v{TEXTURE_VERSION}_{TEXTURE_SIZE}_{scale}_{roughness_key:03d}.npy"
+
+
+def texture(size, roughness):
+    """(TEXTURE_SIZE, TEXTURE_SIZE) float32 grain for the slider values"""
+    scale = noise_scale(size)
+    rkey = int(round(float(roughness) * 100))
+    key = (scale, rkey)
+    with _lock:
+        tex = _textures.get(key)
+        if tex is not None:
+            _textures.move_to_end(key)
+            stats["hits"] += 1
+            return tex
+
+    path = _disk_path(scale, rkey)
+    tex = None
+    try:
+        tex = np.load(path)
+        if tex.shape != (TEXTURE_SIZE, TEXTURE_SIZE) or tex.dtype != np.float32:
+            tex = None
+        else:
+            stats["loads"] += 1
+    except Exception:
+        tex = None
+    if tex is None:
+        tex = _generate(scale, rkey / 100.0)
+        stats["generated"] += 1
+        try:
+            GRAIN_DIR.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+            with open(tmp, "wb") as f:
+                np.save(f, tex)
+            os.replace(tmp, path)
+        except Exception as e:
+            print(f"⚠️ Grain texture not cached: {e}")
+    tex.setflags(write=False)
+
+    with _lock:
+        _textures[key] = tex
+        while len(_textures) > MAX_TEXTURES:
+            _textures.popitem(last=False)
+    return tex
+
+
+def clear_cache():
+    with _lock:
+        _textures.clear()
+
+
+@lru_cache(maxsize=64)
+def offsets(seed):
+    """(2, OFFSET_CELLS, OFFSET_CELLS) per-cell texture offsets for ``seed``"""
+    rng = np.random.default_rng(int(seed or 0) & 0xFFFFFFFF)
+    return rng.integers(0, TEXTURE_SIZE, (2, OFFSET_CELLS, OFFSET_CELLS), dtype=np.intp)
+
+
+def sample(tex, seed, y0, y1, x0, x1, frame_h, frame_w):
+    """Grain for frame rows y0:y1, columns x0:x1 of a frame_h x frame_w image"""
+    step = REF_EDGE / float(max(frame_h, frame_w, 1))
+    u = (np.arange(y0, y1) * step).astype(np.intp)
+    v = (np.arange(x0, x1) * step).astype(np.intp)
+    oy, ox = offsets(seed)
+    cy = (u // TEXTURE_SIZE) % OFFSET_CELLS
+    cx = (v // TEXTURE_SIZE) % OFFSET_CELLS
+    iy = (u[:, None] + oy[cy[:, None], cx[None, :]]) % TEXTURE_SIZE
+    ix = (v[None, :] + ox[cy[:, None], cx[None, :]]) % TEXTURE_SIZE
+    return tex[iy, ix]
@@ -0,0 +1,183 @@
+"""
+Image Store
+
+Central, thread-safe owner of decoded full-resolution images (and their
+pyramids). Holds at most ``budget_bytes`` of pixel data and evicts the
+least-recently-viewed image when the budget is exceeded. Thumbnails are not
+kept here; they stay on the item dicts and are always resident.
+
+Evicted images are transparently reloaded from the on-disk preview cache
+(cache_manager), which maps them back in without a re-decode.
+"""
+
+import threading
+from collections import OrderedDict
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DEFAULT_BUDGET_MB = 2048
+
+
+def default_budget_bytes():
+    """A quarter of physical RAM when it can be determined, else 2 GB."""
+    if psutil is not None:
+        try:
+            return int(psutil.virtual_memory().total // 4)
+        except Exception:
+            pass
+    return DEFAULT_BUDGET_MB * 1024 * 1024
+
+
+def _nbytes(full, levels):
+    return int(full.nbytes) + sum(int(l.nbytes) for l in (levels or []))
+
+
+class ImageStore:
+    def __init__(self, budget_bytes=None, on_evict=None):
+        self._lock = threading.RLock()
+        self.on_evict = on_evict  # called with the image name after eviction
+        self._entries = OrderedDict()  # name -> (full, levels, nbytes); oldest first
+        self._resident = 0
+        self.budget_bytes = int(budget_bytes or default_budget_bytes())
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.evictions = 0
+
+    # ------- basic access -------
+    def put(self, name, full, levels=None):
+        """Insert (or replace) an image and mark it most recently used."""
+        if full is None:
+            return
+        size = _nbytes(full, levels)
+        with self._lock:
+            old = self._entries.pop(name, None)
+            if old is not None:
+                self._resident -= old[2]
+            self._entries[name] = (full, list(levels or []), size)
+            self._resident += size
+            self._evict()
+
+    def get(self, name, reload=True):
+        """
+        Return (full, levels) for ``name``, or None.
+
+        A resident image is marked most recently used. A non-resident image is
+        reloaded from the disk cache when ``reload`` is True and admitted.
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                self._entries.move_to_end(name)
+                self.hits += 1
+                return entry[0], entry[1]
+            self.misses += 1
+
+        if not reload:
+            return None
+        loaded = self.load(name)
+        if loaded is None:
+            return None
+        with self._lock:
+            self.reloads += 1
+        self.put(name, *loaded)
+        return loaded
+
+    def load(self, name):
+        """
+        Return (full, levels) without changing residency: the resident copy if
+        present, otherwise the disk-cache copy (memory-mapped), else None.
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                return entry[0], entry[1]
+        try:
+            from cache_manager import load_from_cache
+            from pyramid import levels_from_cache
+            cached = load_from_cache(name, keys=None)
+        except Exception:
+            cached = None
+        if not cached or "full" not in cached:
+            return None
+        return cached["full"], levels_from_cache(cached)
+
+    def contains(self, name):
+        with self._lock:
+            return name in self._entries
+
+    def discard(self, name):
+        with self._lock:
+            entry = self._entries.pop(name, None)
+            if entry is not None:
+                self._resident -= entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._resident = 0
+
+    # ------- budget -------
+    def set_budget(self, budget_bytes):
+        with self._lock:
+            self.budget_bytes = int(budget_bytes)
+            self._evict()
+
+    def has_room_for(self, nbytes):
+        """True if ``nbytes`` more can be admitted without evicting anything."""
+        with self._lock:
+            return self._resident + nbytes <= self.budget_bytes
+
+    def admit(self, name, full, levels=None):
+        """
+        Speculative put (prefetch): insert only if it fits without evicting
+        anything. Returns True if the image is resident afterwards.
+        """
+        if full is None:
+            return False
+        with self._lock:
+            if name in self._entries:
+                return True
+            if not self.has_room_for(_nbytes(full, levels)):
+                return False
+            self.put(name, full, levels)
+            return True
+
+    def _evict(self):
+        # Never evict the most recently used image, even if it alone is over budget
+        while self._resident > self.budget_bytes and len(self._entries) > 1:
+            name, (_, _, size) = self._entries.popitem(last=False)
+            self._resident -= size
+            self.evictions += 1
+            if self.on_evict is not None:
+                try:
+                    self.on_evict(name)
+                except Exception:
+                    pass
+
+    # ------- stats -------
+    @property
+    def resident_bytes(self):
+        with self._lock:
+            return self._resident
+
+    def stats(self):
+        with self._lock:
+            return {
+                "images": len(self._entries),
+                "resident_bytes": self._resident,
+                "budget_bytes": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "evictions": self.evictions,
+            }
+
+    def status_text(self):
+        st = self.stats()
+        mb = 1024 * 1024
+        return (f"Mem {st['resident_bytes'] / mb:.0f}/{st['budget_bytes'] / mb:.0f} MB · "
+                f"{st['images']} img · hits {st['hits']} · evict {st['evictions']}")
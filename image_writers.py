@@ -0,0 +1,131 @@
+"""
+16-bit Image Writers
+
+Pillow only keeps 16-bit samples in single-channel images. Saving a
+16-bit RGB render through it would drop to 8 bits. This module writes
+48-bit RGB files directly:
+
+    write_tiff16   baseline TIFF, uncompressed, interleaved, little-endian
+    write_png16    PNG colour type 2 at bit depth 16 (big-endian), "Up"
+                   filter, zlib-compressed as it goes
+
+Both stream the image in strips of ``rows`` rows, so the only full-size
+buffer is the uint16 render itself.
+"""
+
+import struct
+import zlib
+
+import numpy as np
+
+STRIP_ROWS = 64
+
+FORMATS = {"TIFF 16-BIT": ".tif", "PNG 16-BIT": ".png"}
+
+
+def _check(rgb):
+    if rgb.dtype != np.uint16 or rgb.ndim != 3 or rgb.shape[2] != 3:
+        raise ValueError(f"expected (H, W, 3) uint16, got {rgb.shape} {rgb.dtype}")
+
+
+# ------- TIFF -------
+_SHORT, _LONG, _RATIONAL = 3, 4, 5
+
+
+def write_tiff16(path, rgb, rows=STRIP_ROWS, dpi=300):
+    _check(rgb)
+    h, w, _ = rgb.shape
+    rows = max(1, min(int(rows), h))
+    row_bytes = w * 3 * 2
+    if h * row_bytes > 0xFFFFFFFF - 4096:
+        raise ValueError("image too large for classic TIFF")
+
+    with open(path, "wb") as f:
+        f.write(b"II*\x00\x00\x00\x00\x00")     # IFD offset patched below
+        offsets, counts = [], []
+        for r0 in range(0, h, rows):
+            strip = np.ascontiguousarray(rgb[r0:r0 + rows], dtype="<u2")
+            offsets.append(f.tell())
+            counts.append(strip.nbytes)
+            f.write(memoryview(strip).cast("B"))
+
+        def extra(fmt, values):
+            if f.tell() % 2:
+                f.write(b"\x00")
+            pos = f.tell()
+            f.write(struct.pack("<" + fmt * len(values), *values))
+            return pos
+
+        n = len(offsets)
+        bits = extra("H", [16, 16, 16])
+        offs = extra("I", offsets) if n > 1 else offsets[0]
+        cnts = extra("I", counts) if n > 1 else counts[0]
+        res = extra("I", [int(dpi), 1])
+        entries = [
+            (256, _LONG, 1, w),
+            (257, _LONG, 1, h),
+            (258, _SHORT, 3, bits),
+            (259, _SHORT, 1, 1),            # no compression
+            (262, _SHORT, 1, 2),            # RGB
+            (273, _LONG, n, offs),
+            (277, _SHORT, 1, 3),
+            (278, _LONG, 1, rows),
+            (279, _LONG, n, cnts),
+            (282, _RATIONAL, 1, res),
+            (283, _RATIONAL, 1, res),
+            (284, _SHORT, 1, 1),            # chunky (RGBRGB...)
+            (296, _SHORT, 1, 2),            # inch
+        ]
+        if f.tell() % 2:
+            f.write(b"\x00")
+        ifd = f.tell()
+        f.write(struct.pack("<H", len(entries)))
+        for tag, typ, count, value in entries:
+            if typ == _SHORT and count == 1:
+                f.write(struct.pack("<HHIHH", tag, typ, count, value, 0))
+            else:
+                f.write(struct.pack("<HHII", tag, typ, count, value))
+        f.write(struct.pack("<I", 0))
+        f.seek(4)
+        f.write(struct.pack("<I", ifd))
+
+
+# ------- PNG -------
+def _chunk(f, kind, data):
+    f.write(struct.pack(">I", len(data)))
+    f.write(kind)
+    f.write(data)
+    f.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind)) & 0xFFFFFFFF))
+
+
+def write_png16(path, rgb, rows=STRIP_ROWS, compress_level=6):
+    _check(rgb)
+    h, w, _ = rgb.shape
+    comp = zlib.compressobj(compress_level)
+    prev = np.zeros(w * 6, np.uint8)
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        _chunk(f, b"IHDR", struct.pack(">IIBBBBB", w, h, 16, 2, 0, 0, 0))
+        for r0 in range(0, h, rows):
+            raw = np.ascontiguousarray(rgb[r0:r0 + rows], dtype=">u2").view(np.uint8).reshape(-1, w * 6)
+            lines = np.empty((raw.shape[0], w * 6 + 1), np.uint8)
+            lines[:, 0] = 2                                 # filter type "Up"
+            np.subtract(raw[0], prev, out=lines[0, 1:])     # uint8 wraps mod 256
+            np.subtract(raw[1:], raw[:-1], out=lines[1:, 1:])
+            prev = raw[-1].copy()
+            data = comp.compress(lines.tobytes())
+            if data:
+                _chunk(f, b"IDAT", data)
+        _chunk(f, b"IDAT", comp.flush())
+        _chunk(f, b"IEND", b"")
+
+
+def write(path_stem, rgb, fmt):
+    """Write ``rgb`` as ``fmt`` (a FORMATS key) to path_stem + extension; returns the path"""
+    ext = FORMATS[fmt.upper()]
+    path = path_stem + ext
+    if ext == ".tif":
+        write_tiff16(path, rgb)
+    else:
+        write_png16(path, rgb)
+    return path
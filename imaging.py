@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 import numpy as np
 from PIL import Image
 
@@ -13,6 +14,11 @@ except ImportError:
     ninlab_core = None
     # Silently fall back to Python implementation
 
+# NumPy fallback execution: "fused" runs point-wise stages tile by tile in one
+# pass (fused_pipeline.py) on all render threads (tile_engine.py),
+# "reference" runs each stage over the whole image on one thread
+PIPELINE_MODE = os.environ.get("NINLAB_PIPELINE", "fused")
+
 def clamp01(a):
     """Clamp array to [0, 1] range. In-place when safe."""
     # Only do in-place if array owns its data (not a view)
@@ -28,6 +34,7 @@ DEFAULTS = {
     "clarity":0.0,"texture":0.0,"mid_contrast":0.0,"dehaze":0.0,"denoise":0.0,
     "vignette":0.0,"defringe":0.0,"export_sharpen":0.2,"tone_curve":0.0,"curve_lut":None,
     "grain_amount":0.0,"grain_size":0.5,"grain_roughness":0.5,
+    "grain_seed":None,      # grain pattern; None until the window assigns grain.seed_for(name)
     **{f"h_{c}":0.0 for c in ["red","orange","yellow","green","aqua","blue","purple","magenta"]},
     **{f"s_{c}":0.0 for c in ["red","orange","yellow","green","aqua","blue","purple","magenta"]},
     **{f"l_{c}":0.0 for c in ["red","orange","yellow","green","aqua","blue","purple","magenta"]},
@@ -38,6 +45,30 @@ DEFAULTS = {
     "crop": None,           # dict {"x":..,"y":..,"w":..,"h":..} normalized [0..1] หรือ None
 }
 
+# Per-image identity, not an edit: a seeded but untouched image is still unedited,
+# and presets neither capture nor hand out another image's grain pattern
+IDENTITY_KEYS = ("grain_seed",)
+TRANSFORM_KEYS = ("crop", "rotate", "flip_h")
+
+def is_edited(settings):
+    """True if ``settings`` differ from DEFAULTS in anything but IDENTITY_KEYS"""
+    return any(settings.get(k, v) != v for k, v in DEFAULTS.items() if k not in IDENTITY_KEYS)
+
+def preset_settings(settings):
+    """The look of ``settings`` as a preset: no transforms, no grain pattern"""
+    return {k: v for k, v in settings.items() if k not in TRANSFORM_KEYS + IDENTITY_KEYS}
+
+def apply_preset_settings(settings, preset, include_transform=False):
+    """
+    DEFAULTS < preset < (crop/flip of ``settings`` if include_transform).
+    Rotation and the grain pattern always stay those of ``settings``.
+    """
+    transforms = {k: settings[k] for k in ("crop", "flip_h") if include_transform and k in settings}
+    out = {**DEFAULTS, **{k: v for k, v in preset.items() if k not in IDENTITY_KEYS}, **transforms}
+    out["rotate"] = settings.get("rotate", 0)
+    out["grain_seed"] = settings.get("grain_seed")
+    return out
+
 _COLORS = ["red","orange","yellow","green","aqua","blue","purple","magenta"]
 _COLOR_CENTERS = {"red":0.0,"orange":30.0,"yellow":60.0,"green":120.0,"aqua":180.0,"blue":240.0,"purple":280.0,"magenta":320.0}
 _COLOR_WIDTH = 50.0
@@ -363,50 +394,29 @@ def apply_curve_lut(rgb, lut):
 
 def apply_vignette(rgb, amount=0.0):
     if abs(amount)<1e-6: return rgb
+    import masks
     h,w,_=rgb.shape
-    y,x=np.ogrid[:h,:w]
-    cy, cx = (h-1)/2.0, (w-1)/2.0
-    ry = np.maximum(cy, 1.0); rx = np.maximum(cx, 1.0)
-    dy = (y-cy)/ry; dx=(x-cx)/rx
-    r2 = dx*dx + dy*dy
+    r2 = masks.radial_r2(h, w)  # cached per frame size
     mask = np.clip(1.0 - amount*r2, 0.2, 1.0)
     return clamp01(rgb*mask[...,None])
 
-def apply_film_grain(rgb, amount=0.0, size=0.5, roughness=0.5):
+def apply_film_grain(rgb, amount=0.0, size=0.5, roughness=0.5, seed=None, frame=None):
     """
     Add film grain effect similar to Lightroom
     amount: grain intensity (0-1)
     size: grain size (0=fine, 1=coarse)
     roughness: grain texture (0=smooth, 1=rough)
+    seed: per-image grain pattern ("grain_seed" setting)
+    frame: (frame_h, frame_w, y0, x0) if rgb is a crop of a larger image
+    The grain comes from cached, tileable textures (grain.py), so the same
+    settings always give the same grain.
     """
     if amount <= 1e-6:
         return rgb
-    
+    import grain
     h, w, _ = rgb.shape
-    
-    # Generate noise pattern
-    # Size controls the frequency of noise
-    noise_scale = max(1, int(1 + size * 4))  # 1-5 pixels
-    
-    # Generate base noise at lower resolution
-    noise_h = max(1, h // noise_scale)
-    noise_w = max(1, w // noise_scale)
-    noise = np.random.normal(0, 1, (noise_h, noise_w))
-    
-    # Resize to image size using scipy (much faster than PIL)
-    from scipy.ndimage import zoom
-    zoom_h = h / noise_h
-    zoom_w = w / noise_w
-    noise = zoom(noise, (zoom_h, zoom_w), order=1)  # order=1 is bilinear
-    
-    # Roughness controls the distribution
-    if roughness > 0.5:
-        # More rough = more extreme values
-        power = 1.0 - (roughness - 0.5) * 0.8
-        noise = np.sign(noise) * np.power(np.abs(noise), power)
-    else:
-        # More smooth = more gaussian
-        noise = noise * (0.5 + roughness)
+    fh, fw, y0, x0 = frame or (h, w, 0, 0)
+    noise = grain.sample(grain.texture(size, roughness), seed, y0, y0 + h, x0, x0 + w, fh, fw)
     
     # Apply grain with luminance-based modulation
     # Grain is more visible in midtones
@@ -483,7 +493,74 @@ def _circ_dist(a,b):
 def _color_weight(h, center, width=_COLOR_WIDTH):
     d=_circ_dist(h,center); w=np.clip(1.0-(d/width),0,1); return w*w*(3-2*w)
 
+def _hsl_values(adj):
+    """The 24 mixer settings as a hashable tuple (h, s, l per colour)"""
+    return tuple(float(adj.get(f"{p}_{c}", 0.0)) for c in _COLORS for p in ("h", "s", "l"))
+
+@lru_cache(maxsize=32)
+def _hsl_tables(values):
+    """
+    Per-hue curves for the mixer, sampled at 360 one-degree bins (+1 wrap
+    entry): total hue shift, saturation gain and value delta. Each colour
+    contributes through the same smoothstep weight as the reference mixer.
+    """
+    hue = np.arange(361, dtype=np.float32)
+    shift = np.zeros(361, np.float32); gain = np.ones(361, np.float32); delta = np.zeros(361, np.float32)
+    for i, name in enumerate(_COLORS):
+        dh, ds, dl = values[3*i:3*i+3]
+        w = _color_weight(hue, _COLOR_CENTERS[name]).astype(np.float32)
+        shift += dh * w
+        gain *= np.maximum(0.0, 1.0 + ds * w * 1.5)
+        delta += dl * w * 0.8
+    return shift, gain, delta
+
+def _rgb_to_hsv_flat(rgb):
+    """Branch-free rgb_to_hsv (same tie order: blue over green over red)"""
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    mx = np.maximum(np.maximum(r, g), b); mn = np.minimum(np.minimum(r, g), b)
+    diff = mx - mn
+    safe = np.where(diff > 1e-6, diff, 1.0)
+    is_b = mx == b; is_g = mx == g
+    num = np.where(is_b, r-g, np.where(is_g, b-r, g-b))
+    off = np.where(is_b, np.float32(240), np.where(is_g, np.float32(120), np.float32(360)))
+    h = (60*(num/safe) + off) % 360
+    h = np.where(diff > 1e-6, h, 0.0).astype(np.float32, copy=False)
+    s = np.where(mx > 1e-6, diff / np.where(mx > 1e-6, mx, 1.0), 0.0).astype(np.float32, copy=False)
+    return h, s, mx
+
+def _hsv_to_rgb_flat(h, s, v):
+    """Branch-free hsv_to_rgb: channel = v - v*s*clip(min(k, 4-k), 0, 1)"""
+    h6 = (h % 360) / 60.0
+    vs = v * s
+    out = np.empty(h.shape + (3,), np.float32)
+    for c, n in enumerate((5.0, 3.0, 1.0)):
+        k = h6 + n
+        k -= np.where(k >= 6, np.float32(6), np.float32(0))  # (n + h6) % 6, h6 in [0, 6)
+        out[..., c] = v - vs * np.clip(np.minimum(k, 4 - k), 0, 1)
+    return out
+
 def apply_hsl_mixer(rgb, adj):
+    """
+    HSL mixer via per-hue lookup tables: one HSV conversion, one gather of
+    the three 360-bin curves (linear between bins), one conversion back.
+    Matches apply_hsl_mixer_reference to ~1e-3 except where the reference
+    clips an intermediate saturation/value between two overlapping colours.
+    """
+    values = _hsl_values(adj)
+    if not any(abs(v) > 1e-6 for v in values):
+        return rgb
+    shift, gain, delta = _hsl_tables(values)
+    h, s, v = _rgb_to_hsv_flat(rgb)
+    i = h.astype(np.int32)
+    np.minimum(i, 359, out=i)
+    f = h - i
+    j = i + 1
+    hn = h + (shift[i] + (shift[j] - shift[i]) * f)
+    sn = np.clip(s * (gain[i] + (gain[j] - gain[i]) * f), 0, 1)
+    vn = np.clip(v + (delta[i] + (delta[j] - delta[i]) * f), 0, 1)
+    return _hsv_to_rgb_flat(hn, sn, vn)
+
+def apply_hsl_mixer_reference(rgb, adj):
     # Check if any HSL adjustments are actually active before converting to HSV
     has_adj = False
     _COLOR_CENTERS = {"red":0.0,"orange":30.0,"yellow":60.0,"green":120.0,"aqua":180.0,"blue":240.0,"purple":280.0,"magenta":320.0}
@@ -506,6 +583,13 @@ def apply_hsl_mixer(rgb, adj):
     return hsv_to_rgb(hn,sn,vn)
 
 def pipeline(rgb01, adj, fast_mode=False):
+    """float [0,1] in, float [0,1] out; executed according to PIPELINE_MODE"""
+    if PIPELINE_MODE == "fused":
+        import tile_engine
+        return tile_engine.render(rgb01, adj, fast_mode)
+    return pipeline_reference(rgb01, adj, fast_mode)
+
+def pipeline_reference(rgb01, adj, fast_mode=False):
     # Apply exposure first
     # [CHANGED] Do NOT clamp yet. Allow values > 1.0 for HDR highlights.
     x = rgb01 * (2.0**adj["exposure"])
@@ -546,21 +630,38 @@ def pipeline(rgb01, adj, fast_mode=False):
     # In fast mode, skip heavy final effects
     if not fast_mode:
         x = apply_defringe(x, adj.get("defringe", 0.0))
-        x = apply_film_grain(x, adj.get("grain_amount", 0.0), adj.get("grain_size", 0.5), adj.get("grain_roughness", 0.5))
+        x = apply_film_grain(x, adj.get("grain_amount", 0.0), adj.get("grain_size", 0.5), adj.get("grain_roughness", 0.5),
+                             adj.get("grain_seed"))
     
     # Final clamp to ensure [0,1] range
     return clamp01(x)
 
-def process_image_fast(base_u8, adj, fast_mode=False):
+def process_image_fast(base_u8, adj, fast_mode=False, region=None, lut_size=None, denoise_method=None,
+                       stage_cache=None, out_dtype=np.uint8):
     """
     Wrapper to use Rust extension if available.
     Uses hybrid approach: Rust for pixel-wise ops, Python for convolutions.
     base_u8: uint8 OR uint16 numpy array (H, W, 3)
     adj: dict of settings
+    region: (frame_h, frame_w, y0, x0) if base_u8 is a crop of a larger image
+            (1:1 zoom patch); without tile engine support the vignette is
+            skipped rather than drawn around the crop
+    lut_size: approximate colour/tone stages with baked 3D LUTs of this
+              size (lut3d.py); for live previews, NumPy path only
+    denoise_method: denoise algorithm (denoise.METHODS), None for the
+                    export-quality one; NumPy path only
+    stage_cache: a stage_cache.StageCache to resume from memoized
+                 denoise/clarity/texture outputs; NumPy path only
+    out_dtype: np.uint8, or np.uint16 for 16-bit export (NumPy path; the
+               Rust extension only produces 8-bit)
     """
     is_16bit = (base_u8.dtype == np.uint16)
+    out_16bit = np.dtype(out_dtype) == np.uint16
+    uses_rust = bool(ninlab_core) and not is_16bit and not out_16bit
+    if region is not None and (uses_rust or PIPELINE_MODE != "fused"):
+        adj = dict(adj, vignette=0.0)
     
-    if ninlab_core and not is_16bit:
+    if uses_rust:
         # Hybrid approach: Rust for pixel-wise, Python for convolutions
         try:
             # Rust expects HashMap<String, f32>. Filter out non-float values (like curve_lut which is list/None).
@@ -584,15 +685,22 @@ def process_image_fast(base_u8, adj, fast_mode=False):
                 elif isinstance(lut, np.ndarray):
                     lut_list = lut.astype(np.uint8).tolist()
             
+            # Grain comes from the cached textures (grain.py) on every path,
+            # so preview and export show the same pattern
+            grain_amount = 0.0 if fast_mode else float(adj.get("grain_amount", 0.0))
+            rust_settings["grain_amount"] = 0.0
+            rust_settings.pop("grain_seed", None)
+            
             # Process with Rust (pixel-wise operations)
             result = ninlab_core.process_image(base_u8, rust_settings, lut_list)
             
             # Apply convolution-based effects in Python (not implemented in Rust yet)
-            # Denoise and Film Grain are now in Rust!
-            # Only Clarity and Texture remain in Python
+            # Denoise is now in Rust!
+            # Clarity, Texture and Film Grain remain in Python
             needs_convolution = (
                 abs(adj.get("clarity", 0.0)) > 1e-6 or
-                abs(adj.get("texture", 0.0)) > 1e-6
+                abs(adj.get("texture", 0.0)) > 1e-6 or
+                grain_amount > 1e-6
             )
             
             # In fast mode, skip convolution entirely
@@ -607,6 +715,10 @@ def process_image_fast(base_u8, adj, fast_mode=False):
                 if abs(adj.get("texture", 0.0)) > 1e-6:
                     result_f = apply_texture(result_f, adj["texture"])
                 
+                if grain_amount > 1e-6:
+                    result_f = apply_film_grain(result_f, grain_amount, adj.get("grain_size", 0.5),
+                                                adj.get("grain_roughness", 0.5), adj.get("grain_seed"), region)
+                
                 # Convert back to uint8
                 result = (np.clip(result_f, 0, 1) * 255.0 + 0.5).astype(np.uint8)
             
@@ -617,6 +729,14 @@ def process_image_fast(base_u8, adj, fast_mode=False):
             pass
             
     # Fallback/16-bit Pipeline
+    if PIPELINE_MODE == "fused":
+        # Quantizes tile by tile on all render threads; no full-size float copy
+        if stage_cache is not None:
+            return stage_cache.render(base_u8, adj, fast_mode, out_dtype=out_dtype, frame=region,
+                                      lut_size=lut_size, denoise_method=denoise_method)
+        import tile_engine
+        return tile_engine.render(base_u8, adj, fast_mode, out_dtype=out_dtype, frame=region,
+                                  lut_size=lut_size, denoise_method=denoise_method)
     if is_16bit:
         # High precision pipeline
         src01 = base_u8.astype(np.float32) / 65535.0
@@ -624,10 +744,35 @@ def process_image_fast(base_u8, adj, fast_mode=False):
         src01 = base_u8.astype(np.float32) / 255.0
         
     out01 = pipeline(src01, adj, fast_mode=fast_mode)
+    if out_16bit:
+        return (np.clip(out01,0,1)*65535.0 + 0.5).astype(np.uint16)
     return (np.clip(out01,0,1)*255.0 + 0.5).astype(np.uint8)
 
+def pil_per_channel(arr, op):
+    """
+    Run a PIL image operation on uint8 RGB directly, or on uint16 RGB one
+    channel at a time in float mode "F" (PIL has no 16-bit RGB mode).
+    """
+    if arr.dtype != np.uint16:
+        return np.array(op(Image.fromarray(arr)))
+    chans = [np.array(op(Image.fromarray(np.ascontiguousarray(arr[..., c], dtype=np.float32), "F")))
+             for c in range(arr.shape[2])]
+    out = np.empty(chans[0].shape + (len(chans),), np.uint16)
+    for c, ch in enumerate(chans):
+        np.clip(ch, 0, 65535, out=ch); ch += 0.5
+        out[..., c] = ch
+    return out
+
+def resize_long_edge(arr, long_edge, resample=Image.LANCZOS):
+    """Downscale uint8/uint16 RGB so its long edge is ``long_edge`` (never upscales)"""
+    if not long_edge or long_edge <= 0: return arr
+    h, w = arr.shape[:2]; cur = max(h, w)
+    if cur <= long_edge: return arr
+    s = long_edge/float(cur); nw, nh = int(w*s), int(h*s)
+    return pil_per_channel(arr, lambda im: im.resize((nw, nh), resample))
+
 def apply_transforms(arr_u8, adj):
-    """ใช้ทรานส์ฟอร์ม (หมุน/กลับ/ครอป) หลังแต่งภาพเสร็จ"""
+    """ใช้ทรานส์ฟอร์ม (หมุน/กลับ/ครอป) หลังแต่งภาพเสร็จ; uint8 or uint16 RGB"""
     out = arr_u8
     
     # 1. Apply fine angle adjustment first (for straightening tilted images)
@@ -635,7 +780,7 @@ def apply_transforms(arr_u8, adj):
     if abs(angle) > 1e-6:
         # Positive angle = counterclockwise rotation
         # Use expand=True to show the full rotated image without cropping
-        out = np.array(Image.fromarray(out).rotate(-angle, resample=Image.BICUBIC, expand=True))
+        out = pil_per_channel(out, lambda im: im.rotate(-angle, resample=Image.BICUBIC, expand=True))
     
     # 2. Then apply 90° rotation (รองรับ 0/90/180/270 ได้ทันที, องศาอื่นจะใช้ PIL)
     rot = int(adj.get("rotate", 0)) % 360
@@ -643,7 +788,7 @@ def apply_transforms(arr_u8, adj):
         k = rot // 90
         out = np.rot90(out, k).copy()
     elif rot != 0:
-        out = np.array(Image.fromarray(out).rotate(-rot, resample=Image.BICUBIC, expand=True))
+        out = pil_per_channel(out, lambda im: im.rotate(-rot, resample=Image.BICUBIC, expand=True))
 
     # flip horizontal
     if bool(adj.get("flip_h", False)):
@@ -666,8 +811,9 @@ def apply_transforms(arr_u8, adj):
     # export sharpen (unsharp mask) — ทำหลัง transform
     sh = float(adj.get("export_sharpen", 0.0))
     if sh > 1e-6:
-        out_f = out.astype(np.float32)/255.0
-        out = (apply_unsharp(out_f, sh)*255.0+0.5).astype(np.uint8)
+        scale = 65535.0 if out.dtype == np.uint16 else 255.0
+        out_f = out.astype(np.float32)/scale
+        out = (apply_unsharp(out_f, sh)*scale+0.5).astype(out.dtype)
     return out
 
 def preview_sharpen(arr_u8, amount):
@@ -678,17 +824,30 @@ def preview_sharpen(arr_u8, amount):
     out = clamp01(arr + (arr - blur) * (0.8*amount))
     return (out*255.0+0.5).astype(np.uint8)
 
-def decode_image(path, thumb_size=(72,48)):
+def decode_image(path, thumb_size=(72,48), return_levels=False):
+    """
+    Decode an image file into (full, thumb).
+
+    With return_levels=True also returns the image pyramid (see pyramid.py)
+    as a third element: [level1, level2, ...], smallest last.
+    """
+    full, thumb, levels = _decode_image_levels(path, thumb_size)
+    if return_levels:
+        return full, thumb, levels
+    return full, thumb
+
+def _decode_image_levels(path, thumb_size):
     print(f"📂 decode_image called for: {path}")
     
     # Try loading from cache first
     try:
         from cache_manager import load_from_cache, save_to_cache
-        cached = load_from_cache(path)
-        if cached is not None:
+        from pyramid import levels_from_cache
+        cached = load_from_cache(path, keys=None)
+        if cached is not None and 'full' in cached and 'thumb' in cached:
             # Cache hit!
             print(f"  ✅ Loaded from cache")
-            return cached['full'], cached['thumb']
+            return cached['full'], cached['thumb'], levels_from_cache(cached)
         else:
             print(f"  ⚠️  Cache miss - will decode")
     except Exception as e:
@@ -714,7 +873,7 @@ def decode_image(path, thumb_size=(72,48)):
             except Exception as e:
                 print(f"Failed to open {ext} file: {e}")
                 err_img = create_error_image(thumb_size, f"Failed to open {ext.upper()}:\n{str(e)}")
-                return err_img, err_img
+                return err_img, err_img, []
         elif rawpy is not None:
             # Special handling for Canon CR3 to avoid LibRaw errors and improve performance
             if ext == ".cr3":
@@ -722,156 +881,28 @@ def decode_image(path, thumb_size=(72,48)):
                 full = None
                 best_img = None  # Initialize to prevent NameError
                 
-                # Strategy 1: Smart Binary Scan (PRVW atom / JPEG)
+                # Strategy 1: PRVW preview box located via rawfile (mmap, no LibRaw)
                 try:
-                    import mmap
-                    import struct
-                    from io import BytesIO
-                    
-                    with open(path, 'rb') as f:
-                        # Use mmap for zero-copy searching (much faster than reading 25MB)
-                        # 0 means map the whole file
-                        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
-                            
-                            # Search for PRVW atom (Canon Preview)
-                            prvw_idx = mm.find(b'PRVW')
-                            
-                            if prvw_idx != -1:
-                                # 1. Parsing PRVW Box Size (Standard 32-bit Box)
-                                # Size is the 4 bytes BEFORE 'PRVW'
-                                if prvw_idx >= 4:
-                                    size_val = struct.unpack('>I', mm[prvw_idx-4:prvw_idx])[0]
-                                    
-                                    # Safety check on size
-                                    if 200 < size_val < 50_000_000:
-                                        # Extract ONLY the preview box data
-                                        start_box = prvw_idx - 4
-                                        end_box = start_box + size_val
-                                        
-                                        # Ensure we don't go out of bounds
-                                        if end_box <= mm.size():
-                                            box_data = mm[start_box:end_box]
-                                            
-                                            # Now search for JPEG inside this small buffer
-                                            jpg_start = box_data.find(b'\xff\xd8')
-                                            if jpg_start != -1:
-                                                stream = BytesIO(box_data[jpg_start:])
-                                                img = Image.open(stream)
-                                                if img.width > 320:
-                                                     best_img = img
-            
-            
-                            # Fallback: If no PRVW or parsing failed, do a Deep Scan
-                            if best_img is None:
-                                limit = min(mm.size(), 100 * 1024 * 1024)
-                                search_area = mm[:limit] 
-                                start = 0
-                                
-                                for _ in range(50):
-                                    idx = search_area.find(b'\xff\xd8', start)
-                                    if idx == -1: break
-                                    
-                                    try:
-                                        stream = BytesIO(search_area[idx:])
-                                        img = Image.open(stream)
-                                        
-                                        if img.width > 160:
-                                             pixels = img.width * img.height
-                                             
-                                             if best_img is None:
-                                                 best_img = img
-                                             else:
-                                                 current_pixels = best_img.width * best_img.height
-                                                 if pixels > current_pixels:
-                                                     best_img = img
-                                             
-                                             if best_img.width * best_img.height > 2000000:
-                                                 break
-                                    except:
-                                        pass
-                                        
-                                    start = idx + 2
-                        
-                        if best_img:
-                            # Robust Orientation Handling
-                            # Always use ExifTool for orientation (more reliable than embedded EXIF in CR3 previews)
-                            # PIL's exif_transpose() doesn't work correctly with CR3 preview streams
-                            
-                            # Get orientation from ExifTool
-                            orientation = None
-                            
-                            import subprocess
-                            import json
-                            
-                            exiftool_path = None
-                            possible_locations = [
-                                os.path.join(os.path.dirname(os.path.abspath(__file__)), 'exiftool.exe'),
-                                os.path.join(os.getcwd(), 'exiftool.exe'),
-                                'exiftool.exe',
-                            ]
-                            for loc in possible_locations:
-                                if os.path.isfile(loc):
-                                    exiftool_path = loc
-                                    break
-                            
-                            if exiftool_path:
-                                try:
-                                    # Use -n to get numeric value
-                                    result = subprocess.run(
-                                        [exiftool_path, '-Orientation', '-n', '-j', str(path)],
-                                        capture_output=True,
-                                        text=True,
-                                        timeout=1
-                                    )
-                                    if result.returncode == 0 and result.stdout:
-                                        data = json.loads(result.stdout)[0]
-                                        orientation = data.get('Orientation')
-                                except:
-                                    pass
-                            
-                            # Apply Manual Rotation based on orientation
-                            if orientation:
-                                print(f"  📐 Orientation value: {orientation}")
-                                try:
-                                    val = int(orientation)
-                                    if val == 3: # Rotate 180
-                                        best_img = best_img.rotate(180, expand=True)
-                                        print(f"  🔄 Rotated 180°")
-                                    elif val == 6: # Rotate 90 CW
-                                        best_img = best_img.rotate(270, expand=True)
-                                        print(f"  🔄 Rotated 270° (for orientation 6)")
-                                    elif val == 8: # Rotate 270 CW  
-                                        best_img = best_img.rotate(90, expand=True)
-                                        print(f"  🔄 Rotated 90° (for orientation 8)")
-                                except Exception as e:
-                                    print(f"  ⚠️  Rotation failed: {e}")
-                            else:
-                                print(f"  ⚠️  No orientation found from ExifTool")
-                            
-                            if best_img.mode != "RGB":
-                                best_img = best_img.convert("RGB")
-                                
-                            MAX_PREVIEW_SIZE = 6000
-                            if best_img.width > MAX_PREVIEW_SIZE or best_img.height > MAX_PREVIEW_SIZE:
-                                best_img.thumbnail((MAX_PREVIEW_SIZE, MAX_PREVIEW_SIZE), Image.LANCZOS)
-                                
-                            full = np.array(best_img, dtype=np.uint8)
-                            
+                    best_img = _open_embedded_preview(path, min_width=320)
+                    if best_img is not None:
+                        MAX_PREVIEW_SIZE = 6000
+                        if best_img.width > MAX_PREVIEW_SIZE or best_img.height > MAX_PREVIEW_SIZE:
+                            best_img.thumbnail((MAX_PREVIEW_SIZE, MAX_PREVIEW_SIZE), Image.LANCZOS)
+                        full = np.array(best_img, dtype=np.uint8)
                 except Exception as e_scan:
-                    print(f"Binary scan failed: {e_scan}")
+                    print(f"Embedded preview extraction failed: {e_scan}")
 
                 # Strategy 2: ExifTool (If available)
                 if full is None:
                     try:
-                        import subprocess
-                        for tag in ['-PreviewImage', '-JpgFromRaw', '-ThumbnailImage']:
+                        from exiftool_service import read_binary
+                        for tag in ['PreviewImage', 'JpgFromRaw', 'ThumbnailImage']:
                             try:
-                                res = subprocess.run(['exiftool', '-b', tag, str(path)], 
-                                                  capture_output=True, check=True)
-                                if res.stdout and res.stdout.startswith(b'\xff\xd8'):
+                                data = read_binary(path, tag)
+                                if data and data.startswith(b'\xff\xd8'):
                                     from io import BytesIO
                                     from PIL import ImageOps
-                                    img = Image.open(BytesIO(res.stdout))
+                                    img = Image.open(BytesIO(data))
                                     # Robust Orientation Handling
                                     # 1. Check if the image already has orientation info (Standard PIL)
                                     has_pil_orientation = False
@@ -888,25 +919,10 @@ def decode_image(path, thumb_size=(72,48)):
                                     if has_pil_orientation:
                                         img = ImageOps.exif_transpose(img)
                                         
-                                    # 3. If PIL didn't see orientation, find it externally
+                                    # 3. If PIL didn't see orientation, read it from the RAW container
                                     else:
-                                        orientation = None
-                                        
-                                        # Try ExifTool on the main file
-                                        try:
-                                            if exiftool_path: # Re-use path
-                                                # Use -n to get numeric value
-                                                result = subprocess.run(
-                                                    [exiftool_path, '-Orientation', '-n', '-j', str(path)],
-                                                    capture_output=True,
-                                                    text=True,
-                                                    timeout=1
-                                                )
-                                                if result.returncode == 0 and result.stdout:
-                                                    data = json.loads(result.stdout)[0]
-                                                    orientation = data.get('Orientation')
-                                        except:
-                                            pass
+                                        # Orientation from the CR3's own IFD0 (CMT1 box)
+                                        orientation = _raw_orientation(path)
                                         
                                         # 4. Apply Manual Rotation based on external orientation
                                         if orientation:
@@ -943,54 +959,29 @@ def decode_image(path, thumb_size=(72,48)):
                                 user_sat=None,
                                 output_bps=16
                             )
+                             libraw_flip = raw.sizes.flip
                         
                         # Auto-rotate based on EXIF orientation
-                        # Read orientation from file using ExifTool
+                        # LibRaw already applies the orientation it finds (sizes.flip);
+                        # only correct files where it found none. In-process reader first.
                         try:
-                            import subprocess
-                            import json
-                            
-                            # Find exiftool
-                            exiftool_path = None
-                            possible_locations = [
-                                os.path.join(os.path.dirname(os.path.abspath(__file__)), 'exiftool.exe'),
-                                os.path.join(os.getcwd(), 'exiftool.exe'),
-                                'exiftool.exe',
-                            ]
-                            for loc in possible_locations:
-                                if os.path.isfile(loc):
-                                    exiftool_path = loc
-                                    break
-                            
-                            if exiftool_path:
-                                result = subprocess.run(
-                                    [exiftool_path, '-Orientation', '-j', str(path)],
-                                    capture_output=True,
-                                    text=True,
-                                    timeout=2
-                                )
-                                
-                                if result.returncode == 0 and result.stdout:
-                                    data = json.loads(result.stdout)[0]
-                                    orientation = data.get('Orientation', '')
-                                    
-                                    # Rotate based on orientation
-                                    if 'Rotate 90 CW' in orientation or orientation == 6:
-                                        full = np.rot90(full, k=-1)
-                                        print(f"  🔄 Rotated 90° CW")
-                                    elif 'Rotate 270 CW' in orientation or orientation == 8:
-                                        full = np.rot90(full, k=1)
-                                        print(f"  🔄 Rotated 270° CW (90° CCW)")
-                                    elif 'Rotate 180' in orientation or orientation == 3:
-                                        full = np.rot90(full, k=2)
-                                        print(f"  🔄 Rotated 180°")
+                            orientation = _lookup_orientation(path) if not libraw_flip else 1
+                            if orientation == 6:
+                                full = np.rot90(full, k=-1)
+                                print(f"  🔄 Rotated 90° CW")
+                            elif orientation == 8:
+                                full = np.rot90(full, k=1)
+                                print(f"  🔄 Rotated 270° CW (90° CCW)")
+                            elif orientation == 3:
+                                full = np.rot90(full, k=2)
+                                print(f"  🔄 Rotated 180°")
                         except Exception as e:
                             print(f"  ⚠️  Could not apply rotation: {e}")
                             
                     except Exception as e:
                         print(f"CR3 decode failed: {e}")
                         err_img = create_error_image(thumb_size, f"CR3 Error:\n{str(e)}")
-                        return err_img, err_img
+                        return err_img, err_img, []
 
             else:
                 # Normal handling for other RAWs (ARW, NEF, etc)
@@ -1003,88 +994,58 @@ def decode_image(path, thumb_size=(72,48)):
                             user_sat=None,
                             output_bps=16
                         )
+                        libraw_flip = raw.sizes.flip
                     
                     # Auto-rotate based on EXIF orientation
-                    # Read orientation from file using ExifTool
+                    # LibRaw already applies the orientation it finds (sizes.flip);
+                    # only correct files where it found none. In-process reader first.
                     try:
-                        import subprocess
-                        import json
-                        
-                        # Find exiftool
-                        exiftool_path = None
-                        possible_locations = [
-                            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'exiftool.exe'),
-                            os.path.join(os.getcwd(), 'exiftool.exe'),
-                            'exiftool.exe',
-                        ]
-                        for loc in possible_locations:
-                            if os.path.isfile(loc):
-                                exiftool_path = loc
-                                break
-                        
-                        if exiftool_path:
-                            result = subprocess.run(
-                                [exiftool_path, '-Orientation', '-j', str(path)],
-                                capture_output=True,
-                                text=True,
-                                timeout=2
-                            )
-                            
-                            if result.returncode == 0 and result.stdout:
-                                data = json.loads(result.stdout)[0]
-                                orientation = data.get('Orientation', '')
-                                
-                                # Rotate based on orientation
-                                if 'Rotate 90 CW' in orientation or orientation == 6:
-                                    full = np.rot90(full, k=-1)
-                                    print(f"  🔄 Rotated 90° CW")
-                                elif 'Rotate 270 CW' in orientation or orientation == 8:
-                                    full = np.rot90(full, k=1)
-                                    print(f"  🔄 Rotated 270° CW (90° CCW)")
-                                elif 'Rotate 180' in orientation or orientation == 3:
-                                    full = np.rot90(full, k=2)
-                                    print(f"  🔄 Rotated 180°")
+                        orientation = _lookup_orientation(path) if not libraw_flip else 1
+                        if orientation == 6:
+                            full = np.rot90(full, k=-1)
+                            print(f"  🔄 Rotated 90° CW")
+                        elif orientation == 8:
+                            full = np.rot90(full, k=1)
+                            print(f"  🔄 Rotated 270° CW (90° CCW)")
+                        elif orientation == 3:
+                            full = np.rot90(full, k=2)
+                            print(f"  🔄 Rotated 180°")
                     except Exception as e:
                         print(f"  ⚠️  Could not apply rotation: {e}")
                         
                 except Exception as e:
                     print(f"RAW decode failed: {e}")
                     err_img = create_error_image(thumb_size, f"RAW Error:\n{str(e)}")
-                    return err_img, err_img
+                    return err_img, err_img, []
         else:
             err_img = create_error_image(thumb_size, "RAW support requires 'rawpy'")
-            return err_img, err_img
+            return err_img, err_img, []
 
         # Generate 8-bit thumbnail
         try:
             # Safety check
             if full is None:
                 err_img = create_error_image(thumb_size, "Decoding failed: No image data")
-                return err_img, err_img
+                return err_img, err_img, []
             
-            if full.dtype == np.uint16:
-                # Simple compression for thumbnail
-                thumb_arr = (full >> 8).astype(np.uint8)
-            else:
-                thumb_arr = full
-                
-            thumb=Image.fromarray(thumb_arr).copy()
-            thumb.thumbnail(thumb_size, Image.BILINEAR)
-            thumb=np.array(thumb,dtype=np.uint8)
+            from pyramid import build_pyramid
+            levels = build_pyramid(full)
+            thumb = _make_thumb(full, levels, thumb_size)
         except Exception as e:
             print(f"Thumbnail generation failed: {e}")
             err_img = create_error_image(thumb_size, f"Thumbnail error:\n{str(e)}")
-            return err_img, err_img
+            return err_img, err_img, []
         
         # Save to cache for next time
         try:
             from cache_manager import save_to_cache
-            save_to_cache(path, full, thumb)
+            from pyramid import level_keys
+            save_to_cache(path, full, thumb, extra_arrays=level_keys(levels))
         except Exception:
             # Cache save failed, but decoding succeeded - continue
             pass
         
-        return full, thumb
+        return full, thumb, levels
     
     except Exception as e:
         # Master exception handler
@@ -1093,7 +1054,197 @@ def decode_image(path, thumb_size=(72,48)):
         print(f"   Error: {str(e)}")
         print(f"   Traceback:\n{traceback.format_exc()}")
         err_img = create_error_image(thumb_size, f"Error:\n{str(e)}")
-        return err_img, err_img
+        return err_img, err_img, []
+
+RAW_EXTENSIONS = ('.cr3', '.arw', '.nef', '.dng', '.orf', '.raf', '.rw2', '.cr2', '.nrw', '.srw')
+
+# Smallest embedded preview accepted as a culling proxy; smaller ones are
+# thumbnails and the RAW is demosaiced instead
+PROXY_MIN_EDGE = 1024
+
+_ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+def _make_thumb(full, levels, thumb_size):
+    """8-bit thumbnail from the smallest pyramid level that covers thumb_size"""
+    from pyramid import select_level
+    thumb_src = select_level(full, levels, max(thumb_size))
+    if thumb_src.dtype == np.uint16:
+        # Simple compression for thumbnail
+        thumb_src = (thumb_src >> 8).astype(np.uint8)
+    thumb = Image.fromarray(np.ascontiguousarray(thumb_src)).copy()
+    thumb.thumbnail(thumb_size, Image.BILINEAR)
+    return np.array(thumb, dtype=np.uint8)
+
+def _raw_orientation(path):
+    """EXIF orientation (1-8) read in-process from the file itself"""
+    try:
+        from rawfile import read_exif_file
+        return read_exif_file(path).get("Orientation", 1)
+    except Exception:
+        return 1
+
+def _lookup_orientation(path):
+    """EXIF orientation (1-8): in-process reader, exiftool only as a last resort"""
+    try:
+        from rawfile import read_exif_file
+        tags = read_exif_file(path)
+        if "Orientation" in tags:
+            return tags["Orientation"]
+    except Exception:
+        pass
+    from exiftool_service import read_tags
+    data = read_tags(path, ['Orientation'], numeric=True)
+    try:
+        return int(data.get('Orientation', 1)) if data else 1
+    except (TypeError, ValueError):
+        return 1
+
+def _open_embedded_preview(path, min_long_edge=None, draft_size=None, min_width=0):
+    """
+    Open the embedded JPEG of a RAW file as an upright RGB PIL image.
+
+    Picks the largest preview, or with ``min_long_edge`` the smallest one that
+    still covers it. Returns None if the file has no usable preview.
+    """
+    from io import BytesIO
+    from PIL import ImageOps
+    from rawfile import extract_preview
+    data, orientation = extract_preview(path, min_long_edge)
+    if data is None:
+        return None
+    img = Image.open(BytesIO(data))
+    if img.width < min_width:
+        return None
+    if draft_size:
+        # libjpeg decodes at 1/2..1/8 scale directly
+        img.draft('RGB', draft_size)
+    if orientation != 1:
+        # The container's orientation wins; embedded JPEGs are stored unrotated
+        img = img.convert("RGB").transpose(_ORIENTATION_TRANSPOSE[orientation])
+    else:
+        # RAF (and some others) carry the orientation in the JPEG's own EXIF
+        img = ImageOps.exif_transpose(img).convert("RGB")
+    return img
+
+def decode_proxy(path, thumb_size=(72,48)):
+    """
+    Decode for culling: the largest embedded JPEG of a RAW instead of a demosaic.
+
+    Returns (full, thumb, levels, is_proxy). The real decode is returned
+    (is_proxy False) when it is already cached, for non-RAW files, and for RAWs
+    without a preview of at least PROXY_MIN_EDGE. CR3 already decodes from
+    its preview and is never a proxy. Proxies are cached under the "proxy"
+    variant so they never shadow the real decode.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in RAW_EXTENSIONS or ext == ".cr3":
+        full, thumb, levels = _decode_image_levels(path, thumb_size)
+        return full, thumb, levels, False
+
+    from cache_manager import load_from_cache, save_to_cache
+    from pyramid import build_pyramid, level_keys, levels_from_cache
+    cached = load_from_cache(path, keys=None)
+    if cached is not None and 'full' in cached and 'thumb' in cached:
+        return cached['full'], cached['thumb'], levels_from_cache(cached), False
+    cached = load_from_cache(path, keys=None, variant="proxy")
+    if cached is not None and 'full' in cached and 'thumb' in cached:
+        print(f"  ✅ Proxy loaded from cache: {path}")
+        return cached['full'], cached['thumb'], levels_from_cache(cached), True
+
+    img = None
+    try:
+        img = _open_embedded_preview(path)
+    except Exception as e:
+        print(f"  ⚠️  Embedded preview failed for {path}: {e}")
+    if img is None or max(img.size) < PROXY_MIN_EDGE:
+        full, thumb, levels = _decode_image_levels(path, thumb_size)
+        return full, thumb, levels, False
+
+    full = np.array(img, dtype=np.uint8)
+    levels = build_pyramid(full)
+    thumb = _make_thumb(full, levels, thumb_size)
+    save_to_cache(path, full, thumb, extra_arrays=level_keys(levels), variant="proxy")
+    print(f"  ⚡ Using embedded preview {full.shape[1]}x{full.shape[0]} as proxy: {path}")
+    return full, thumb, levels, True
+
+def _apply_raw_flip(img, flip):
+    """Rotate a PIL image according to LibRaw's sizes.flip (0/3/5/6)"""
+    if flip == 3:
+        return img.rotate(180, expand=True)
+    if flip == 5:
+        return img.rotate(90, expand=True)
+    if flip == 6:
+        return img.rotate(270, expand=True)
+    return img
+
+def load_thumbnail(path, thumb_size=(256,170)):
+    """
+    Fast thumbnail for library/filmstrip without a demosaic.
+
+    Order: disk cache -> embedded JPEG (RAW) / draft-mode decode (JPEG, PNG,
+    TIFF) -> full decode_image as a last resort. Thumbnails produced here are
+    written to the disk cache so the next project open is a pure cache hit.
+    Returns a uint8 (H, W, 3) array.
+    """
+    try:
+        from cache_manager import load_from_cache
+        cached = load_from_cache(path, keys=("thumb",))
+        if cached is not None:
+            return cached['thumb']
+    except Exception:
+        pass
+
+    thumb = None
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        from PIL import ImageOps
+        img = None
+        if ext in RAW_EXTENSIONS:
+            # Smallest embedded JPEG that covers the thumbnail, straight from the file
+            img = _open_embedded_preview(path, min_long_edge=max(thumb_size),
+                                         draft_size=(thumb_size[0] * 2, thumb_size[1] * 2))
+        if img is None and ext in RAW_EXTENSIONS and rawpy is not None:
+            from io import BytesIO
+            with rawpy.imread(path) as raw:
+                emb = raw.extract_thumb()
+                flip = raw.sizes.flip
+            if emb.format == rawpy.ThumbFormat.JPEG:
+                img = Image.open(BytesIO(emb.data))
+                img.draft('RGB', (thumb_size[0] * 2, thumb_size[1] * 2))
+                img = _apply_raw_flip(img.convert("RGB"), flip)
+            elif emb.format == rawpy.ThumbFormat.BITMAP:
+                img = _apply_raw_flip(Image.fromarray(emb.data), flip)
+        elif ext in (".jpg", ".jpeg", ".png", ".tif", ".tiff"):
+            img = Image.open(path)
+            # JPEG: let libjpeg decode at 1/2..1/8 scale directly
+            img.draft('RGB', (thumb_size[0] * 2, thumb_size[1] * 2))
+            img = ImageOps.exif_transpose(img)
+        if img is not None:
+            img = img.convert("RGB")
+            img.thumbnail(thumb_size, Image.BILINEAR)
+            thumb = np.array(img, dtype=np.uint8)
+    except Exception as e:
+        print(f"  ⚠️  Fast thumbnail failed for {path}: {e}")
+
+    if thumb is None:
+        # No embedded preview: fall back to a full decode (also fills the cache)
+        _, thumb = decode_image(path, thumb_size)
+        return thumb
+
+    try:
+        from cache_manager import save_to_cache
+        save_to_cache(path, None, thumb)
+    except Exception:
+        pass
+    return thumb
 
 def get_image_metadata(path):
     """
@@ -1118,22 +1269,21 @@ def get_image_metadata(path):
         ext = os.path.splitext(path)[1].lower()
         
         # Use exiftool for RAW files (best support for all RAW formats including CR3)
-        if ext in ('.arw', '.cr2', '.cr3', '.nef', '.dng', '.orf', '.raf', '.rw2'):
+        if ext in RAW_EXTENSIONS:
             try:
-                import subprocess
-                import json
-                
-                # Try to use exiftool (if installed)
-                result = subprocess.run(
-                    ['exiftool', '-j', '-Model', '-ISO', '-FNumber', '-ExposureTime', 
-                     '-LensModel', '-DateTimeOriginal', '-ImageWidth', '-ImageHeight', path],
-                    capture_output=True,
-                    text=True,
-                    timeout=5
-                )
+                # In-process EXIF reader first (microseconds, no subprocess)
+                from rawfile import read_exif_file
+                data = read_exif_file(path)
+                if not all(k in data for k in ('Model', 'ISO', 'ExposureTime', 'FNumber')):
+                    # Last resort: the shared exiftool process for what is missing
+                    from exiftool_service import read_tags
+                    extra = read_tags(path, ['Model', 'ISO', 'FNumber', 'ExposureTime',
+                                             'LensModel', 'DateTimeOriginal', 'ImageWidth', 'ImageHeight'])
+                    if extra is None and not data:
+                        raise FileNotFoundError("exiftool not available")
+                    data = {**(extra or {}), **data}
                 
-                if result.returncode == 0 and result.stdout:
-                    data = json.loads(result.stdout)[0]
+                if data:
                     
                     if 'Model' in data:
                         meta["Camera"] = str(data['Model']).strip()
@@ -1236,74 +1386,13 @@ def get_image_metadata(path):
                             meta["Date"] = str(tags['Image DateTime'])
                 except:
                     pass
-            except (subprocess.TimeoutExpired, Exception) as e:
+            except Exception as e:
                 print(f"exiftool error: {e}, falling back to rawpy")
     except:
         pass
             
-    # For RAW files: Try ExifTool first (if available), then fallback to embedded EXIF
-    RAW_EXTENSIONS = ('.cr3', '.arw', '.nef', '.dng', '.orf', '.raf', '.rw2', '.cr2', '.nrw')
+    # For RAW files: ExifTool already ran above; fall back to embedded EXIF
     if ext in RAW_EXTENSIONS:
-        # Try to find ExifTool
-        exiftool_path = None
-        import os
-        possible_locations = [
-            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'exiftool.exe'),  # Same dir as imaging.py
-            os.path.join(os.getcwd(), 'exiftool.exe'),  # Current working directory
-            'exiftool.exe',  # In PATH
-            'exiftool',  # In PATH (no .exe)
-        ]
-        
-        for loc in possible_locations:
-            if os.path.isfile(loc):
-                exiftool_path = loc
-                break
-        
-        # Try ExifTool if found
-        if exiftool_path:
-            print(f"🔍 Using ExifTool for metadata: {ext.upper()}")
-            try:
-                import subprocess
-                import json
-                
-                result = subprocess.run(
-                    [exiftool_path, '-j', '-Model', '-ISO', '-ExposureTime', '-FNumber',
-                     '-LensModel', '-DateTimeOriginal', '-ImageWidth', '-ImageHeight', str(path)],
-                    capture_output=True,
-                    text=True,
-                    timeout=5
-                )
-                
-                if result.returncode == 0 and result.stdout:
-                    data = json.loads(result.stdout)[0]
-                    
-                    if 'Model' in data:
-                        meta["Camera"] = str(data['Model']).strip()
-                        print(f"  ✓ Camera: {meta['Camera']}")
-                    if 'ISO' in data:
-                        meta["ISO"] = str(data['ISO'])
-                        print(f"  ✓ ISO: {meta['ISO']}")
-                    if 'ExposureTime' in data:
-                        exp = data['ExposureTime']
-                        meta["Shutter"] = f"{exp}s" if isinstance(exp, str) and '/' in exp else f"{exp}s"
-                        print(f"  ✓ Shutter: {meta['Shutter']}")
-                    if 'FNumber' in data:
-                        meta["Aperture"] = f"f/{data['FNumber']}"
-                        print(f"  ✓ Aperture: {meta['Aperture']}")
-                    if 'LensModel' in data:
-                        meta["Lens"] = str(data['LensModel']).strip()
-                        print(f"  ✓ Lens: {meta['Lens']}")
-                    if 'DateTimeOriginal' in data:
-                        meta["Date"] = str(data['DateTimeOriginal'])
-                        print(f"  ✓ Date: {meta['Date']}")
-                    if 'ImageWidth' in data and 'ImageHeight' in data:
-                        meta["Dimensions"] = f"{data['ImageWidth']} x {data['ImageHeight']}"
-                        print(f"  ✓ Dimensions: {meta['Dimensions']}")
-                else:
-                    print(f"  ⚠️  ExifTool returned no data")
-            except Exception as e:
-                print(f"  ⚠️  ExifTool failed: {e}")
-        
         # Fallback: Extract EXIF from embedded JPEG preview
         if meta["Camera"] == "-" or meta["ISO"] == "-":
             print(f"🔍 Attempting EXIF extraction from embedded preview for {ext.upper()}: {path}")
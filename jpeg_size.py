@@ -0,0 +1,160 @@
+"""
+JPEG Size Targeting
+
+"Limit File Size To" used to binary-search the JPEG quality with up to
+about seven full-size encodes, then encode the winner once more to save
+it. Here:
+
+* probes are encoded from a mosaic of TILE x TILE blocks taken evenly
+  across the image (about SAMPLE_PIXELS in total). Full-resolution
+  blocks keep the image's detail statistics, which a downscale would
+  not. The probe size, scaled by the pixel ratio, predicts the full-size
+  file size;
+* the first probe is at the requested quality. If the prediction fits,
+  that quality is used. Otherwise the next probe fits a line through
+  log(size) against log(IJG quantizer scale), which is close to straight
+  over the useful range, and solves for the quality that hits SAFETY x
+  the limit. Each pick is checked with a probe; a miss corrects the line
+  and lowers the pick (at most MAX_PROBES probes);
+* the full image is encoded once, at the checked quality, and those bytes
+  are what gets written. Only if the mosaic misjudged the full image and
+  the bytes are over the limit is the measured size used to correct the
+  model for a second encode;
+* when even MIN_QUALITY would be too large, the image is downscaled to
+  fit and the search repeats on the smaller image.
+
+``stats`` records full-size encodes ("encodes"), sample encodes
+("probes"), the chosen quality and whether the image was resized.
+"""
+
+import io
+import math
+
+import numpy as np
+
+SAMPLE_PIXELS = 1 << 18     # probe mosaic size
+TILE = 64                   # multiple of the 16 px 4:2:0 MCU
+HEADER_BYTES = 600          # markers and tables, independent of image size
+SAFETY = 0.95               # aim this far under the limit
+MIN_QUALITY = 1
+MAX_RESIZES = 4
+MAX_PROBES = 4              # mosaic encodes per size tried
+
+
+def quality_scale(q):
+    """IJG quantization scale (percent) for Pillow quality ``q``"""
+    q = max(1.0, min(100.0, float(q)))
+    return 5000.0 / q if q < 50 else max(200.0 - 2.0 * q, 1.0)
+
+
+def quality_for_scale(scale):
+    """Inverse of quality_scale (not rounded)"""
+    return 5000.0 / scale if scale > 100.0 else (200.0 - scale) / 2.0
+
+
+def encode(img, quality, save_kwargs):
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", **dict(save_kwargs, quality=int(quality)))
+    return buf.getvalue()
+
+
+def sample(arr, pixels=SAMPLE_PIXELS, tile=TILE):
+    """(mosaic of tile x tile blocks spread over ``arr``, full pixels / mosaic pixels)"""
+    h, w = arr.shape[:2]
+    if h * w <= 2 * pixels or h < tile or w < tile:
+        return arr, 1.0
+    n = max(1, int(math.sqrt(pixels / float(tile * tile))))
+    ny, nx = min(n, h // tile), min(n, w // tile)
+    ys = np.linspace(0, h - tile, ny).astype(int)
+    xs = np.linspace(0, w - tile, nx).astype(int)
+    rows = [np.concatenate([arr[y:y + tile, x:x + tile] for x in xs], axis=1) for y in ys]
+    mosaic = np.ascontiguousarray(np.concatenate(rows, axis=0))
+    return mosaic, (h * w) / float(mosaic.shape[0] * mosaic.shape[1])
+
+
+def model(points):
+    """
+    (size(q), quality(size)) through one or two (quality, bytes) points, with
+    log(bytes) linear in log(quantizer scale); one point assumes slope -1.
+    """
+    q1, s1 = points[0]
+    x1 = math.log(quality_scale(q1))
+    slope = -1.0
+    if len(points) > 1:
+        q2, s2 = points[1]
+        dx = math.log(quality_scale(q2)) - x1
+        if abs(dx) > 1e-9 and s2 != s1:
+            slope = min((math.log(s2) - math.log(s1)) / dx, -0.05)
+
+    def size(q):
+        return math.exp(math.log(s1) + slope * (math.log(quality_scale(q)) - x1))
+
+    def quality(nbytes):
+        return quality_for_scale(math.exp(x1 + (math.log(nbytes) - math.log(s1)) / slope))
+    return size, quality
+
+
+def fit(arr, target_bytes, save_kwargs, stats=None):
+    """
+    Encode uint8 RGB ``arr`` as JPEG within ``target_bytes`` at the highest
+    quality the model predicts, up to save_kwargs["quality"]. Returns the bytes.
+    """
+    from PIL import Image
+    stats = stats if stats is not None else {}
+    stats.setdefault("encodes", 0)
+    stats.setdefault("probes", 0)
+    stats["resized"] = None
+    max_q = max(MIN_QUALITY, min(100, int(save_kwargs.get("quality", 92))))
+    aim = target_bytes * SAFETY
+
+    def clamp(q, hi=max_q):
+        return int(max(MIN_QUALITY, min(hi, math.floor(q))))
+
+    for _ in range(MAX_RESIZES):
+        img = Image.fromarray(arr)
+        mosaic, ratio = sample(arr)
+        probe_img = img if mosaic is arr else Image.fromarray(mosaic)
+
+        def probe(q):
+            stats["probes"] += 1
+            return HEADER_BYTES + max(len(encode(probe_img, q, save_kwargs)) - HEADER_BYTES, 1) * ratio
+
+        def nearest():
+            # the model through the two probes closest to the target
+            return model(sorted(points, key=lambda p: abs(math.log(p[1] / aim)))[:2])
+
+        points = [(max_q, probe(max_q))]
+        while points[-1][1] > aim and len(points) < MAX_PROBES:
+            lowest_q = min(p[0] for p in points)
+            q = nearest()[1](aim)
+            if q < MIN_QUALITY or lowest_q <= MIN_QUALITY:
+                break
+            q = clamp(q, lowest_q - 1)
+            points.append((q, probe(q)))
+        size, quality = nearest()
+        fits = [p[0] for p in points if p[1] <= aim]
+        q = max(fits) if fits else quality(aim)
+        too_big = None
+        if not fits and q < MIN_QUALITY + 1:
+            lowest = dict(points).get(MIN_QUALITY) or probe(MIN_QUALITY)
+            if lowest > aim:
+                too_big = lowest
+        if too_big is None:
+            q = clamp(q)
+            data = encode(img, q, save_kwargs); stats["encodes"] += 1
+            if len(data) > target_bytes and q > MIN_QUALITY:
+                # the mosaic misjudged the full image: scale the probe model by the miss
+                q = clamp(quality(aim * size(q) / len(data)), q - 1)
+                data = encode(img, q, save_kwargs); stats["encodes"] += 1
+            if len(data) <= target_bytes:
+                stats["quality"] = q
+                return data
+            too_big = len(data)
+        # even the lowest quality tried is too large: downscale and search again
+        s = min(0.9, math.sqrt(max(aim - HEADER_BYTES, 1) / max(too_big - HEADER_BYTES, 1)))
+        h, w = arr.shape[:2]
+        arr = np.array(img.resize((max(16, int(w * s)), max(16, int(h * s))), Image.LANCZOS))
+        stats["resized"] = arr.shape[:2]
+    data = encode(Image.fromarray(arr), MIN_QUALITY, save_kwargs); stats["encodes"] += 1
+    stats["quality"] = MIN_QUALITY
+    return data
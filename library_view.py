@@ -1,4 +1,4 @@
-from PySide6.QtCore import Qt, Signal, QSize
+from PySide6.QtCore import Qt, Signal, QSize, QTimer
 from PySide6.QtWidgets import QListWidget, QListWidgetItem, QAbstractItemView, QWidget, QVBoxLayout, QFrame, QHBoxLayout
 from PySide6.QtGui import QIcon, QPixmap
 
@@ -14,6 +14,8 @@ class LibraryView(QWidget):
     # Signals for Copy/Paste Settings
     sig_copy_settings = Signal()
     sig_paste_settings = Signal()
+    # Emitted (debounced) when the set of on-screen items may have changed
+    sig_visible_changed = Signal()
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -39,6 +41,13 @@ class LibraryView(QWidget):
         self.grid.setContextMenuPolicy(Qt.CustomContextMenu)
         self.grid.customContextMenuRequested.connect(self._show_context_menu)
         
+        # Scrolling re-prioritizes decodes; debounce so a fling is one update
+        self._visible_timer = QTimer(self)
+        self._visible_timer.setSingleShot(True)
+        self._visible_timer.setInterval(120)
+        self._visible_timer.timeout.connect(self.sig_visible_changed.emit)
+        self.grid.verticalScrollBar().valueChanged.connect(lambda _v: self._visible_timer.start())
+        
         # --- Generate Checkbox Icons for Styling ---
         import os
         from PySide6.QtGui import QPainter, QPen, QColor, QImage, QPainterPath
@@ -145,6 +154,35 @@ class LibraryView(QWidget):
     def clear(self):
         self.grid.clear()
 
+    def visible_names(self):
+        """Names of the items currently on screen in the grid"""
+        view = self.grid.viewport().rect()
+        names = []
+        for i in range(self.grid.count()):
+            it = self.grid.item(i)
+            if not it.isHidden() and self.grid.visualItemRect(it).intersects(view):
+                names.append(it.data(Qt.UserRole))
+        return names
+
+    def free_visible_slots(self):
+        """How many more items would still land on screen if appended now"""
+        view = self.grid.viewport().rect()
+        n = self.grid.count()
+        if n == 0:
+            icon = self.grid.iconSize()
+            cols = max(1, view.width() // (icon.width() + self.grid.spacing() * 2))
+            rows = max(1, view.height() // (icon.height() + 40) + 1)
+            return cols * rows
+        last = self.grid.visualItemRect(self.grid.item(n - 1))
+        if not last.intersects(view):
+            return 0
+        cell_w = max(1, last.width() + self.grid.spacing())
+        cell_h = max(1, last.height() + self.grid.spacing())
+        cols = max(1, view.width() // cell_w)
+        rest_of_row = max(0, cols - 1 - last.x() // cell_w)
+        rows_below = max(0, (view.bottom() - last.bottom()) // cell_h + 1)
+        return rest_of_row + cols * rows_below
+
     def set_selection(self, index):
         if index < 0 or index >= self.grid.count(): return
         self.grid.setCurrentRow(index)
@@ -0,0 +1,230 @@
+"""
+3D LUT Baking
+
+Every run of colour/tone stages in the pipeline that depends only on the
+pixel's own RGB (exposure, white balance, tone regions, dehaze,
+saturation/vibrance, contrast/gamma, curve, mid-contrast, HSL mixer,
+defringe) is a function R^3 -> R^3. Instead of running a dozen full-frame
+passes, each such run is evaluated once on an N^3 grid (33^3 = 35,937
+points) and applied with one interpolated lookup per pixel. Neighbourhood
+stages (denoise, clarity, texture), the position-dependent vignette and
+film grain are not baked; they split the chain into several LUTs and run
+as usual in between.
+
+Tables are cached by a hash of the settings that shape them, so dragging
+e.g. the clarity slider reuses the colour LUTs, and dragging saturation
+costs one rebuild plus one lookup pass.
+
+Accuracy: a LUT approximates the exact pipeline between grid points. With
+tetrahedral interpolation on 33^3 the 8-bit result is on average within
+0.1 code values, but isolated pixels near sharp features (HSL hue shifts
+close to grey, the HDR knee) can be off by tens of values. Live slider
+drags therefore render through LUTs; settled previews and export render
+exactly.
+
+``write_cube`` saves a LUT in the Adobe/Resolve ``.cube`` format.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import fused_pipeline
+
+PREVIEW_LUT_SIZE = 33
+EXPORT_LUT_SIZE = 65
+MAX_CACHED = 16
+
+# Settings that only decide where a baked run ends (not what is in it)
+_SPLIT_KEYS = ("denoise", "clarity", "texture", "vignette",
+               "grain_amount", "grain_size", "grain_roughness")
+# Geometry, output sharpening and the grain pattern never reach a baked run
+_IGNORED_KEYS = ("angle", "rotate", "flip_h", "crop", "export_sharpen", "grain_seed")
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+stats = {"hits": 0, "bakes": 0}
+
+
+def settings_key(adj, fast_mode=False):
+    """Hashable key of everything that shapes the baked tables"""
+    items = []
+    for k in sorted(adj):
+        if k in _IGNORED_KEYS:
+            continue
+        v = adj[k]
+        if k in _SPLIT_KEYS:
+            v = abs(float(v)) > 1e-6
+        elif isinstance(v, np.ndarray):
+            v = tuple(v.ravel().tolist())
+        elif isinstance(v, list):
+            v = tuple(v)
+        try:
+            hash(v)
+        except TypeError:
+            v = repr(v)
+        items.append((k, v))
+    return (tuple(items), bool(fast_mode))
+
+
+def identity(size):
+    """(N, N, N, 3) float32 grid; lut[r, g, b] = (r, g, b) / (N - 1)"""
+    axis = np.linspace(0.0, 1.0, size, dtype=np.float32)
+    r, g, b = np.meshgrid(axis, axis, axis, indexing="ij")
+    return np.stack([r, g, b], axis=-1)
+
+
+def bake(kernels, size=PREVIEW_LUT_SIZE):
+    """Evaluate a run of point kernels on the N^3 grid -> (N, N, N, 3) table"""
+    grid = identity(size).reshape(size * size, size, 3)  # rows of an "image"
+    s = fused_pipeline._Scratch(grid.shape[0], size)
+    frame = grid.shape[:2] + (0, 0)
+    for k in kernels:
+        k(grid, s, 0, frame)
+    return grid.reshape(size, size, size, 3)
+
+
+def _runs(steps):
+    """Indices [(start, stop)] of maximal runs of RGB-only point steps"""
+    runs, start = [], None
+    for i, step in enumerate(list(steps) + [("end", None, 0)]):
+        if step[0] == "point":
+            if start is None:
+                start = i
+        elif start is not None:
+            runs.append((start, i))
+            start = None
+    return runs
+
+
+def tables_for(adj, fast_mode=False, size=PREVIEW_LUT_SIZE, steps=None):
+    """Baked tables for every RGB-only run of plan(adj), from cache when possible"""
+    steps = steps if steps is not None else fused_pipeline.plan(adj, fast_mode)
+    runs = _runs(steps)
+    key = (settings_key(adj, fast_mode), int(size))
+    with _lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            stats["hits"] += 1
+            return runs, cached
+    tables = [bake([st[1] for st in steps[a:b]], size) for a, b in runs]
+    with _lock:
+        stats["bakes"] += 1
+        _cache[key] = tables
+        while len(_cache) > MAX_CACHED:
+            _cache.popitem(last=False)
+    return runs, tables
+
+
+def baked_plan(adj, fast_mode=False, size=PREVIEW_LUT_SIZE, interp="tetrahedral", denoise_method=None):
+    """plan(adj) with every RGB-only run replaced by one LUT lookup"""
+    steps = fused_pipeline.plan(adj, fast_mode, denoise_method)
+    runs, tables = tables_for(adj, fast_mode, size, steps)
+    out, pos = [], 0
+    for (a, b), table in zip(runs, tables):
+        out.extend(steps[pos:a])
+        out.append(("point", lut_kernel(table, interp), 0))
+        pos = b
+    out.extend(steps[pos:])
+    return out
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+
+
+# ------- application -------
+def lut_kernel(table, interp="tetrahedral"):
+    fn = apply_tetrahedral if interp == "tetrahedral" else apply_trilinear
+
+    def k(t, s, r0, frame):
+        t[...] = fn(t, table)
+    return k
+
+
+def _cell(rgb, size):
+    x = np.clip(rgb, 0.0, 1.0) * np.float32(size - 1)
+    i0 = np.minimum(x.astype(np.int32), size - 2)
+    return i0, x - i0
+
+
+def apply_trilinear(rgb, table):
+    size = table.shape[0]
+    flat = table.reshape(-1, 3)
+    i0, f = _cell(rgb, size)
+    base = (i0[..., 0] * size + i0[..., 1]) * size + i0[..., 2]
+    fr, fg, fb = f[..., 0:1], f[..., 1:2], f[..., 2:3]
+    out = np.zeros(rgb.shape, np.float32)
+    for dr, wr in ((0, 1 - fr), (1, fr)):
+        for dg, wg in ((0, 1 - fg), (1, fg)):
+            for db, wb in ((0, 1 - fb), (1, fb)):
+                out += flat[base + (dr * size + dg) * size + db] * (wr * wg * wb)
+    return out
+
+
+def apply_tetrahedral(rgb, table):
+    """
+    Tetrahedral interpolation: the cell is split along its main diagonal
+    by the order of the fractional coordinates, and the pixel is blended
+    from the 4 corners of its tetrahedron.
+    """
+    size = table.shape[0]
+    flat = table.reshape(-1, 3)
+    i0, f = _cell(rgb, size)
+    base = (i0[..., 0] * size + i0[..., 1]) * size + i0[..., 2]
+    fr, fg, fb = f[..., 0], f[..., 1], f[..., 2]
+    sr, sg = size * size, size
+    # Offset of the axis with the largest / smallest fraction (ties broken
+    # in opposite orders so the two never coincide)
+    s_max = np.where((fr >= fg) & (fr >= fb), sr, np.where(fg >= fb, sg, 1))
+    s_min = np.where((fb <= fg) & (fb <= fr), 1, np.where(fg <= fr, sg, sr))
+    a = np.maximum(np.maximum(fr, fg), fb)
+    c = np.minimum(np.minimum(fr, fg), fb)
+    b = fr + fg + fb - a - c
+    v3 = base + (sr + sg + 1)
+    out = flat[base] * (1 - a)[..., None]
+    out += flat[base + s_max] * (a - b)[..., None]
+    out += flat[v3 - s_min] * (b - c)[..., None]
+    out += flat[v3] * c[..., None]
+    return out
+
+
+# ------- .cube export -------
+def cube_table(adj, size=EXPORT_LUT_SIZE):
+    """
+    One table for the whole colour/tone chain. Stages a LUT cannot hold
+    (denoise, clarity, texture, vignette, grain) are left out.
+    """
+    steps = [st for st in fused_pipeline.plan(adj, fast_mode=False) if st[0] == "point"]
+    return bake([st[1] for st in steps], size)
+
+
+def write_cube(path, table, title="Ninlab"):
+    """Write an (N, N, N, 3) table as a .cube file (red varies fastest)"""
+    size = table.shape[0]
+    data = np.clip(table, 0.0, 1.0).transpose(2, 1, 0, 3).reshape(-1, 3)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'TITLE "{title}"\n')
+        f.write(f"LUT_3D_SIZE {size}\n")
+        f.write("DOMAIN_MIN 0.0 0.0 0.0\nDOMAIN_MAX 1.0 1.0 1.0\n")
+        for r, g, b in data:
+            f.write(f"{r:.6f} {g:.6f} {b:.6f}\n")
+
+
+def read_cube(path):
+    """Read a .cube file back into an (N, N, N, 3) table"""
+    size, rows = None, []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if not parts or parts[0].startswith("#"):
+                continue
+            if parts[0] == "LUT_3D_SIZE":
+                size = int(parts[1])
+            elif parts[0][0].isdigit() or parts[0][0] in "-.":
+                rows.append([float(p) for p in parts[:3]])
+    data = np.asarray(rows, dtype=np.float32)
+    return data.reshape(size, size, size, 3).transpose(2, 1, 0, 3)
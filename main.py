@@ -10,14 +10,21 @@ from PySide6.QtWidgets import ( # NOQA
 ) # NOQA
 from PySide6.QtGui import QPixmap, QGuiApplication, QPalette, QColor, QPainter, QPainterPath, QAction, QIcon, QKeySequence, QShortcut
 
-from catalog import load_catalog, save_catalog, DEFAULT_ROOT, load_projects_meta, update_project_info
-from imaging import DEFAULTS
+from catalog import load_catalog, save_catalog, DEFAULT_ROOT, load_projects_meta, update_project_info, load_app_settings, save_app_settings
+from imaging import DEFAULTS, is_edited, preset_settings, apply_preset_settings
 from PySide6.QtCore import QEvent, QPoint, QPointF
-from workers import DecodeWorker, PreviewWorker, ExportWorker
+from workers import DecodeWorker, ThumbWorker, PreviewWorker, PrefetchWorker, ExportWorker
 from ui_helpers import add_slider, create_chip, create_filmstrip, filmstrip_add_item, badge_star, qimage_from_u8, FlowLayout, create_app_icon, LoadingOverlay
 from export_dialog import ExportOptionsDialog
 from cropper import CropDialog
 from library_view import LibraryView
+from image_store import ImageStore
+from decode_scheduler import DecodeScheduler, PRIORITY_CURRENT, PRIORITY_NEIGHBOUR, PRIORITY_VISIBLE, PRIORITY_BACKGROUND, PRIORITY_PREFETCH
+import prefetch
+import tile_engine
+import grain
+import precision
+import export_manifest
 
 
 _COLOR_SWATCH = {
@@ -50,6 +57,22 @@ class Main(QMainWindow):
         self.create_menus()
         QLocale.setDefault(QLocale(QLocale.English, QLocale.UnitedStates))
         self.pool=QThreadPool.globalInstance()
+        self.decode_scheduler = DecodeScheduler(self.pool)
+        
+        # Decoded full-resolution images live in a bounded LRU store, not on the items
+        self.app_settings = load_app_settings()
+        budget_mb = self.app_settings.get("memory_budget_mb")
+        self.image_store = ImageStore(int(budget_mb) * 1024 * 1024 if budget_mb else None,
+                                      on_evict=self._on_image_evicted)
+        if self.app_settings.get("preview_precision") in precision.PRECISIONS:
+            precision.set_precision(self.app_settings["preview_precision"])
+        self._pending_decodes = set()
+        self._proxies = set()  # names whose resident image is an embedded-JPEG proxy
+        self._prefetch_decodes = set()  # decodes queued by the neighbour prefetcher
+        self._after_decode = {}  # name -> action waiting for demosaiced pixels
+        self.action_mp_decode.blockSignals(True)
+        self.action_mp_decode.setChecked(self.app_settings.get("decode_backend") == "process")
+        self.action_mp_decode.blockSignals(False)
         
         # Clean up old cache files in background
         self._cleanup_cache()
@@ -189,6 +212,7 @@ class Main(QMainWindow):
         QShortcut(QKeySequence.Copy, self, self.copy_settings)
         QShortcut(QKeySequence.Paste, self, self.paste_settings)
         QShortcut(QKeySequence(Qt.Key_Right), self, lambda: self.select_next_item(1))
+        QShortcut(QKeySequence(Qt.Key_Left), self, lambda: self.select_next_item(-1))
         
         root.addLayout(row1)
 
@@ -206,6 +230,7 @@ class Main(QMainWindow):
         self.library_view.sig_bulk_check_changed.connect(self._on_library_bulk_check)
         self.library_view.sig_copy_settings.connect(self.copy_settings)
         self.library_view.sig_paste_settings.connect(self.paste_settings)
+        self.library_view.sig_visible_changed.connect(self._update_decode_priorities)
         self.stack.addWidget(self.library_view)
         
         # Page 2: Develop View (Container for existing Row 2 + Content)
@@ -308,7 +333,11 @@ class Main(QMainWindow):
         root.addWidget(self.film)
 
         # status
-        self.status=QLabel("Ready"); root.addWidget(self.status)
+        status_row = QHBoxLayout()
+        self.status=QLabel("Ready"); status_row.addWidget(self.status, 1)
+        self.mem_status=QLabel(""); self.mem_status.setStyleSheet("color:#71717a;")
+        status_row.addWidget(self.mem_status)
+        root.addLayout(status_row)
 
         # debounce + fullscreen
         self.debounce=QTimer(self); self.debounce.setSingleShot(True)
@@ -895,6 +924,8 @@ class Main(QMainWindow):
             # Reduce threads to half or 1
             max_threads = max(1, cpu_count // 2)
             self.pool.setMaxThreadCount(max_threads)
+            tile_engine.set_workers(max_threads)
+            precision.set_precision("float16")
             
             # Force smaller preview if currently too large
             current_size = int(self.cmb_prev.currentText())
@@ -905,6 +936,8 @@ class Main(QMainWindow):
         else:
             # Restore threads
             self.pool.setMaxThreadCount(cpu_count)
+            tile_engine.set_workers(cpu_count)
+            precision.set_precision(self.app_settings.get("preview_precision", "float32"))
             self.update_status(f"Low Spec Mode: OFF (Threads={cpu_count})")
     
     def _toggle_histogram(self):
@@ -932,6 +965,204 @@ class Main(QMainWindow):
         self._persist_current_item()
         self._kick_preview_thread(force=True)
 
+    def _get_full(self, it):
+        """(full, pyramid) for an item from the image store, or (None, []).
+
+        Evicted images are reloaded from the disk cache transparently."""
+        got = self.image_store.get(it["name"])
+        return got if got is not None else (None, [])
+
+    def _on_image_evicted(self, name):
+        self._proxies.discard(name)
+        # Derived full-size buffers (e.g. the zoom geometry cache) go with the image
+        for it in self.items:
+            if it["name"] == name:
+                it.pop("preview_cache", None)
+                break
+
+    def _needs_real_decode(self, it):
+        """Edits and 1:1 zoom need demosaiced pixels; plain culling can use a proxy"""
+        if self.is_zoomed:
+            return True
+        return is_edited(it["settings"])
+
+    def _defer_until_decoded(self, it, action):
+        """True if only a proxy of ``it`` is resident: the real decode is requested
+        and ``action`` runs once it lands (if the image is still selected)"""
+        name = it["name"]
+        if name not in self._proxies:
+            return False
+        self._after_decode[name] = action
+        self._request_decode(it, proxy=False)
+        self.update_status("Decoding RAW…")
+        return True
+
+    def _request_decode(self, it, proxy=None):
+        """Decode an item whose full image is not resident (or is only a proxy)"""
+        name = it["name"]
+        if name in self._pending_decodes: return
+        if proxy is None:
+            proxy = not self._needs_real_decode(it)
+        self._pending_decodes.add(name)
+        w = DecodeWorker(name, thumb_w=256, thumb_h=170, proxy=proxy, pool=self._decode_pool())
+        prio = self._decode_priorities().get(name, PRIORITY_BACKGROUND)
+        self._schedule_job("decode", name, w, prio, self._on_decoded,
+                           lambda m, n=name: self._on_decode_error(m, n))
+
+    def _schedule_job(self, kind, name, worker, priority, on_done, on_error):
+        """Queue a Decode/Thumb worker through the priority scheduler"""
+        # The scheduler hears about completion first, so handlers may re-request
+        worker.signals.done.connect(lambda _r, k=kind, n=name: self.decode_scheduler.finished(k, n))
+        worker.signals.error.connect(lambda _m, k=kind, n=name: self.decode_scheduler.finished(k, n))
+        worker.signals.done.connect(on_done)
+        worker.signals.error.connect(on_error)
+        self.decode_scheduler.submit(kind, name, worker, priority)
+
+    def _decode_priorities(self):
+        """name -> decode priority for every image above the background backlog"""
+        prio = {}
+        if hasattr(self, 'library_view') and hasattr(self, 'stack') and self.stack.currentIndex() == 0:
+            for n in self.library_view.visible_names():
+                prio[n] = PRIORITY_VISIBLE
+            # Thumbnails still loading are appended to the grid in catalog order;
+            # the first ones land on screen if the grid is not full yet
+            slots = self.library_view.free_visible_slots()
+            for it in self.items:
+                if slots <= 0: break
+                if it["thumb"] is None:
+                    prio[it["name"]] = PRIORITY_VISIBLE
+                    slots -= 1
+        if 0 <= self.current < len(self.items):
+            cur_name = self.items[self.current]["name"]
+            for n in self._neighbour_names():
+                prio[n] = PRIORITY_NEIGHBOUR
+            prio[cur_name] = PRIORITY_CURRENT
+        return prio
+
+    def _film_order(self):
+        """Image names in filmstrip (sort/filter) order"""
+        if not hasattr(self, 'film'):
+            return []
+        return [self.film.item(r).data(Qt.UserRole) for r in range(self.film.count())]
+
+    def _neighbour_names(self):
+        """Filmstrip neighbours of the current image, nearest first"""
+        if not (0 <= self.current < len(self.items)):
+            return []
+        radius = self.app_settings.get("prefetch_neighbours", prefetch.DEFAULT_RADIUS)
+        return prefetch.neighbour_names(self._film_order(), self.items[self.current]["name"], radius)
+
+    def _update_decode_priorities(self):
+        """Re-rank queued decode jobs after selection / scrolling / mode changes"""
+        prio = self._decode_priorities()
+        self.decode_scheduler.reprioritize(lambda n: prio.get(n, PRIORITY_BACKGROUND),
+                                           kinds=("thumb", "decode"))
+
+    # ------- neighbour prefetch (see prefetch.py) -------
+    def _preview_params(self):
+        """(mode, long edge, sharpen) of a settled (non-live) preview"""
+        long_edge = int(self.cmb_prev.currentText())
+        sharpen_amt = float(self.cmb_sharp.currentText())
+        if self.split_mode:
+            return "split", max(320, long_edge // 2), sharpen_amt
+        return "single", long_edge, sharpen_amt
+
+    def _ensure_grain_seed(self, it):
+        """Give the item its own grain pattern (kept in its settings, so export matches the preview)"""
+        st = it["settings"]
+        if st.get("grain_seed") is None:
+            st["grain_seed"] = grain.seed_for(it["name"])
+        return st
+
+    def _prefetch_neighbours(self):
+        """Warm the filmstrip neighbours of the current image at low priority"""
+        if not (0 <= self.current < len(self.items)):
+            return
+        names = self._neighbour_names()
+        keep = set(names) | {self.items[self.current]["name"]}
+        by_name = {}
+        for it in self.items:
+            by_name[it["name"]] = it
+            if it["name"] in keep:
+                continue
+            # Renders of images that left the window go; bases stay as before
+            cache = it.get("preview_cache")
+            if cache:
+                for k in [k for k in cache if k[0] == "render"]:
+                    del cache[k]
+        for name in names:
+            if name in by_name:
+                self._prefetch_item(by_name[name])
+
+    def _prefetch_item(self, it, loaded=None):
+        """Queue a PrefetchWorker for one neighbour; ``loaded`` = (full, levels) if at hand"""
+        name = it["name"]
+        if name in self._pending_decodes:
+            return  # _on_decoded prefetches once the pixels arrive
+        if name in self._proxies and self._needs_real_decode(it):
+            self._prefetch_decodes.add(name)
+            self._request_decode(it, proxy=False)
+            return
+        mode, use_edge, sharpen_amt = self._preview_params()
+        self._ensure_grain_seed(it)
+        cache = it.setdefault("preview_cache", {})
+        render = mode == "single"
+        if render and prefetch.render_key(it["settings"], use_edge, sharpen_amt) in cache:
+            return
+        if not render and (mode, use_edge) in cache:
+            return
+        loader = (lambda _n, v=loaded: v) if loaded is not None else self.image_store.load
+        w = PrefetchWorker(name, loader, it["settings"], use_edge, sharpen_amt,
+                           base=cache.get((mode, use_edge)), render=render)
+        self._schedule_job("prefetch", name, w, PRIORITY_PREFETCH, self._on_prefetched,
+                           lambda _m: None)
+
+    def _on_prefetched(self, result):
+        name = result["name"]
+        it = next((v for v in self.items if v["name"] == name), None)
+        if it is None or self.current < 0:
+            return
+        if name != self.items[self.current]["name"] and name not in self._neighbour_names():
+            return  # the user has moved on
+        if result["full"] is None:
+            # Never decoded: decode at neighbour priority, then prefetch again
+            self._prefetch_decodes.add(name)
+            self._request_decode(it)
+            return
+        # Keep the neighbour mapped in only if that evicts nothing
+        self.image_store.admit(name, result["full"], result["pyramid"])
+        mode = "single" if result["render"] is not None else "split"
+        cache = it.setdefault("preview_cache", {})
+        cache.setdefault((mode, result["use_edge"]), result["base"])
+        if result["render"] is not None and result["settings"] == it["settings"]:
+            key = prefetch.render_key(result["settings"], result["use_edge"], result["sharpen"])
+            cache[key] = result["render"]
+
+    def select_next_item(self, step=1):
+        """Move the filmstrip selection by ``step`` rows (arrow keys)"""
+        n = self.film.count()
+        if n == 0:
+            return
+        rows = self.film.selectedIndexes()
+        row = rows[0].row() if rows else -1
+        new = max(0, min(n - 1, row + step))
+        if new != row:
+            self.film.setCurrentRow(new)
+
+    def _export_loader(self, name):
+        """Resident/cached full image for export; proxies are never exported"""
+        if name in self._proxies:
+            return None
+        return self.image_store.load(name)
+
+    def _analysis_image(self, it, long_edge=1024):
+        """Float [0,1] copy of a pyramid level for auto WB/exposure analysis"""
+        from pyramid import select_level
+        full, levels = self._get_full(it)
+        src = select_level(full, levels, long_edge)
+        scale = 65535.0 if src.dtype == np.uint16 else 255.0
+        return src.astype(np.float32) / scale
+
     def apply_auto_white_balance(self):
         """Apply automatic white balance to current image"""
         if self.current < 0:
@@ -939,7 +1170,10 @@ class Main(QMainWindow):
             return
         
         it = self.items[self.current]
-        if it["full"] is None:
+        if self._get_full(it)[0] is None:
+            return
+        # Measuring the embedded JPEG would fit the sliders to its picture style
+        if self._defer_until_decoded(it, self.apply_auto_white_balance):
             return
         
         # Save current state for undo
@@ -947,10 +1181,7 @@ class Main(QMainWindow):
         self.redo_stack.get(it["name"], []).clear()
         
         # Convert image to float for processing
-        if it["full"].dtype == np.uint16:
-            rgb_float = it["full"].astype(np.float32) / 65535.0
-        else:
-            rgb_float = it["full"].astype(np.float32) / 255.0
+        rgb_float = self._analysis_image(it)
         
         # Calculate auto white balance
         from imaging import auto_white_balance
@@ -981,10 +1212,16 @@ class Main(QMainWindow):
             return
         
         it = self.items[self.current]
-        if it["full"] is None:
+        if self._get_full(it)[0] is None:
             if hasattr(self, 'btn_auto_exp'):
                 self.btn_auto_exp.setChecked(False)
             return
+        # Measuring the embedded JPEG would fit the sliders to its picture style
+        if checked and self._defer_until_decoded(it, lambda: self.btn_auto_exp.setChecked(True)):
+            self.btn_auto_exp.blockSignals(True)
+            self.btn_auto_exp.setChecked(False)
+            self.btn_auto_exp.blockSignals(False)
+            return
         
         # Save current state for undo
         self._push_undo(it)
@@ -996,10 +1233,7 @@ class Main(QMainWindow):
                 it["_backup_exposure"] = it["settings"].get("exposure", 0.0)
             
             # Convert image to float for processing
-            if it["full"].dtype == np.uint16:
-                rgb_float = it["full"].astype(np.float32) / 65535.0
-            else:
-                rgb_float = it["full"].astype(np.float32) / 255.0
+            rgb_float = self._analysis_image(it)
             
             # Calculate auto exposure
             from imaging import auto_exposure
@@ -1032,10 +1266,16 @@ class Main(QMainWindow):
             return
         
         it = self.items[self.current]
-        if it["full"] is None:
+        if self._get_full(it)[0] is None:
             if hasattr(self, 'btn_auto_wb'):
                 self.btn_auto_wb.setChecked(False)
             return
+        # Measuring the embedded JPEG would fit the sliders to its picture style
+        if checked and self._defer_until_decoded(it, lambda: self.btn_auto_wb.setChecked(True)):
+            self.btn_auto_wb.blockSignals(True)
+            self.btn_auto_wb.setChecked(False)
+            self.btn_auto_wb.blockSignals(False)
+            return
         
         # Save current state for undo
         self._push_undo(it)
@@ -1048,10 +1288,7 @@ class Main(QMainWindow):
                 it["_backup_tint"] = it["settings"].get("tint", 0.0)
             
             # Convert image to float for processing
-            if it["full"].dtype == np.uint16:
-                rgb_float = it["full"].astype(np.float32) / 65535.0
-            else:
-                rgb_float = it["full"].astype(np.float32) / 255.0
+            rgb_float = self._analysis_image(it)
             
             # Calculate auto white balance
             from imaging import auto_white_balance
@@ -1132,7 +1369,10 @@ class Main(QMainWindow):
     def do_crop_dialog(self):
         if self.current<0: return
         it=self.items[self.current]
-        if it["full"] is None: return
+        full, levels = self._get_full(it)
+        if full is None: return
+        # Normalized crop coordinates must come from the demosaiced frame, not the proxy's
+        if self._defer_until_decoded(it, self.do_crop_dialog): return
 
         # สร้างภาพพรีวิวสำหรับ Crop & Straighten
         # ต้องเป็นภาพที่ "แต่งสีแล้ว" แต่ "ยังไม่ transform" (crop/rotate/flip)
@@ -1143,10 +1383,14 @@ class Main(QMainWindow):
         
         # Resize base image
         from PIL import Image
-        h,w,_ = it["full"].shape
+        from pyramid import select_level
+        src = select_level(full, levels, long_edge)
+        if src.dtype == np.uint16:
+            src = (src >> 8).astype(np.uint8)
+        h,w,_ = src.shape
         s = long_edge / float(max(h,w)) if max(h,w) > long_edge else 1.0
         nw,nh = int(w*s), int(h*s)
-        base_img = np.array(Image.fromarray(it["full"]).resize((nw,nh), Image.BILINEAR), dtype=np.uint8)
+        base_img = np.array(Image.fromarray(src).resize((nw,nh), Image.BILINEAR), dtype=np.uint8)
 
         # Apply color pipeline, but not transforms
         after01 = pipeline(base_img.astype(np.float32)/255.0, it["settings"])
@@ -1239,7 +1483,7 @@ class Main(QMainWindow):
         self.update_status(f"Importing {len(new_files)} images...")
         
         for p in new_files:
-            self.items.append({"name":p,"full":None,"thumb":None,"settings":DEFAULTS.copy(),"star":False})
+            self.items.append({"name":p,"thumb":None,"settings":DEFAULTS.copy(),"star":False})
             saved = self.catalog.get(p)
             if saved:
                 if isinstance(saved.get("settings"), dict):
@@ -1263,17 +1507,68 @@ class Main(QMainWindow):
         # Start workers for NEW items only
         # We need to find the index of the new items
         start_idx = len(self.items) - len(new_files)
-        for i in range(start_idx, len(self.items)):
-            item = self.items[i]
-            w=DecodeWorker(item["name"], thumb_w=256, thumb_h=170)
-            w.signals.done.connect(self._on_decoded)
-            w.signals.error.connect(lambda m: QMessageBox.warning(self,"Error",m))
-            self.pool.start(w)
+        self._start_ingest([it["name"] for it in self.items[start_idx:]],
+                           on_error=lambda m: QMessageBox.warning(self,"Error",m))
+
+    def _start_ingest(self, names, on_error=None):
+        """Phase one of ingest: thumbnails only (cache / embedded JPEG).
+
+        Full images are decoded on demand (_request_decode) when opened in
+        Develop, prefetched, or exported."""
+        pool = self._decode_pool()
+        prio = self._decode_priorities()
+        for p in names:
+            w = ThumbWorker(p, thumb_w=256, thumb_h=170, pool=pool)
+            self._schedule_job("thumb", p, w, prio.get(p, PRIORITY_BACKGROUND),
+                               self._on_thumb_loaded, on_error or self._on_decode_error)
 
     def _on_decoded(self, item):
+        """Phase two finished: full image decoded"""
+        idx=next((i for i,v in enumerate(self.items) if v["name"]==item["name"]),-1)
+        if idx<0: return
+        self._pending_decodes.discard(item["name"])
+        # Prefetched neighbours must not push out images the user looked at
+        speculative = item["name"] in self._prefetch_decodes and idx != self.current
+        self._prefetch_decodes.discard(item["name"])
+        if item.get("proxy"):
+            if item["name"] in self._proxies or not self.image_store.contains(item["name"]):
+                if self._store_decoded(item, speculative):
+                    self._proxies.add(item["name"])
+        elif self._store_decoded(item, speculative):
+            self._proxies.discard(item["name"])
+        # Scaled previews were made from whatever image was resident before
+        self.items[idx].pop("preview_cache", None)
+        if item.get("proxy") and (self._needs_real_decode(self.items[idx]) or item["name"] in self._after_decode):
+            # Edited while the proxy was decoding: the real pixels are needed now
+            self._request_decode(self.items[idx], proxy=False)
+        elif not item.get("proxy"):
+            action = self._after_decode.pop(item["name"], None)
+            if action is not None and idx == self.current and item["name"] not in self._proxies:
+                action()
+        if idx != self.current and item["name"] in self._neighbour_names():
+            self._prefetch_item(self.items[idx], loaded=(item["full"], item.get("pyramid")))
+        if self.items[idx]["thumb"] is None:
+            # Thumbnail phase had not finished yet; the decode covers it
+            self._on_thumb_loaded(item)
+            return
+        if idx == self.current:
+            self._kick_preview_thread(force=True)
+        self.update_status()
+
+    def _store_decoded(self, item, speculative):
+        """Put a decode result in the image store; True if it is resident now"""
+        if speculative:
+            return self.image_store.admit(item["name"], item["full"], item.get("pyramid"))
+        self.image_store.put(item["name"], item["full"], item.get("pyramid"))
+        return True
+
+    def _on_thumb_loaded(self, item):
+        """Phase one finished: thumbnail ready, add to filmstrip and library"""
         idx=next((i for i,v in enumerate(self.items) if v["name"]==item["name"]),-1)
         if idx>=0:
-            self.items[idx]["full"]=item["full"]; self.items[idx]["thumb"]=item["thumb"]
+            if self.items[idx]["thumb"] is not None:
+                return  # already added by an earlier full decode
+            self.items[idx]["thumb"]=item["thumb"]
             # Create Pixmap
             pm = QPixmap.fromImage(qimage_from_u8(item["thumb"]))
             starred = self.items[idx].get("star",False)
@@ -1297,10 +1592,10 @@ class Main(QMainWindow):
             
             if self.current<0 and self.film.count()>0: self.film.setCurrentRow(0)
             
-            # CRITICAL FIX: If the decoded item is the CURRENT one (selected via library fallback),
-            # we must update the preview now that we have the full image.
+            # CRITICAL FIX: If the loaded item is the CURRENT one (selected via library fallback),
+            # we must update the preview (this requests the full decode if needed).
             if idx == self.current:
-                print(f"✅ _on_decoded: Decoded image IS the current one. Kicking preview!")
+                print(f"✅ _on_thumb_loaded: Loaded image IS the current one. Kicking preview!")
                 self._kick_preview_thread(force=True)
                 # Also try to sync filmstrip selection if it appeared now
                 if hasattr(self, 'film'):
@@ -1314,6 +1609,8 @@ class Main(QMainWindow):
 
     def update_status(self, extra=""):
         import time
+        if hasattr(self, "mem_status"):
+            self.mem_status.setText(self.image_store.status_text())
         if self.to_load>0 and self.loaded<self.to_load:
             msg = f"Loading... {self.loaded}/{self.to_load} {extra}"
             self.status.setText(msg)
@@ -1334,8 +1631,11 @@ class Main(QMainWindow):
                 self.loading_overlay.setVisible(False)
                 # ❌ ลบ processEvents() - ให้ event loop จัดการเอง
 
-    def _on_decode_error(self, message):
+    def _on_decode_error(self, message, name=None):
         print(f"Error loading: {message}")
+        if name is not None:
+            self._pending_decodes.discard(name)
+            self._after_decode.pop(name, None)
         self.loaded += 1
         self.update_status()
     # ------- selection / star / filter / delete -------
@@ -1368,18 +1668,20 @@ class Main(QMainWindow):
         
         # Show loading status immediately
         self.update_status("Loading image...")
+        self._update_decode_priorities()
         
         # initialize undo stack for this item
         cur_it = self.items[self.current]
         self.undo_stack.setdefault(name, [dict(cur_it["settings"])])
         self.redo_stack.setdefault(name, [])
         
-        print(f"   Loading: {name}, Full image present? {cur_it['full'] is not None}")
+        print(f"   Loading: {name}, Full image present? {self.image_store.contains(name)}")
 
         # Load UI and preview IMMEDIATELY (fast)
         self.load_settings_to_ui()
         self._mark_active_preset(cur_it.get("applied_preset"))
         self._kick_preview_thread(force=True)
+        self._prefetch_neighbours()
         
         # Update metadata ASYNCHRONOUSLY (slow) - don't block UI
         # Use cached metadata if available
@@ -1960,8 +2262,8 @@ class Main(QMainWindow):
         name, ok = QInputDialog.getText(self,"Save Preset","Preset name:")
         if not ok or not name.strip(): return
         safe = name.strip()
-        # copy settings without transforms (crop/rotate/flip) so preset focuses on look
-        st = {k:v for k,v in self.items[self.current]["settings"].items() if k not in ("crop","rotate","flip_h")}
+        # copy settings without transforms (crop/rotate/flip) or grain pattern so preset focuses on look
+        st = preset_settings(self.items[self.current]["settings"])
         self.presets[safe] = st
         self.catalog["__presets__"] = self.presets
         save_catalog(self.catalog, self.project_dir)
@@ -2062,7 +2364,7 @@ class Main(QMainWindow):
         preset = self.presets.get(preset_name)
         if not preset: return
         include_tf = self.chk_preset_transform.isChecked() if hasattr(self,"chk_preset_transform") else False
-        targets=[it for it in self.items if it["full"] is not None]
+        targets=[it for it in self.items if it["thumb"] is not None]
         self._apply_preset_to_items(targets, preset, include_tf, preset_name)
         self.update_status(f"Applied preset '{preset_name}' to all")
         self._mark_active_preset(preset_name)
@@ -2074,7 +2376,7 @@ class Main(QMainWindow):
         preset = self.presets.get(preset_name)
         if not preset: return
         include_tf = self.chk_preset_transform.isChecked() if hasattr(self,"chk_preset_transform") else False
-        targets=[it for it in self.items if it["full"] is not None and self._pass_filter(it)]
+        targets=[it for it in self.items if it["thumb"] is not None and self._pass_filter(it)]
         self._apply_preset_to_items(targets, preset, include_tf, preset_name)
         self.update_status(f"Applied preset '{preset_name}' to filtered")
         self._mark_active_preset(preset_name)
@@ -2111,17 +2413,9 @@ class Main(QMainWindow):
         self._push_undo(it)
         self.redo_stack.get(it.get("name"), []).clear()
         
-        # CRITICAL: Always preserve rotation from current settings (NEVER reset it)
-        current_rotate = it["settings"].get("rotate", 0)
-        
-        # Preserve crop and flip_h only if checkbox is checked
-        transforms = {k:it["settings"].get(k) for k in ("crop","flip_h") if include_transform and k in it["settings"]}
-        
-        # Merge: DEFAULTS < preset < transforms, then force rotation back
-        it["settings"] = {**DEFAULTS, **preset, **transforms}
-        
-        # Force rotation to stay at current value (never let preset change it)
-        it["settings"]["rotate"] = current_rotate
+        # Merge: DEFAULTS < preset < crop/flip (only if checkbox is checked);
+        # rotation and grain pattern always stay the image's own (NEVER taken from the preset)
+        it["settings"] = apply_preset_settings(it["settings"], preset, include_transform)
         
         if preset_name:
             it["applied_preset"] = preset_name
@@ -2244,7 +2538,8 @@ class Main(QMainWindow):
             it = self.items[idx]
             
             # Update settings
-            it["settings"] = {**DEFAULTS, **self.copied_settings}
+            # The grain pattern stays the target's own
+            it["settings"] = {**DEFAULTS, **self.copied_settings, "grain_seed": it["settings"].get("grain_seed")}
             it["applied_preset"] = None
             
             # Persist
@@ -2295,6 +2590,10 @@ class Main(QMainWindow):
             return
 
         self.items=[it for it in self.items if it["name"] not in names_to_delete]
+        for name in names_to_delete:
+            self.decode_scheduler.cancel(name); self._pending_decodes.discard(name)
+            self.image_store.discard(name); self._proxies.discard(name)
+            self._prefetch_decodes.discard(name)
         for name in list(self.catalog.keys()):
             if name in names_to_delete:
                 self.catalog.pop(name, None)
@@ -2320,16 +2619,16 @@ class Main(QMainWindow):
     def _kick_preview_thread(self, force=False):
         if self.current<0: return
         it=self.items[self.current]
-        if it["full"] is None: return
+        self._ensure_grain_seed(it)
+        full, levels = self._get_full(it)
+        if full is None:
+            self._request_decode(it)
+            return
+        if it["name"] in self._proxies and self._needs_real_decode(it):
+            # Keep showing the proxy until the demosaiced image arrives
+            self._request_decode(it, proxy=False)
         long_edge = int(self.cmb_prev.currentText())
-        sharpen_amt = float(self.cmb_sharp.currentText())
-
-        if self.split_mode:
-            use_edge = max(320, long_edge // 2)  # ขนาดต่อ “ข้าง”
-            mode = "split"
-        else:
-            use_edge = long_edge
-            mode = "single"
+        mode, use_edge, sharpen_amt = self._preview_params()  # split: ขนาดต่อ “ข้าง”
         if self.live_dragging:
             if self.live_inflight:
                 return
@@ -2359,36 +2658,26 @@ class Main(QMainWindow):
             base_override = None  # Let worker handle zoom processing
         else:
             # Normal mode: use resized base image
+            if not self.live_dragging and mode == "single":
+                # Prefetched neighbour: the finished render is already here
+                done = cache.get(prefetch.render_key(it["settings"], use_edge, sharpen_amt))
+                if done is not None:
+                    PreviewWorker.next_id()  # older in-flight previews are stale now
+                    self._show_preview_pix(done)
+                    return
             if cache_key in cache:
                 base_override = cache[cache_key]
             else:
-                from PIL import Image
-                h,w,_ = it["full"].shape
-                if max(h,w)>use_edge:
-                    s = use_edge/float(max(h,w))
-                    nw,nh = int(w*s), int(h*s)
-                    
-                    # Handle 16-bit images - convert to 8-bit before PIL operations
-                    if it["full"].dtype == np.uint16:
-                        # Simple 16-bit to 8-bit conversion (shift right by 8 bits)
-                        img_8bit = (it["full"] >> 8).astype(np.uint8)
-                        base_override = np.array(Image.fromarray(img_8bit).resize((nw,nh), Image.BILINEAR), dtype=np.uint8)
-                    else:
-                        base_override = np.array(Image.fromarray(it["full"]).resize((nw,nh), Image.BILINEAR), dtype=np.uint8)
-                else:
-                    # Even for full size, convert 16-bit to 8-bit
-                    if it["full"].dtype == np.uint16:
-                        base_override = (it["full"] >> 8).astype(np.uint8)
-                    else:
-                        base_override = it["full"]
+                # Resize from the smallest pyramid level that covers use_edge
+                base_override = prefetch.make_preview_base(full, levels, use_edge)
                 cache[cache_key] = base_override
 
         req_id = PreviewWorker.next_id()
-        worker=PreviewWorker(it["full"], dict(it["settings"]), use_edge, sharpen_amt, mode, req_id,
+        worker=PreviewWorker(full, dict(it["settings"]), use_edge, sharpen_amt, mode, req_id,
                              live=self.live_dragging, base_override=base_override,
                              is_zoomed=self.is_zoomed, zoom_point=self.zoom_point_norm,
                              preview_size=self.preview.size(),
-                             processed_cache=cache,
+                             processed_cache=cache, levels=levels,
                              low_spec=self.btn_low_spec.isChecked() if hasattr(self, "btn_low_spec") else False,
                              panning=self._is_panning if hasattr(self, "_is_panning") else False)
         worker.signals.ready.connect(self._show_preview_pix)
@@ -2610,6 +2899,10 @@ class Main(QMainWindow):
             elif le in (1200,1600,2048,3840): dlg.cmb_long.setCurrentText(str(le))
             else: dlg.cmb_long.setCurrentText("Custom"); dlg.sp_long.setValue(int(le)); dlg.sp_long.setEnabled(True)
             dlg.ed_suffix.setText(o.get("suffix","_edit"))
+            if o.get("workers"): dlg.sp_workers.setValue(int(o["workers"]))
+            for label, mode in dlg.RENDER_MODES.items():
+                if mode == o.get("render_mode"): dlg.cmb_render.setCurrentText(label)
+            dlg.chk_incremental.setChecked(bool(o.get("incremental", True)))
         return dlg.get_options() if dlg.exec()==QDialog.DialogCode.Accepted else None
 
     def _ask_outdir(self):
@@ -2622,13 +2915,18 @@ class Main(QMainWindow):
         out_dir=self._ask_outdir()
         if not out_dir: return
         self.last_export_opts=opts
+        for it in items:
+            self._ensure_grain_seed(it)
         self.expdlg=QProgressDialog("Exporting...","Cancel",0,len(items),self)
         self.expdlg.setWindowTitle("Export"); self.expdlg.setWindowModality(Qt.WindowModal)
         self.expdlg.setAutoReset(False); self.expdlg.setAutoClose(False); self.expdlg.show()
-        w=ExportWorker(items,out_dir,opts)
+        manifest=export_manifest.ExportManifest(self.project_dir,out_dir,opts)
+        w=ExportWorker(items,out_dir,opts,loader=self._export_loader,manifest=manifest)
         w.signals.progress.connect(self._on_export_progress)
         w.signals.done.connect(self._on_export_done)
         w.signals.error.connect(self._on_export_error)
+        w.signals.cancelled.connect(self._on_export_cancelled)
+        self.expdlg.canceled.connect(w.cancel)
         self._export_workers.append(w)  # keep ref so signals stay alive
         self.pool.start(w); self.update_status("Exporting ...")
 
@@ -2644,6 +2942,11 @@ class Main(QMainWindow):
         self._export_workers.clear()
         self.update_status(f"Done → {out_dir}"); QMessageBox.information(self,"Done",f"Export finished → {out_dir}")
 
+    def _on_export_cancelled(self, out_dir):
+        if self.expdlg: self.expdlg.close(); self.expdlg=None
+        self._export_workers.clear()
+        self.update_status(f"Export cancelled → {out_dir}")
+
     def _on_export_error(self, e):
         if self.expdlg: self.expdlg.close(); self.expdlg=None
         self._export_workers.clear()
@@ -2653,19 +2956,19 @@ class Main(QMainWindow):
         rows=self.film.selectedIndexes()
         if not rows: QMessageBox.information(self,"Info","Select images (Ctrl/Shift)"); return
         names=[self.film.item(r.row()).data(Qt.UserRole) for r in rows]
-        subset=[it for it in self.items if it["name"] in names and it["full"] is not None]
+        subset=[it for it in self.items if it["name"] in names and it["thumb"] is not None]
         self._start_export(subset)
 
     def export_all(self):
-        ready=[it for it in self.items if it["full"] is not None]
+        ready=[it for it in self.items if it["thumb"] is not None]
         self._start_export(ready)
 
     def export_filtered(self):
-        ready=[it for it in self.items if it["full"] is not None and self._pass_filter(it)]
+        ready=[it for it in self.items if it["thumb"] is not None and self._pass_filter(it)]
         self._start_export(ready)
     
     def export_starred(self):
-        starred=[it for it in self.items if it["full"] is not None and it.get("star", False)]
+        starred=[it for it in self.items if it["thumb"] is not None and it.get("star", False)]
         if not starred:
             QMessageBox.information(self,"Info","No starred images to export")
             return
@@ -2676,6 +2979,11 @@ class Main(QMainWindow):
             self._persist_current_item()
         except Exception:
             pass
+        try:
+            from decode_pool import shutdown_pool
+            shutdown_pool()
+        except Exception:
+            pass
         return super().closeEvent(event)
 
     # ------- project helpers -------
@@ -2711,7 +3019,7 @@ class Main(QMainWindow):
             pass
 
     def _default_presets(self):
-        base = lambda **k: {**{kk:vv for kk,vv in DEFAULTS.items() if kk not in ("crop","rotate","flip_h")}, **k}
+        base = lambda **k: {**preset_settings(DEFAULTS), **k}
         return {
             # ========== FILM PRESETS (5) ==========
             
@@ -2814,6 +3122,10 @@ class Main(QMainWindow):
         self.active_preset = None
         self.undo_stack.clear(); self.redo_stack.clear()
         self.items.clear(); self.current=-1; self.view_filter="All"; self.split_mode=False
+        self.decode_scheduler.cancel_all()
+        self.image_store.clear(); self._pending_decodes.clear(); self._proxies.clear()
+        self._after_decode.clear()
+        self._prefetch_decodes.clear()
         if hasattr(self, "film"): self.film.clear()
         if hasattr(self, "preview"): self.preview.setPixmap(QPixmap())
         # Clear library view when switching projects
@@ -2841,7 +3153,7 @@ class Main(QMainWindow):
             self.update_status(f"Restoring {len(existing_files)} images...")
             
             for p in existing_files:
-                item = {"name": p, "full": None, "thumb": None, "settings": DEFAULTS.copy(), "star": False}
+                item = {"name": p, "thumb": None, "settings": DEFAULTS.copy(), "star": False}
                 saved = self.catalog.get(p)
                 if saved:
                     if isinstance(saved.get("settings"), dict):
@@ -2851,11 +3163,8 @@ class Main(QMainWindow):
                         item["applied_preset"] = saved.get("preset")
                 
                 self.items.append(item)
-                
-                w = DecodeWorker(p, thumb_w=72, thumb_h=48)
-                w.signals.done.connect(self._on_decoded)
-                w.signals.error.connect(lambda m: print(f"Error loading: {m}"))
-                self.pool.start(w)
+            
+            self._start_ingest(existing_files)
 
     def _restore_project_images(self):
         """Restore images from the current project's catalog"""
@@ -2891,7 +3200,7 @@ class Main(QMainWindow):
             self.update_status(f"Restoring {len(existing_files)} images...")
             
             for p in existing_files:
-                item = {"name": p, "full": None, "thumb": None, "settings": DEFAULTS.copy(), "star": False}
+                item = {"name": p, "thumb": None, "settings": DEFAULTS.copy(), "star": False}
                 saved = self.catalog.get(p)
                 if saved:
                     if isinstance(saved.get("settings"), dict):
@@ -2901,11 +3210,8 @@ class Main(QMainWindow):
                         item["applied_preset"] = saved.get("preset")
                 
                 self.items.append(item)
-                
-                w = DecodeWorker(p, thumb_w=256, thumb_h=170)
-                w.signals.done.connect(self._on_decoded)
-                w.signals.error.connect(self._on_decode_error)
-                self.pool.start(w)
+            
+            self._start_ingest(existing_files)
         else:
             # No existing files, hide overlay
             self.loading_overlay.setVisible(False)
@@ -2966,6 +3272,63 @@ class Main(QMainWindow):
         edit_menu.addAction(action_redo)
         
         edit_menu.addSeparator()
+        
+        action_mem = QAction("Memory Budget...", self)
+        action_mem.triggered.connect(self.set_memory_budget)
+        edit_menu.addAction(action_mem)
+        
+        action_cube = QAction("Export Look as LUT (.cube)...", self)
+        action_cube.triggered.connect(self.export_cube_lut)
+        edit_menu.addAction(action_cube)
+        
+        self.action_mp_decode = QAction("Multi-process Decoding", self, checkable=True)
+        self.action_mp_decode.toggled.connect(self.toggle_process_decoding)
+        edit_menu.addAction(self.action_mp_decode)
+
+    def export_cube_lut(self):
+        """Save the current image's colour/tone settings as a 65^3 .cube LUT"""
+        if self.current < 0:
+            return
+        import lut3d
+        it = self.items[self.current]
+        stem = os.path.splitext(os.path.basename(it["name"]))[0]
+        path, _ = QFileDialog.getSaveFileName(self, "Export LUT", f"{stem}.cube", "Cube LUT (*.cube)")
+        if not path:
+            return
+        try:
+            lut3d.write_cube(path, lut3d.cube_table(it["settings"]), title=stem)
+            self.update_status(f"LUT saved: {os.path.basename(path)}")
+        except Exception as e:
+            QMessageBox.warning(self, "Export LUT", f"Could not write {path}:\n{e}")
+
+    def set_memory_budget(self):
+        """Ask for the decoded-image memory budget (MB) and apply it immediately"""
+        cur_mb = self.image_store.budget_bytes // (1024 * 1024)
+        val, ok = QInputDialog.getInt(self, "Memory Budget",
+                                      "Max memory for decoded images (MB):", cur_mb, 256, 262144, 256)
+        if not ok: return
+        self.image_store.set_budget(val * 1024 * 1024)
+        self.app_settings["memory_budget_mb"] = val
+        save_app_settings(self.app_settings)
+        self.update_status(f"Memory budget: {val} MB")
+
+    def toggle_process_decoding(self, enabled):
+        """Decode in a process pool (one per physical core) instead of threads"""
+        backend = "process" if enabled else "thread"
+        if self.app_settings.get("decode_backend", "thread") != backend:
+            self.app_settings["decode_backend"] = backend
+            save_app_settings(self.app_settings)
+        if not enabled:
+            from decode_pool import shutdown_pool
+            shutdown_pool()
+        self.update_status(f"Decoding: {'multi-process' if enabled else 'threads'}")
+
+    def _decode_pool(self):
+        """The process pool when multi-process decoding is on, else None"""
+        if self.app_settings.get("decode_backend") != "process":
+            return None
+        from decode_pool import get_pool
+        return get_pool()
 
     def toggle_filter_star_btn(self, checked):
         # Button toggled -> update Combo
@@ -3277,6 +3640,7 @@ class Main(QMainWindow):
         if hasattr(self, 'library_view') and self.library_view.grid.count() == 0 and len(self.items) > 0:
             self._refresh_library_grid()
         self.update_status("Library Mode")
+        self._update_decode_priorities()
         self.setWindowTitle(f"Ninlab - {self.project_display_name} [LIBRARY]")
 
     def mode_develop(self):
@@ -3337,6 +3701,7 @@ class Main(QMainWindow):
                 self.current = real_idx
                 # Manually trigger what on_select_item does
                 self.update_status("Loading image...")
+                self._update_decode_priorities()
                 
                 # Initialize undo if needed
                 cur_it = self.items[self.current]
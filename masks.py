@@ -0,0 +1,103 @@
+"""
+Geometric Mask Cache
+
+Radial-distance fields depend only on the frame geometry, yet the vignette
+rebuilt one with ``np.ogrid`` at full resolution for every preview and
+export. A batch export of one camera's shoot recomputed the same field
+for every image.
+
+Fields are built once per (h, w, center) and kept in a small LRU, bounded
+by MAX_ENTRIES and MAX_BYTES. Callers get read-only float32 arrays.
+Radial masks with a feathered edge are cached the same way by (h, w,
+center, radius, feather), ready for local adjustments.
+
+``r2_window`` is for renders of part of a frame, such as tiles and the
+1:1 zoom patch. It slices the cached field when the whole frame fits the
+budget and otherwise computes just the window.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+MAX_ENTRIES = 8
+MAX_BYTES = 256 * 1024 * 1024
+
+_cache = OrderedDict()      # key -> array; oldest first
+_resident = 0
+_lock = threading.Lock()
+stats = {"hits": 0, "builds": 0, "evictions": 0}
+
+
+def _center(h, w, center):
+    """Pixel coordinates of a normalized (cy, cx) center; None is the frame centre"""
+    cy, cx = center if center is not None else (0.5, 0.5)
+    return cy * (h - 1), cx * (w - 1)
+
+
+def _r2(h, w, center, y0, y1, x0, x1):
+    # Normalized so the midpoints of the frame edges are at distance 1
+    cy, cx = _center(h, w, center)
+    ry = max((h - 1) / 2.0, 1.0); rx = max((w - 1) / 2.0, 1.0)
+    dy = ((np.arange(y0, y1, dtype=np.float64) - cy) / ry).astype(np.float32)
+    dx = ((np.arange(x0, x1, dtype=np.float64) - cx) / rx).astype(np.float32)
+    return dy[:, None] * dy[:, None] + dx[None, :] * dx[None, :]
+
+
+def _cached(key, build):
+    global _resident
+    with _lock:
+        arr = _cache.get(key)
+        if arr is not None:
+            _cache.move_to_end(key)
+            stats["hits"] += 1
+            return arr
+    arr = build()
+    arr.setflags(write=False)
+    with _lock:
+        stats["builds"] += 1
+        if key not in _cache:
+            _cache[key] = arr
+            _resident += arr.nbytes
+        while _cache and (len(_cache) > MAX_ENTRIES or _resident > MAX_BYTES):
+            _, old = _cache.popitem(last=False)
+            _resident -= old.nbytes
+            stats["evictions"] += 1
+    return arr
+
+
+def radial_r2(h, w, center=None):
+    """(h, w) float32 squared normalized distance from ``center``"""
+    key = ("r2", int(h), int(w), None if center is None else tuple(map(float, center)))
+    return _cached(key, lambda: _r2(h, w, center, 0, h, 0, w))
+
+
+def r2_window(frame_h, frame_w, y0, y1, x0, x1, center=None):
+    """radial_r2(frame_h, frame_w, center)[y0:y1, x0:x1]"""
+    if frame_h * frame_w * 4 <= MAX_BYTES // 2:
+        return radial_r2(frame_h, frame_w, center)[y0:y1, x0:x1]
+    return _r2(frame_h, frame_w, center, y0, y1, x0, x1)
+
+
+def radial_mask(h, w, center=None, radius=1.0, feather=0.5):
+    """
+    (h, w) float32 mask: 1 inside radius * (1 - feather), easing (smoothstep)
+    to 0 at ``radius``, in the normalized distance of radial_r2.
+    """
+    key = ("radial", int(h), int(w), None if center is None else tuple(map(float, center)),
+           float(radius), float(feather))
+
+    def build():
+        d = np.sqrt(radial_r2(h, w, center))
+        inner = radius * (1.0 - feather)
+        t = np.clip((radius - d) / max(radius - inner, 1e-6), 0.0, 1.0)
+        return (t * t * (3.0 - 2.0 * t)).astype(np.float32)
+    return _cached(key, build)
+
+
+def clear_cache():
+    global _resident
+    with _lock:
+        _cache.clear()
+        _resident = 0
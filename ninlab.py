@@ -0,0 +1,251 @@
+"""
+Ninlab command line
+
+Headless batch rendering for render farms, cron jobs and ingest servers.
+It uses the same export_engine as the GUI and never imports PySide6:
+
+    python -m ninlab render --project ~/.rawmini_projects/wedding --out web/ --long-edge 2048
+    python -m ninlab render shoot/ --preset "Portra 400" --out out/ --format tiff16
+    python -m ninlab render IMG_0001.CR3 --project proj/ --out out/ --json
+
+Images come from the project's catalog.json, or from the files and
+folders given on the command line. Catalog settings are used when the
+catalog has them. ``--preset`` applies a preset from the project instead,
+the way the GUI does: rotation is kept, and crop/flip only with
+``--keep-transforms``. ``--starred`` and ``--checked`` filter by the
+catalog flags.
+
+Jobs are recorded in the project's export manifest (export_manifest.py),
+so re-running a command only renders what changed. ``--json`` prints one
+JSON object per line on stdout (start, progress, done, cancelled,
+error). Heavy modules are imported only after the arguments are parsed,
+so the command is cheap to call per file.
+
+Exit codes: EXIT_OK, EXIT_FAILED (an image failed), EXIT_USAGE (bad
+arguments, project or preset), EXIT_NO_IMAGES (nothing matched),
+EXIT_CANCELLED (interrupted).
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_NO_IMAGES = 3
+EXIT_CANCELLED = 130
+
+IMAGE_EXTENSIONS = (".cr2", ".cr3", ".nef", ".arw", ".dng", ".raf", ".rw2", ".orf", ".srw", ".nrw",
+                    ".jpg", ".jpeg", ".png", ".tif", ".tiff")
+FORMATS = {"jpeg": "JPEG", "png": "PNG", "tiff16": "TIFF 16-bit", "png16": "PNG 16-bit"}
+
+
+class UsageError(Exception):
+    pass
+
+
+def build_parser():
+    p = argparse.ArgumentParser(prog="ninlab", description="Ninlab headless tools")
+    sub = p.add_subparsers(dest="command", required=True)
+    r = sub.add_parser("render", help="render and export images without the GUI")
+    r.add_argument("sources", nargs="*", help="image files or folders (default: the whole catalog)")
+    r.add_argument("--project", help="project directory with catalog.json (default: the default project)")
+    r.add_argument("--preset", help="apply this preset from the project")
+    r.add_argument("--keep-transforms", action="store_true", help="keep crop/flip when applying --preset")
+    r.add_argument("--out", required=True, help="output folder")
+    r.add_argument("--starred", action="store_true", help="only starred images")
+    r.add_argument("--checked", action="store_true", help="only checked (ticked) images")
+    r.add_argument("--format", choices=sorted(FORMATS), default="jpeg")
+    r.add_argument("--quality", type=int, default=92)
+    r.add_argument("--long-edge", type=int, default=None)
+    r.add_argument("--limit-kb", type=int, default=0, help="JPEG size limit")
+    r.add_argument("--render-mode", choices=("auto", "resize_first", "full"), default="auto")
+    r.add_argument("--name", default=None, help="custom name; outputs are <name>-<seq>")
+    r.add_argument("--start", type=int, default=1, help="first sequence number for --name")
+    r.add_argument("--workers", type=int, default=None, help="parallel renders (default: export_engine.default_workers())")
+    r.add_argument("--no-incremental", action="store_true", help="re-render images that are unchanged")
+    r.add_argument("--json", action="store_true", help="JSON lines progress on stdout")
+    return p
+
+
+def export_options(args):
+    """export_engine options for parsed ``render`` arguments"""
+    # each render already uses every core (tile_engine); more renders only add memory
+    from export_engine import default_workers
+    return {
+        "fmt": FORMATS[args.format],
+        "quality": args.quality,
+        "progressive": True, "optimize": True,
+        "long_edge": args.long_edge,
+        "naming_mode": "Custom Name + Sequence" if args.name else "Original Name",
+        "custom_text": args.name or "Photo", "start_num": args.start,
+        "limit_size_kb": args.limit_kb if args.format == "jpeg" else 0,
+        "render_mode": None if args.render_mode == "auto" else args.render_mode,
+        "workers": args.workers or default_workers(),
+        "incremental": not args.no_incremental,
+    }
+
+
+def _expand(sources):
+    files = []
+    for src in sources:
+        if os.path.isdir(src):
+            for name in sorted(os.listdir(src)):
+                path = os.path.join(src, name)
+                if os.path.isfile(path) and os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                    files.append(os.path.abspath(path))
+        elif os.path.isfile(src):
+            files.append(os.path.abspath(src))
+        else:
+            raise UsageError(f"not found: {src}")
+    return files
+
+
+def collect_items(catalog, sources=None, preset=None, keep_transforms=False, starred=False, checked=False):
+    """Export items (name, settings, star, checked) from the catalog or ``sources``"""
+    from imaging import DEFAULTS, apply_preset_settings
+    import grain
+    names = _expand(sources) if sources else [k for k in catalog if not k.startswith("__")]
+    items = []
+    for name in names:
+        saved = catalog.get(name)
+        saved = saved if isinstance(saved, dict) else {}
+        settings = {**DEFAULTS, **(saved.get("settings") or {})}
+        if preset is not None:
+            # as the GUI's _apply_preset: rotation and grain pattern kept, crop/flip on request
+            settings = apply_preset_settings(settings, preset, keep_transforms)
+        if settings.get("grain_seed") is None:
+            settings["grain_seed"] = grain.seed_for(name)
+        it = {"name": name, "settings": settings,
+              "star": bool(saved.get("star", False)), "checked": bool(saved.get("checked", True))}
+        if (starred and not it["star"]) or (checked and not it["checked"]):
+            continue
+        items.append(it)
+    return items
+
+
+def cached_loader(name):
+    """(full, levels) from the GUI's decode cache, or None (export_engine then decodes)"""
+    try:
+        from cache_manager import load_from_cache
+        from pyramid import levels_from_cache
+        cached = load_from_cache(name, keys=None)
+    except Exception:
+        return None
+    if not cached or "full" not in cached:
+        return None
+    return cached["full"], levels_from_cache(cached)
+
+
+class Reporter:
+    """Progress as JSON lines on ``stream`` (stdout), or as text on stderr"""
+
+    def __init__(self, as_json, stream=None):
+        self.as_json = as_json
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def __call__(self, event, **fields):
+        with self._lock:
+            self._write(event, fields)
+
+    def _write(self, event, fields):
+        if self.as_json:
+            self.stream.write(json.dumps({"event": event, **fields}) + "\n")
+            self.stream.flush()
+        elif event == "progress":
+            sys.stderr.write(f"\r{fields['done']}/{fields['total']}")
+            sys.stderr.flush()
+        elif event == "start":
+            sys.stderr.write(f"Rendering {fields['total']} images with {fields['workers']} workers\n")
+        elif event == "done":
+            sys.stderr.write(f"\nDone: {fields['written']} written, {fields['skipped']} unchanged "
+                             f"in {fields['elapsed_s']:.1f}s -> {fields['out_dir']}\n")
+        else:
+            sys.stderr.write(f"\n{event}: {fields.get('message', '')}\n")
+
+
+def render(args, report):
+    import signal
+    from pathlib import Path
+    from catalog import DEFAULT_PROJECT
+
+    project = Path(args.project).expanduser() if args.project else DEFAULT_PROJECT
+    catalog_path = project / "catalog.json"
+    if args.project and not catalog_path.is_file():
+        raise UsageError(f"no catalog.json in {project}")
+    catalog = {}
+    if catalog_path.is_file():
+        try:
+            with open(catalog_path, "r", encoding="utf-8") as f:
+                catalog = json.load(f)
+        except ValueError as e:
+            raise UsageError(f"unreadable catalog {catalog_path}: {e}")
+    preset = None
+    if args.preset:
+        preset = (catalog.get("__presets__") or {}).get(args.preset)
+        if preset is None:
+            raise UsageError(f"unknown preset: {args.preset}")
+    if not args.sources and not catalog:
+        raise UsageError("nothing to render: give files/folders or a --project with a catalog")
+
+    items = collect_items(catalog, args.sources, preset, args.keep_transforms, args.starred, args.checked)
+    if not items:
+        report("error", message="no images matched")
+        return EXIT_NO_IMAGES
+
+    import export_engine
+    import export_manifest
+    opts = export_options(args)
+    os.makedirs(args.out, exist_ok=True)
+    manifest = export_manifest.ExportManifest(project, args.out, opts)
+    cancel = threading.Event()
+    previous = None
+    if threading.current_thread() is threading.main_thread():
+        previous = signal.signal(signal.SIGINT, lambda *a: cancel.set())
+    report("start", total=len(items), workers=opts["workers"], out_dir=os.path.abspath(args.out))
+    try:
+        res = export_engine.run(items, args.out, opts, loader=cached_loader, cancel=cancel, manifest=manifest,
+                                progress=lambda done, total: report("progress", done=done, total=total))
+    except Exception as e:
+        report("error", message=str(e))
+        return EXIT_FAILED
+    finally:
+        if previous is not None:
+            signal.signal(signal.SIGINT, previous)
+    st = res["stats"]
+    if res["cancelled"]:
+        report("cancelled", written=st["written"], skipped=st["skipped"])
+        return EXIT_CANCELLED
+    report("done", written=st["written"], skipped=st["skipped"], encodes=st["encodes"],
+           elapsed_s=round(st["elapsed_s"], 3), out_dir=os.path.abspath(args.out),
+           outputs=[p for p in res["outputs"] if p])
+    return EXIT_OK
+
+
+def main(argv=None):
+    parser = build_parser()
+    try:
+        args = parser.parse_args(argv)
+    except SystemExit as e:
+        return EXIT_OK if e.code in (0, None) else EXIT_USAGE
+    report = Reporter(args.json, sys.stdout)
+    stdout = sys.stdout
+    if args.json:
+        sys.stdout = sys.stderr     # keep the pipeline's log prints out of the JSON stream
+    try:
+        return render(args, report)
+    except UsageError as e:
+        report("error", message=str(e))
+        if not args.json:
+            parser.print_usage(sys.stderr)
+        return EXIT_USAGE
+    finally:
+        sys.stdout = stdout
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Working Precision
+
+The NumPy pipeline computes in float32. That is enforced, not assumed:
+with dtype auditing on (NINLAB_DTYPE_AUDIT=1, or ``set_audit(True)``),
+every full-frame stage must hand back float32. A stage that silently
+promotes to float64 raises DtypeAuditError instead of being cast back
+without anyone noticing, as it was before. The tests run the audit over
+every stage.
+
+Previews can store their full-size intermediates at half precision. With
+precision "float16", the checkpoints kept by the preview stage cache
+(stage_cache.py) are stored as float16. They are widened back to float32
+one tile at a time as the next stage reads them. Arithmetic always stays
+float32, because NumPy float16 maths is emulated and slower. Export
+always stores float32.
+
+``footprint`` measures the peak bytes per pixel a stage allocates, which
+the benchmark suite reports per stage.
+"""
+
+import os
+import tracemalloc
+
+import numpy as np
+
+WORKING_DTYPE = np.float32
+PRECISIONS = {"float32": np.float32, "float16": np.float16}
+
+_precision = os.environ.get("NINLAB_PRECISION", "float32")
+_audit = os.environ.get("NINLAB_DTYPE_AUDIT", "0") not in ("", "0")
+
+
+class DtypeAuditError(TypeError):
+    pass
+
+
+def get_precision():
+    return _precision
+
+
+def set_precision(name):
+    """"float32" or "float16" (storage of preview intermediates)"""
+    global _precision
+    if name not in PRECISIONS:
+        raise ValueError(f"unknown precision: {name}")
+    _precision = name
+
+
+def storage_dtype(preview=False):
+    """dtype for full-size intermediates that are kept around"""
+    return PRECISIONS[_precision] if preview else WORKING_DTYPE
+
+
+def set_audit(enabled):
+    global _audit
+    _audit = bool(enabled)
+
+
+def auditing():
+    return _audit
+
+
+def check(arr, stage):
+    """Raise DtypeAuditError if a stage left the working dtype (when auditing)"""
+    if _audit and getattr(arr, "dtype", None) != WORKING_DTYPE:
+        raise DtypeAuditError(f"{stage}: produced {getattr(arr, 'dtype', type(arr))}, "
+                              f"expected {np.dtype(WORKING_DTYPE)}")
+    return arr
+
+
+def footprint(fn, rgb, *args, **kwargs):
+    """(output, peak bytes allocated per pixel) of fn(rgb, ...)"""
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    try:
+        out = fn(rgb, *args, **kwargs)
+        peak = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        if started:
+            tracemalloc.stop()
+    return out, peak / float(rgb.shape[0] * rgb.shape[1])
@@ -0,0 +1,81 @@
+"""
+Neighbour Prefetch
+
+Stepping through a shoot in Develop should not wait for the next image.
+After every selection the window prefetches the N images on either side of
+the current one, in filmstrip (sort/filter) order:
+
+1. the full image is mapped in from the disk cache (or decoded at
+   neighbour priority when it was never cached),
+2. the preview-size base is resized from the pyramid, exactly as
+   ``_kick_preview_thread`` would,
+3. the image is rendered with its current settings at the preview size.
+
+Steps 2-3 run in a low-priority PrefetchWorker. The results land in the
+item's ``preview_cache``; when the user arrives the render is shown
+straight away and only re-done once something changes.
+
+Prefetched full images are only admitted to the ImageStore if they fit
+without evicting anything (``ImageStore.admit``), so prefetching never
+pushes out images the user actually looked at.
+
+This module holds the Qt-free pieces.
+"""
+
+import numpy as np
+from PIL import Image
+
+from pyramid import select_level
+
+# Images prefetched on each side of the current one
+DEFAULT_RADIUS = 2
+
+
+def neighbour_names(order, current, radius=DEFAULT_RADIUS):
+    """
+    Names around ``current`` in ``order``, nearest first and forward before
+    backward (+1, -1, +2, -2, ...). Empty if ``current`` is not in ``order``.
+    """
+    try:
+        row = order.index(current)
+    except ValueError:
+        return []
+    out = []
+    for d in range(1, int(radius) + 1):
+        for r in (row + d, row - d):
+            if 0 <= r < len(order):
+                out.append(order[r])
+    return out
+
+
+def settings_hash(settings):
+    return str(sorted(settings.items()))
+
+
+def render_key(settings, use_edge, sharpen_amt):
+    """preview_cache key of a finished single-view render"""
+    return ("render", int(use_edge), float(sharpen_amt), settings_hash(settings))
+
+
+def make_preview_base(full, levels, use_edge):
+    """8-bit preview base with long edge ``use_edge``, from the smallest covering level"""
+    src = select_level(full, levels, use_edge)
+    if src.dtype == np.uint16:
+        # Simple 16-bit to 8-bit conversion (shift right by 8 bits)
+        src = (src >> 8).astype(np.uint8)
+    h, w = src.shape[:2]
+    if max(h, w) <= use_edge:
+        return src
+    s = use_edge / float(max(h, w))
+    nw, nh = int(w * s), int(h * s)
+    return np.array(Image.fromarray(np.ascontiguousarray(src)).resize((nw, nh), Image.BILINEAR),
+                    dtype=np.uint8)
+
+
+def render_preview(base, settings, sharpen_amt):
+    """The non-live single-view preview PreviewWorker would produce for ``base``"""
+    from imaging import process_image_fast, apply_transforms, preview_sharpen
+    from denoise import PREVIEW_METHOD
+    out = process_image_fast(base, settings, fast_mode=False, denoise_method=PREVIEW_METHOD)
+    out = apply_transforms(out, settings)
+    return preview_sharpen(out, sharpen_amt)
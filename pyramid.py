@@ -0,0 +1,81 @@
+"""
+Image Pyramid
+
+Power-of-two downsampled copies of a decoded image. Level 0 is the full
+image; level k is the full image reduced by 2**k on each side. Levels are
+built once at decode time, persisted in the preview cache next to the full
+array, and used wherever a smaller working copy is enough (preview, crop
+dialog, auto white balance / exposure).
+"""
+
+import numpy as np
+
+# Stop building levels once the long edge would drop below this size
+MIN_LEVEL_EDGE = 256
+
+# Rows per chunk when averaging, keeps the uint32 accumulator small
+_CHUNK_ROWS = 512
+
+
+def downsample2x(arr):
+    """Halve an (H, W, C) uint8/uint16 image with a 2x2 box filter.
+
+    A trailing odd row/column is dropped, matching how levels are addressed.
+    """
+    h2, w2 = arr.shape[0] // 2, arr.shape[1] // 2
+    out = np.empty((h2, w2) + arr.shape[2:], dtype=arr.dtype)
+
+    for y0 in range(0, h2, _CHUNK_ROWS):
+        y1 = min(h2, y0 + _CHUNK_ROWS)
+        a = arr[2 * y0:2 * y1, :2 * w2]
+        acc = a[0::2, 0::2].astype(np.uint32)
+        acc += a[1::2, 0::2]
+        acc += a[0::2, 1::2]
+        acc += a[1::2, 1::2]
+        acc += 2  # round to nearest
+        acc >>= 2
+        out[y0:y1] = acc
+    return out
+
+
+def build_pyramid(full, min_edge=MIN_LEVEL_EDGE):
+    """Return [level1, level2, ...] for ``full`` (level 0 itself is not included)."""
+    levels = []
+    cur = full
+    while min(cur.shape[0], cur.shape[1]) >= 2 and max(cur.shape[0], cur.shape[1]) // 2 >= min_edge:
+        cur = downsample2x(cur)
+        levels.append(cur)
+    return levels
+
+
+def level_keys(levels):
+    """Cache entry names for a list of levels: level1, level2, ..."""
+    return {f"level{i}": lvl for i, lvl in enumerate(levels, start=1)}
+
+
+def levels_from_cache(cached):
+    """Collect level arrays from a cache dict in level order."""
+    levels = []
+    i = 1
+    while f"level{i}" in cached:
+        levels.append(cached[f"level{i}"])
+        i += 1
+    return levels
+
+
+def select_level(full, levels, long_edge):
+    """
+    Return the smallest level whose long edge is at least ``long_edge``.
+
+    Falls back to ``full`` when no smaller level is large enough (or when no
+    pyramid is available). ``long_edge`` of None/0 always returns ``full``.
+    """
+    if not long_edge or long_edge <= 0 or not levels:
+        return full
+    best = full
+    for lvl in levels:
+        if max(lvl.shape[0], lvl.shape[1]) >= long_edge:
+            best = lvl
+        else:
+            break
+    return best
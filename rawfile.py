@@ -0,0 +1,536 @@
+"""
+RAW File Reader
+
+Pure-Python, read-only access to the structure of camera RAW files through
+``mmap``. Nothing here demosaics: it locates the JPEG previews that cameras
+embed in every RAW (IFD0 / SubIFD previews, JpgFromRaw, RAF and CR3
+preview boxes) so culling and the library can show a full-size proxy
+without running LibRaw, and reads the common EXIF fields (orientation,
+camera, exposure, lens, dimensions) without spawning exiftool.
+
+Supported containers:
+    TIFF-based   NEF, NRW, ARW, DNG, CR2, SRW, PEF (``II*\\0`` / ``MM\\0*``)
+    ORF / RW2    TIFF variants with their own magic numbers
+    RAF          Fujifilm header pointing at an embedded JPEG
+    CR3          ISO-BMFF with a ``PRVW`` preview box and ``CMT1``/``CMT2``
+                 TIFF IFDs (IFD0 and Exif IFD)
+    JPEG         EXIF from the APP1 segment (also used for RAF previews)
+"""
+
+import mmap
+import struct
+from collections import namedtuple
+
+# offset/length of the JPEG stream inside the file, decoded size in pixels
+EmbeddedPreview = namedtuple("EmbeddedPreview", "offset length width height")
+
+# TIFF tags used while walking IFDs
+TAG_COMPRESSION = 0x0103
+TAG_STRIP_OFFSETS = 0x0111
+TAG_ORIENTATION = 0x0112
+TAG_STRIP_BYTE_COUNTS = 0x0117
+TAG_SUBIFDS = 0x014A
+TAG_JPEG_OFFSET = 0x0201        # JPEGInterchangeFormat (PreviewImageStart)
+TAG_JPEG_LENGTH = 0x0202        # JPEGInterchangeFormatLength
+TAG_EXIF_IFD = 0x8769
+TAG_RW2_JPG_FROM_RAW = 0x002E   # Panasonic stores the preview as an UNDEFINED blob
+TAG_IMAGE_WIDTH = 0x0100
+TAG_IMAGE_LENGTH = 0x0101
+
+# Fields returned by read_exif, named like exiftool's tags
+_IFD0_FIELDS = {0x010F: "Make", 0x0110: "Model", TAG_ORIENTATION: "Orientation"}
+_EXIF_FIELDS = {
+    0x829A: "ExposureTime", 0x829D: "FNumber", 0x8827: "ISO", 0x8832: "ISO",
+    0x9003: "DateTimeOriginal", 0xA434: "LensModel",
+    0xA002: "ImageWidth", 0xA003: "ImageHeight",
+}
+
+_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8, 13: 4}
+_TIFF_MAGICS = (42, 0x4F52, 0x5352, 0x55)  # TIFF, ORF "RO", ORF "RS", RW2
+
+# Guard against corrupt or hostile files
+_MAX_IFDS = 64
+_MAX_ENTRIES = 1024
+
+# JPEG start-of-frame markers PIL can decode (baseline, extended, progressive).
+# Lossless JPEG (SOF3) is the raw sensor data in CR2/DNG and is skipped.
+_DECODABLE_SOF = (0xC0, 0xC1, 0xC2)
+
+
+def _open_map(path):
+    f = open(path, "rb")
+    try:
+        return f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except Exception:
+        f.close()
+        raise
+
+
+def jpeg_dimensions(buf, offset=0, limit=None):
+    """
+    Return (width, height) of a JPEG stream starting at ``offset`` by reading
+    its SOF marker, or None if it is not a JPEG PIL can decode.
+    """
+    end = len(buf) if limit is None else min(len(buf), offset + limit)
+    if offset + 4 > end or buf[offset:offset + 2] != b"\xff\xd8":
+        return None
+    pos = offset + 2
+    while pos + 4 <= end:
+        if buf[pos] != 0xFF:
+            return None
+        marker = buf[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        seg_len = struct.unpack(">H", buf[pos + 2:pos + 4])[0]
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            if marker not in _DECODABLE_SOF or pos + 9 > end:
+                return None
+            h, w = struct.unpack(">HH", buf[pos + 5:pos + 9])
+            return (w, h) if w and h else None
+        if marker in (0xD9, 0xDA):  # EOI / SOS before any SOF
+            return None
+        pos += 2 + seg_len
+    return None
+
+
+def _jpeg_end(buf, offset, end):
+    """Offset just past the EOI of the JPEG at ``offset``, or None."""
+    pos = offset + 2
+    while pos + 4 <= end:
+        if buf[pos] != 0xFF:
+            return None
+        marker = buf[pos + 1]
+        if marker == 0xDA:
+            # Entropy-coded data never contains a bare FFD9 (0xFF is stuffed)
+            eoi = buf.find(b"\xff\xd9", pos, end)
+            return eoi + 2 if eoi != -1 else None
+        if marker == 0xFF:
+            pos += 1
+            continue
+        pos += 2 + struct.unpack(">H", buf[pos + 2:pos + 4])[0]
+    return None
+
+
+class _Tiff:
+    """Minimal IFD walker over a buffer (mmap or bytes) starting at ``base``."""
+
+    def __init__(self, buf, base=0):
+        self.buf = buf
+        self.base = base
+        order = bytes(buf[base:base + 2])
+        if order == b"II":
+            self.e = "<"
+        elif order == b"MM":
+            self.e = ">"
+        else:
+            raise ValueError("not a TIFF structure")
+        magic, first = struct.unpack(self.e + "HI", buf[base + 2:base + 8])
+        if magic not in _TIFF_MAGICS:
+            raise ValueError("unknown TIFF magic")
+        self.magic = magic
+        self.first_ifd = first
+
+    def read_ifd(self, off):
+        """Return ({tag: (type, count, value_offset_or_inline)}, next_ifd)."""
+        buf, e, base = self.buf, self.e, self.base
+        pos = base + off
+        if off <= 0 or pos + 2 > len(buf):
+            return {}, 0
+        n = struct.unpack(e + "H", buf[pos:pos + 2])[0]
+        if n > _MAX_ENTRIES or pos + 2 + n * 12 + 4 > len(buf):
+            return {}, 0
+        tags = {}
+        for i in range(n):
+            p = pos + 2 + i * 12
+            tag, typ, count = struct.unpack(e + "HHI", buf[p:p + 8])
+            tags[tag] = (typ, count, p + 8)
+        nxt = struct.unpack(e + "I", buf[pos + 2 + n * 12:pos + 6 + n * 12])[0]
+        return tags, nxt
+
+    def values(self, entry):
+        """Decode the integer values of an IFD entry (SHORT/LONG/BYTE/UNDEFINED offsets)."""
+        typ, count, p = entry
+        size = _TYPE_SIZES.get(typ, 1) * count
+        if size > 4:
+            p = self.base + struct.unpack(self.e + "I", self.buf[p:p + 4])[0]
+        if typ == 3:
+            fmt = "H"
+        elif typ in (4, 9, 13):
+            fmt = "I"
+        elif typ in (1, 6, 7):
+            fmt = "B"
+        else:
+            return []
+        count = min(count, 4096)
+        width = struct.calcsize(fmt)
+        if p + width * count > len(self.buf):
+            return []
+        return list(struct.unpack(self.e + fmt * count, self.buf[p:p + width * count]))
+
+    def value(self, entry, default=None):
+        vals = self.values(entry)
+        return vals[0] if vals else default
+
+    def _data_pos(self, entry, size):
+        p = entry[2]
+        if size > 4:
+            p = self.base + struct.unpack(self.e + "I", self.buf[p:p + 4])[0]
+        return p
+
+    def ascii(self, entry):
+        """String value of an ASCII entry (None if empty or not text)."""
+        typ, count, _ = entry
+        if typ not in (1, 2, 7):
+            return None
+        count = min(count, 1024)
+        p = self._data_pos(entry, count)
+        text = bytes(self.buf[p:p + count]).split(b"\x00", 1)[0]
+        return text.decode("utf-8", errors="replace").strip() or None
+
+    def rational(self, entry):
+        """First value of a (S)RATIONAL entry as a float (None if invalid)."""
+        typ, count, _ = entry
+        if typ not in (5, 10) or count < 1:
+            return None
+        p = self._data_pos(entry, 8 * count)
+        if p + 8 > len(self.buf):
+            return None
+        num, den = struct.unpack(self.e + ("II" if typ == 5 else "ii"), self.buf[p:p + 8])
+        return num / den if den else None
+
+    def field(self, entry):
+        """Best-effort Python value of an entry: str, float or int."""
+        typ = entry[0]
+        if typ == 2:
+            return self.ascii(entry)
+        if typ in (5, 10):
+            return self.rational(entry)
+        return self.value(entry)
+
+    def data_span(self, entry):
+        """(absolute offset, length) of an UNDEFINED/BYTE blob entry."""
+        typ, count, p = entry
+        if count <= 4:
+            return p, count
+        return self.base + struct.unpack(self.e + "I", self.buf[p:p + 4])[0], count
+
+    def walk(self):
+        """Yield every IFD (tag dict) reachable from IFD0: chain, SubIFDs and Exif IFD."""
+        todo = [self.first_ifd]
+        seen = set()
+        while todo and len(seen) < _MAX_IFDS:
+            off = todo.pop(0)
+            if not off or off in seen:
+                continue
+            seen.add(off)
+            tags, nxt = self.read_ifd(off)
+            if not tags:
+                continue
+            yield off, tags
+            if TAG_SUBIFDS in tags:
+                todo.extend(self.values(tags[TAG_SUBIFDS]))
+            if TAG_EXIF_IFD in tags:
+                todo.append(self.value(tags[TAG_EXIF_IFD], 0))
+            todo.append(nxt)
+
+
+def _tiff_previews(buf, base=0):
+    """Collect decodable JPEG previews referenced from a TIFF structure."""
+    tiff = _Tiff(buf, base)
+    spans = []
+    for _, tags in tiff.walk():
+        if TAG_JPEG_OFFSET in tags and TAG_JPEG_LENGTH in tags:
+            spans.append((base + tiff.value(tags[TAG_JPEG_OFFSET], 0),
+                          tiff.value(tags[TAG_JPEG_LENGTH], 0)))
+        if TAG_STRIP_OFFSETS in tags and TAG_STRIP_BYTE_COUNTS in tags:
+            # A single-strip JPEG-compressed image (CR2 IFD0, DNG previews).
+            # Old-style (6) and new-style (7) JPEG both qualify; the SOF check
+            # below rejects the lossless raw data that shares those codes.
+            if TAG_COMPRESSION in tags and tiff.value(tags[TAG_COMPRESSION]) in (6, 7):
+                offs = tiff.values(tags[TAG_STRIP_OFFSETS])
+                counts = tiff.values(tags[TAG_STRIP_BYTE_COUNTS])
+                if len(offs) == 1 and len(counts) == 1:
+                    spans.append((base + offs[0], counts[0]))
+        if tiff.magic == 0x55 and TAG_RW2_JPG_FROM_RAW in tags:
+            spans.append(tiff.data_span(tags[TAG_RW2_JPG_FROM_RAW]))
+    return spans
+
+
+def _raf_previews(buf):
+    # RAF header: big-endian JPEG offset/length at bytes 84 and 88
+    if len(buf) < 92:
+        return []
+    off, length = struct.unpack(">II", buf[84:92])
+    return [(off, length)]
+
+
+def _iter_boxes(buf, start, end):
+    """Yield (type, payload_start, box_end) for ISO-BMFF boxes in [start, end)."""
+    pos = start
+    while pos + 8 <= end:
+        size, typ = struct.unpack(">I4s", buf[pos:pos + 8])
+        hdr = 8
+        if size == 1:
+            if pos + 16 > end:
+                return
+            size = struct.unpack(">Q", buf[pos + 8:pos + 16])[0]
+            hdr = 16
+        elif size == 0:
+            size = end - pos
+        if size < hdr or pos + size > end:
+            return
+        yield typ, pos + hdr, pos + size
+        pos += size
+
+
+CR3_TAGS = (b"PRVW", b"CMT1", b"CMT2")
+
+
+def _walk_cr3(buf, start, end, found, depth=0):
+    for typ, payload, box_end in _iter_boxes(buf, start, end):
+        if typ in CR3_TAGS:
+            found.setdefault(typ, (payload, box_end))
+        elif typ == b"moov" and depth < 4:
+            _walk_cr3(buf, payload, box_end, found, depth + 1)
+        elif typ == b"uuid" and depth < 4:
+            # 16-byte usertype; the PRVW uuid has 8 more bytes before its box
+            for skip in (16, 24):
+                before = len(found)
+                _walk_cr3(buf, payload + skip, box_end, found, depth + 1)
+                if len(found) > before:
+                    break
+
+
+def _cr3_boxes(buf):
+    """Locate the CR3 PRVW preview box and the CMT1 (IFD0) / CMT2 (Exif) TIFFs."""
+    found = {}
+    # The Canon uuid box in moov holds CMT1..4 and THMB; PRVW lives in its
+    # own top-level uuid box. The box tree is walked (mdat is skipped by its
+    # size); a byte search near the start covers files it cannot parse.
+    limit = min(len(buf), 4 * 1024 * 1024)
+    _walk_cr3(buf, 0, len(buf), found)
+    for tag in CR3_TAGS:
+        if tag in found:
+            continue
+        idx = buf.find(tag, 0, limit)
+        if idx >= 4:
+            size = struct.unpack(">I", buf[idx - 4:idx])[0]
+            if 8 < size and idx - 4 + size <= len(buf):
+                found[tag] = (idx + 4, idx - 4 + size)
+    return found
+
+
+def _cr3_previews(buf):
+    boxes = _cr3_boxes(buf)
+    spans = []
+    if b"PRVW" in boxes:
+        start, end = boxes[b"PRVW"]
+        jpg = buf.find(b"\xff\xd8", start, min(end, start + 64))
+        if jpg != -1:
+            spans.append((jpg, end - jpg))
+    return spans
+
+
+def _scan_previews(buf, limit=100 * 1024 * 1024, max_hits=50):
+    """Last resort for unknown layouts: every SOI marker in the first ``limit`` bytes."""
+    spans = []
+    start = 0
+    end = min(len(buf), limit)
+    for _ in range(max_hits):
+        idx = buf.find(b"\xff\xd8\xff", start, end)
+        if idx == -1:
+            break
+        stop = _jpeg_end(buf, idx, end)
+        if stop:
+            spans.append((idx, stop - idx))
+        start = idx + 2
+    return spans
+
+
+def _container(buf):
+    head = bytes(buf[:16])
+    if head.startswith(b"\xff\xd8"):
+        return "jpeg"
+    if head.startswith(b"FUJIFILMCCD-RAW"):
+        return "raf"
+    if head[4:8] == b"ftyp" and head[8:12] == b"crx ":
+        return "cr3"
+    if head[:2] in (b"II", b"MM"):
+        return "tiff"
+    return None
+
+
+def find_previews(buf):
+    """All decodable embedded JPEG previews in a RAW buffer, largest first."""
+    kind = _container(buf)
+    try:
+        if kind == "tiff":
+            spans = _tiff_previews(buf)
+        elif kind == "raf":
+            spans = _raf_previews(buf)
+        elif kind == "cr3":
+            spans = _cr3_previews(buf) or _scan_previews(buf)
+        else:
+            spans = []
+    except (ValueError, struct.error):
+        spans = []
+
+    previews = []
+    seen = set()
+    for off, length in spans:
+        if off in seen or off <= 0 or length <= 0 or off + 4 > len(buf):
+            continue
+        seen.add(off)
+        dims = jpeg_dimensions(buf, off, length)
+        if dims:
+            length = min(length, len(buf) - off)
+            previews.append(EmbeddedPreview(off, length, dims[0], dims[1]))
+    previews.sort(key=lambda p: p.width * p.height, reverse=True)
+    return previews
+
+
+def _jpeg_exif_base(buf, offset=0, limit=None):
+    """Offset of the TIFF header inside a JPEG's APP1 Exif segment, or None."""
+    end = len(buf) if limit is None else min(len(buf), offset + limit)
+    pos = offset + 2
+    while pos + 4 <= end:
+        if buf[pos] != 0xFF:
+            return None
+        marker = buf[pos + 1]
+        if marker in (0xDA, 0xD9):
+            return None
+        seg_len = struct.unpack(">H", buf[pos + 2:pos + 4])[0]
+        if marker == 0xE1 and bytes(buf[pos + 4:pos + 10]) == b"Exif\x00\x00":
+            return pos + 10
+        pos += 2 + seg_len
+    return None
+
+
+def _collect(tiff, tags, fields, out):
+    for tag, name in fields.items():
+        if tag in tags and name not in out:
+            val = tiff.field(tags[tag])
+            if val not in (None, "", 0):
+                out[name] = val
+
+
+def _exif_from_tiff(tiff, out):
+    """IFD0 and Exif IFD fields of one TIFF structure into ``out``."""
+    tags, _ = tiff.read_ifd(tiff.first_ifd)
+    _collect(tiff, tags, _IFD0_FIELDS, out)
+    if TAG_EXIF_IFD in tags:
+        exif, _ = tiff.read_ifd(tiff.value(tags[TAG_EXIF_IFD], 0))
+        _collect(tiff, exif, _EXIF_FIELDS, out)
+
+
+def _largest_ifd_dims(tiff):
+    best = (0, 0)
+    for _, tags in tiff.walk():
+        if TAG_IMAGE_WIDTH in tags and TAG_IMAGE_LENGTH in tags:
+            w = tiff.value(tags[TAG_IMAGE_WIDTH], 0)
+            h = tiff.value(tags[TAG_IMAGE_LENGTH], 0)
+            if w * h > best[0] * best[1]:
+                best = (w, h)
+    return best
+
+
+def read_exif(buf):
+    """
+    Common EXIF fields of a RAW, JPEG or TIFF buffer without spawning exiftool.
+
+    Returns a dict using exiftool's tag names, holding only the fields that
+    were found: Orientation, Make, Model, ISO, ExposureTime (seconds),
+    FNumber, LensModel, DateTimeOriginal, ImageWidth, ImageHeight.
+    """
+    out = {}
+    try:
+        kind = _container(buf)
+        if kind == "tiff":
+            tiff = _Tiff(buf)
+            _exif_from_tiff(tiff, out)
+            if "ImageWidth" not in out:
+                w, h = _largest_ifd_dims(tiff)
+                if w and h:
+                    out["ImageWidth"], out["ImageHeight"] = w, h
+        elif kind == "cr3":
+            boxes = _cr3_boxes(buf)
+            if b"CMT1" in boxes:
+                tiff = _Tiff(buf, boxes[b"CMT1"][0])
+                tags, _ = tiff.read_ifd(tiff.first_ifd)
+                _collect(tiff, tags, _IFD0_FIELDS, out)
+            if b"CMT2" in boxes:
+                # CMT2 is the Exif IFD stored as its own TIFF structure
+                tiff = _Tiff(buf, boxes[b"CMT2"][0])
+                tags, _ = tiff.read_ifd(tiff.first_ifd)
+                _collect(tiff, tags, _EXIF_FIELDS, out)
+        elif kind in ("jpeg", "raf"):
+            off = 0
+            if kind == "raf":
+                prev = _raf_previews(buf)
+                off = prev[0][0] if prev else 0
+            base = _jpeg_exif_base(buf, off) if off or kind == "jpeg" else None
+            if base is not None:
+                _exif_from_tiff(_Tiff(buf, base), out)
+    except (ValueError, struct.error):
+        pass
+    orientation = out.get("Orientation")
+    if orientation is not None and not (isinstance(orientation, int) and 1 <= orientation <= 8):
+        del out["Orientation"]
+    return out
+
+
+def read_exif_file(path):
+    """read_exif for a file on disk (mmap, only the touched pages are read)."""
+    try:
+        f, mm = _open_map(path)
+    except (OSError, ValueError):
+        return {}
+    try:
+        return read_exif(mm)
+    finally:
+        mm.close()
+        f.close()
+
+
+def read_orientation(buf):
+    """EXIF orientation (1-8) of a RAW buffer, or 1 if unknown."""
+    return read_exif(buf).get("Orientation", 1)
+
+
+def pick_preview(previews, min_long_edge=None):
+    """
+    Choose a preview: the largest, or with ``min_long_edge`` the smallest one
+    whose long edge still covers it (falling back to the largest).
+    """
+    if not previews:
+        return None
+    if min_long_edge:
+        covering = [p for p in previews if max(p.width, p.height) >= min_long_edge]
+        if covering:
+            return covering[-1]
+    return previews[0]
+
+
+def extract_preview(path, min_long_edge=None):
+    """
+    Read the embedded JPEG preview of a RAW file.
+
+    Returns (jpeg_bytes, orientation) or (None, 1) when the file has no
+    decodable preview. Only the chosen JPEG is copied out of the mapping.
+    """
+    try:
+        f, mm = _open_map(path)
+    except (OSError, ValueError):
+        return None, 1
+    try:
+        prev = pick_preview(find_previews(mm), min_long_edge)
+        if prev is None:
+            return None, 1
+        return mm[prev.offset:prev.offset + prev.length], read_orientation(mm)
+    finally:
+        mm.close()
+        f.close()
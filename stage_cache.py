@@ -0,0 +1,155 @@
+"""
+Stage Cache
+
+A slider edit used to re-render from exposure onward. Changing the
+vignette on an image with heavy denoise re-ran the denoise every time.
+
+The pipeline is declared here as an ordered graph of stages (STAGES), each
+with the settings it reads. The fingerprint of a stage covers the source
+pixels, the render options and the settings of that stage and every stage
+before it. The outputs of the full-frame stages in a plan (denoise,
+clarity, texture) are checkpoints. They are memoized by fingerprint in an
+LRU bounded by ``budget_bytes``. A render starts from the deepest
+checkpoint whose fingerprint is cached. Everything before it is skipped,
+and the post-denoise buffer is reused while later stages are adjusted.
+
+Point-wise stages between checkpoints are cheap and fused, so they are
+never cached on their own. The preview cache stores checkpoints at the
+preview precision (precision.py), so float16 halves its footprint.
+"""
+
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+import fused_pipeline
+import precision
+import tile_engine
+from imaging import _COLORS
+
+# Pipeline order; (stage, settings it reads)
+STAGES = [
+    ("exposure", ("exposure",)),
+    ("white_balance", ("temperature", "tint")),
+    ("tone", ("highlights", "shadows", "whites", "blacks")),
+    ("dehaze", ("dehaze",)),
+    ("denoise", ("denoise",)),
+    ("color", ("saturation", "vibrance", "contrast", "gamma", "curve_lut", "mid_contrast")),
+    ("clarity", ("clarity",)),
+    ("texture", ("texture",)),
+    ("hsl", tuple(f"{p}_{c}" for c in _COLORS for p in "hsl")),
+    ("vignette", ("vignette",)),
+    ("defringe", ("defringe",)),
+    ("grain", ("grain_amount", "grain_size", "grain_roughness", "grain_seed")),
+]
+# Settings the colour pipeline never reads (geometry, output sharpening, unused)
+IGNORED_KEYS = ("angle", "rotate", "flip_h", "crop", "export_sharpen", "tone_curve")
+
+DEFAULT_BUDGET_MB = 256
+
+
+def _value(v):
+    if isinstance(v, np.ndarray):
+        return ("nd", v.dtype.str, v.shape, zlib.crc32(np.ascontiguousarray(v).tobytes()))
+    if isinstance(v, list):
+        return tuple(v)
+    return v
+
+
+def source_fingerprint(src):
+    a = np.ascontiguousarray(src)
+    return (a.shape, a.dtype.str, zlib.crc32(memoryview(a).cast("B")))
+
+
+def fingerprints(adj, base=()):
+    """{stage: fingerprint of that stage's output} for every stage in STAGES"""
+    out, acc = {}, tuple(base)
+    for name, keys in STAGES:
+        acc = (acc, name, tuple(_value(adj.get(k)) for k in keys))
+        out[name] = acc
+    return out
+
+
+class StageCache:
+    def __init__(self, budget_bytes=None, preview=False):
+        self.budget_bytes = int(budget_bytes or DEFAULT_BUDGET_MB * 1024 * 1024)
+        self.preview = preview  # store at precision.storage_dtype(preview=True)
+        self._entries = OrderedDict()   # fingerprint -> float32 image; oldest first
+        self._resident = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            x = self._entries.get(key)
+            if x is not None:
+                self._entries.move_to_end(key)
+            return x
+
+    def put(self, key, x):
+        """Store ``x`` at the cache's precision; returns the stored array"""
+        x = x.astype(precision.storage_dtype(self.preview), copy=False)
+        if x.nbytes > self.budget_bytes:
+            return x
+        x.setflags(write=False)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._resident -= old.nbytes
+            self._entries[key] = x
+            self._resident += x.nbytes
+            while self._resident > self.budget_bytes:
+                _, old = self._entries.popitem(last=False)
+                self._resident -= old.nbytes
+        return x
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._resident = 0
+
+    def resident_bytes(self):
+        return self._resident
+
+    def render(self, src, adj, fast_mode=False, out_dtype=np.float32, frame=None,
+               lut_size=None, denoise_method=None):
+        """tile_engine.render(), resumed from the deepest cached checkpoint"""
+        if lut_size:
+            import lut3d
+            steps = lut3d.baked_plan(adj, fast_mode, lut_size, denoise_method=denoise_method)
+        else:
+            steps = fused_pipeline.plan(adj, fast_mode, denoise_method)
+        cuts = [i for i, st in enumerate(steps) if st[0] == "full" and getattr(st[1], "stage", None)]
+        if not cuts:
+            return tile_engine.render(src, adj, fast_mode, out_dtype, frame=frame, steps=steps)
+
+        base = (source_fingerprint(src), frame, bool(fast_mode), lut_size, denoise_method)
+        fps = fingerprints(adj, base)
+        key = {i: fps[steps[i][1].stage] for i in cuts}
+
+        start, x = 0, src
+        for i in reversed(cuts):
+            cached = self.get(key[i])
+            if cached is not None:
+                start, x = i + 1, cached
+                break
+        if start:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+        for i in cuts:
+            if i < start:
+                continue
+            x = tile_engine.render(x, adj, fast_mode, np.float32, frame=frame, steps=steps[start:i + 1])
+            # continue from the stored copy so cold and warm renders agree
+            x = self.put(key[i], x)
+            start = i + 1
+        return tile_engine.render(x, adj, fast_mode, out_dtype, frame=frame, steps=steps[start:])
+
+
+# Shared by the preview workers: the image being edited stays warm
+preview_cache = StageCache(preview=True)
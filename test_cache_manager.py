@@ -0,0 +1,62 @@
+import os
+import numpy as np
+import cache_manager
+
+
+def _use_tmp_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_manager, "CACHE_DIR", tmp_path / "cache")
+    cache_manager.CACHE_DIR.mkdir()
+    src = tmp_path / "IMG_0001.ARW"
+    src.write_bytes(b"raw bytes")
+    return src
+
+
+def test_roundtrip_is_memory_mapped(tmp_path, monkeypatch):
+    src = _use_tmp_cache(tmp_path, monkeypatch)
+    full = (np.arange(60 * 40 * 3, dtype=np.uint16).reshape(60, 40, 3) * 7)
+    thumb = np.full((12, 8, 3), 200, dtype=np.uint8)
+
+    cache_manager.save_to_cache(str(src), full, thumb)
+    cached = cache_manager.load_from_cache(str(src))
+
+    assert isinstance(cached["full"], np.memmap)
+    assert not cached["full"].flags.writeable
+    assert cached["full"].dtype == np.uint16
+    np.testing.assert_array_equal(cached["full"], full)
+    np.testing.assert_array_equal(cached["thumb"], thumb)
+
+    # Uncompressed: full array is stored verbatim after the fixed header
+    size = cache_manager.get_cache_path(str(src)).stat().st_size
+    assert size >= cache_manager.HEADER_SIZE + full.nbytes
+
+
+def test_invalidated_by_source_change(tmp_path, monkeypatch):
+    src = _use_tmp_cache(tmp_path, monkeypatch)
+    arr = np.zeros((4, 4, 3), dtype=np.uint8)
+    cache_manager.save_to_cache(str(src), arr, arr)
+    assert cache_manager.load_from_cache(str(src)) is not None
+
+    src.write_bytes(b"different raw bytes")
+    os.utime(src, (1_000_000, 1_000_000))
+    assert cache_manager.load_from_cache(str(src)) is None
+
+
+def test_invalidated_by_pipeline_version(tmp_path, monkeypatch):
+    src = _use_tmp_cache(tmp_path, monkeypatch)
+    arr = np.zeros((4, 4, 3), dtype=np.uint8)
+    cache_manager.save_to_cache(str(src), arr, arr)
+
+    monkeypatch.setattr(cache_manager, "PIPELINE_VERSION", cache_manager.PIPELINE_VERSION + 1)
+    assert cache_manager.load_from_cache(str(src)) is None
+    assert not cache_manager.is_cache_valid(str(src), cache_manager.get_cache_path(str(src)))
+
+
+def test_thumbnail_only_entry(tmp_path, monkeypatch):
+    src = _use_tmp_cache(tmp_path, monkeypatch)
+    thumb = np.full((12, 8, 3), 90, dtype=np.uint8)
+    cache_manager.save_to_cache(str(src), None, thumb)
+
+    # A thumb-only entry serves the grid but is a miss for the full image
+    cached = cache_manager.load_from_cache(str(src), keys=("thumb",))
+    np.testing.assert_array_equal(cached["thumb"], thumb)
+    assert cache_manager.load_from_cache(str(src)) is None
@@ -0,0 +1,43 @@
+import numpy as np
+from PIL import Image
+
+import cache_manager
+import decode_pool
+
+
+def _use_tmp_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_manager, "CACHE_DIR", tmp_path / "cache")
+    cache_manager.CACHE_DIR.mkdir()
+
+
+def test_decode_in_worker_process_returns_cached_memmap(tmp_path, monkeypatch):
+    _use_tmp_cache(tmp_path, monkeypatch)
+    src = tmp_path / "photo.png"
+    pixels = np.random.default_rng(1).integers(0, 255, (600, 900, 3), dtype=np.uint8)
+    Image.fromarray(pixels).save(src)
+
+    pool = decode_pool.DecodePool(workers=1)
+    try:
+        full, thumb, levels, is_proxy = pool.decode(str(src), (128, 96))
+        # Pixels came back through the disk cache, not a pickle
+        assert isinstance(full, np.memmap)
+        np.testing.assert_array_equal(full, pixels)
+        assert max(thumb.shape[:2]) <= 128
+        assert levels and levels[0].shape[:2] == (300, 450)
+        assert is_proxy is False
+
+        thumb2 = pool.thumbnail(str(src), (128, 96))
+        np.testing.assert_array_equal(thumb2, thumb)
+    finally:
+        pool.shutdown(wait=True)
+
+
+def test_shared_memory_handoff():
+    arr = np.arange(24, dtype=np.uint16).reshape(2, 4, 3)
+    desc = decode_pool._share(arr)
+    out = decode_pool._attach(desc)
+    np.testing.assert_array_equal(out, arr)
+
+
+def test_physical_cores_positive():
+    assert decode_pool.physical_cores() >= 1
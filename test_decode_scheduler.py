@@ -0,0 +1,83 @@
+from decode_scheduler import (DecodeScheduler, PRIORITY_BACKGROUND, PRIORITY_CURRENT,
+                              PRIORITY_NEIGHBOUR, PRIORITY_VISIBLE)
+
+
+class FakePool:
+    """QThreadPool stand-in: highest priority first, FIFO within a priority."""
+
+    def __init__(self):
+        self.queue = []
+        self._seq = 0
+
+    def start(self, runnable, priority=0):
+        self._seq += 1
+        self.queue.append((priority, self._seq, runnable))
+
+    def tryTake(self, runnable):
+        for entry in self.queue:
+            if entry[2] is runnable:
+                self.queue.remove(entry)
+                return True
+        return False
+
+    def run_order(self):
+        order = sorted(self.queue, key=lambda e: (-e[0], e[1]))
+        self.queue = []
+        return [e[2] for e in order]
+
+
+def _fill(sched, names):
+    for n in names:
+        sched.submit("thumb", n, n, PRIORITY_BACKGROUND)
+
+
+def test_current_and_visible_jump_the_backlog():
+    pool = FakePool()
+    sched = DecodeScheduler(pool)
+    names = [f"img{i:03d}" for i in range(800)]
+    _fill(sched, names)
+
+    prio = {"img700": PRIORITY_CURRENT, "img699": PRIORITY_NEIGHBOUR,
+            "img701": PRIORITY_NEIGHBOUR, "img010": PRIORITY_VISIBLE}
+    sched.reprioritize(lambda n: prio.get(n, PRIORITY_BACKGROUND))
+
+    order = pool.run_order()
+    assert order[:4] == ["img700", "img699", "img701", "img010"]
+    # The backlog keeps catalog order
+    assert order[4:7] == ["img000", "img001", "img002"]
+
+
+def test_resubmit_only_raises_priority():
+    pool = FakePool()
+    sched = DecodeScheduler(pool)
+    _fill(sched, ["a", "b"])
+    assert not sched.submit("thumb", "b", "b-again", PRIORITY_CURRENT)
+    assert not sched.submit("thumb", "b", "b-again", PRIORITY_BACKGROUND)
+    assert pool.run_order() == ["b", "a"]
+    # A different kind for the same image is a separate job
+    assert sched.submit("decode", "a", "a-full", PRIORITY_CURRENT)
+
+
+def test_cancel_removes_queued_jobs():
+    pool = FakePool()
+    sched = DecodeScheduler(pool)
+    _fill(sched, ["a", "b", "c"])
+    sched.submit("decode", "b", "b-full", PRIORITY_CURRENT)
+
+    assert sched.cancel("b") == 2
+    assert [e[2] for e in pool.queue] == ["a", "c"]
+    assert not sched.is_scheduled("thumb", "b")
+
+    pool.queue = [e for e in pool.queue if e[2] != "a"]  # "a" ran and finished
+    sched.finished("thumb", "a")
+    assert sched.cancel_all() == 1
+    assert pool.queue == [] and len(sched) == 0
+
+
+def test_reprioritize_can_skip_kinds():
+    pool = FakePool()
+    sched = DecodeScheduler(pool)
+    sched.submit("prefetch", "a", "a-pre", PRIORITY_BACKGROUND)
+    sched.submit("decode", "a", "a-full", PRIORITY_BACKGROUND)
+    sched.reprioritize(lambda n: PRIORITY_CURRENT, kinds=("decode",))
+    assert pool.run_order() == ["a-full", "a-pre"]
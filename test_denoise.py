@@ -0,0 +1,81 @@
+import time
+
+import numpy as np
+import pytest
+
+import denoise
+import fused_pipeline
+import tile_engine
+from imaging import DEFAULTS, apply_denoise
+
+
+def _noisy(h=96, w=128, sigma=0.05, seed=0):
+    rng = np.random.default_rng(seed)
+    clean = np.zeros((h, w, 3), np.float32)
+    clean[:, w // 2:] = 0.8
+    clean[:, :w // 2] = 0.2
+    noisy = np.clip(clean + rng.normal(0, sigma, clean.shape), 0, 1).astype(np.float32)
+    return clean, noisy
+
+
+@pytest.mark.parametrize("method", denoise.METHODS)
+def test_methods_reduce_noise_and_keep_edges(method):
+    clean, noisy = _noisy()
+    out = denoise.denoise(noisy, 1.0, method)
+    assert out.dtype == np.float32 and out.shape == noisy.shape
+    w = clean.shape[1]
+    flat = np.s_[:, 8:w // 2 - 8]
+    assert out[flat].std() < 0.75 * noisy[flat].std()
+    # the step survives: the two sides stay far apart
+    assert out[:, w // 2 + 4:].mean() - out[:, :w // 2 - 4].mean() > 0.55
+
+
+@pytest.mark.parametrize("amount", (0.2, 0.6, 1.0))
+def test_bilateral_is_the_original_filter(amount):
+    # one full-strength pass blended by amount == apply_denoise over the slider range
+    _, noisy = _noisy(seed=1)
+    out = denoise.denoise(noisy, amount, "bilateral")
+    assert out.dtype == np.float32
+    np.testing.assert_allclose(out, apply_denoise(noisy, amount), atol=1e-5)
+
+
+def test_zero_amount_is_identity():
+    _, noisy = _noisy()
+    for method in denoise.METHODS:
+        assert denoise.denoise(noisy, 0.0, method) is noisy
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        denoise.denoise(_noisy()[1], 0.5, "median")
+
+
+def test_quality_ladder():
+    assert denoise.method_for("preview") == denoise.PREVIEW_METHOD
+    assert denoise.method_for("export") == denoise.EXPORT_METHOD
+    assert denoise.PREVIEW_METHOD != denoise.EXPORT_METHOD
+
+
+@pytest.mark.parametrize("method", denoise.METHODS)
+def test_strips_are_seamless(method):
+    adj = dict(DEFAULTS, denoise=0.9, saturation=0.2)
+    src = (np.random.default_rng(4).random((203, 97, 3)) * 255).astype(np.uint8)
+    single = fused_pipeline.run(src, adj, out_dtype=np.uint8, denoise_method=method)
+    tiled = tile_engine.render(src, adj, out_dtype=np.uint8, workers=4, min_rows=16,
+                               denoise_method=method)
+    assert np.array_equal(single, tiled)
+
+
+@pytest.mark.parametrize("method", denoise.METHODS)
+def test_cost_and_halo_do_not_depend_on_amount(method):
+    assert denoise.halo(method, 0.1) == denoise.halo(method, 1.0)
+    _, noisy = _noisy(384, 384)
+
+    def best(amount):
+        times = []
+        for _ in range(3):
+            t0 = time.perf_counter()
+            denoise.denoise(noisy, amount, method)
+            times.append(time.perf_counter() - t0)
+        return min(times)
+    assert best(1.0) < 3.0 * best(0.1) + 0.01
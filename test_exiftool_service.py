@@ -0,0 +1,118 @@
+import sys
+import threading
+
+import exiftool_service
+from exiftool_service import ExifToolService
+
+# Speaks the -stay_open / -@ - protocol well enough for the service
+FAKE_EXIFTOOL = r'''
+import sys, json, os, time
+log = sys.argv[1]
+args = []
+for line in sys.stdin:
+    line = line.rstrip("\n")
+    if line.startswith("-execute"):
+        seq = line[len("-execute"):]
+        files, opts, skip = [], [], False
+        for a in args:
+            if skip:
+                skip = False
+            elif a == "-charset":
+                skip = True
+            elif a.startswith("-"):
+                opts.append(a)
+            else:
+                files.append(a)
+        with open(log, "a") as f:
+            f.write(f"{len(files)}\n")
+        if any("slow" in f for f in files):
+            time.sleep(0.5)
+        for f in files:
+            if "crash" in f and not os.path.exists(f + ".seen"):
+                open(f + ".seen", "w").close()
+                sys.exit(1)
+        if "-b" in opts:
+            sys.stdout.write("BIN" + opts[-1])
+        else:
+            sys.stdout.write(json.dumps([{"SourceFile": f, "Model": "Fake"} for f in files if os.path.exists(f)]))
+        sys.stdout.write("{ready%s}\n" % seq)
+        sys.stdout.flush()
+        args = []
+    elif line == "False" and args[-1:] == ["-stay_open"]:
+        break
+    else:
+        args.append(line)
+'''
+
+
+def _service(tmp_path, **kw):
+    script = tmp_path / "fake_exiftool.py"
+    script.write_text(FAKE_EXIFTOOL)
+    log = tmp_path / "calls.log"
+    return ExifToolService(exe=[sys.executable, str(script), str(log)], **kw), log
+
+
+def _files(tmp_path, n, prefix="IMG"):
+    paths = []
+    for i in range(n):
+        p = tmp_path / f"{prefix}_{i:04d}.ARW"
+        p.write_bytes(b"raw")
+        paths.append(str(p))
+    return paths
+
+
+def test_tag_reads_are_batched(tmp_path):
+    svc, log = _service(tmp_path)
+    try:
+        # Keep the process busy so the following reads queue up behind it
+        slow = _files(tmp_path, 1, prefix="slow")[0]
+        blocker = threading.Thread(target=svc.read_binary, args=(slow, "PreviewImage"))
+        blocker.start()
+        paths = _files(tmp_path, 12)
+        results = {}
+
+        def read(p):
+            results[p] = svc.read_tags(p, ["Model"])
+
+        threads = [threading.Thread(target=read, args=(p,)) for p in paths]
+        for t in threads:
+            t.start()
+        for t in threads + [blocker]:
+            t.join()
+
+        assert all(results[p]["Model"] == "Fake" for p in paths)
+        calls = [int(x) for x in log.read_text().split()]
+        # One process, far fewer commands than files
+        assert len(calls) <= 4 and max(calls) >= 6
+    finally:
+        svc.close()
+
+
+def test_binary_and_missing_file(tmp_path):
+    svc, _ = _service(tmp_path)
+    try:
+        path = _files(tmp_path, 1)[0]
+        assert svc.read_binary(path, "PreviewImage") == b"BIN-PreviewImage"
+        assert svc.read_tags(str(tmp_path / "missing.ARW"), ["Model"]) == {}
+    finally:
+        svc.close()
+
+
+def test_restarts_after_crash(tmp_path):
+    svc, _ = _service(tmp_path)
+    try:
+        path = _files(tmp_path, 1, prefix="crash")[0]
+        assert svc.read_tags(path, ["Model"])["Model"] == "Fake"
+        assert svc.restarts >= 1
+        # The replacement process keeps serving
+        other = _files(tmp_path, 1, prefix="after")[0]
+        assert svc.read_tags(other, ["Model"])["Model"] == "Fake"
+    finally:
+        svc.close()
+
+
+def test_unavailable_without_exiftool(monkeypatch):
+    monkeypatch.setattr(exiftool_service, "find_exiftool", lambda: None)
+    monkeypatch.setattr(exiftool_service, "_service", None)
+    assert not exiftool_service.get_service().available
+    assert exiftool_service.read_tags("x.ARW", ["Model"]) is None
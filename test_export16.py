@@ -0,0 +1,98 @@
+import struct
+import zlib
+
+import numpy as np
+import pytest
+
+import image_writers
+from imaging import DEFAULTS, apply_transforms, process_image_fast, resize_long_edge
+
+
+def _rgb16(h=70, w=50, seed=0):
+    return (np.random.default_rng(seed).random((h, w, 3)) * 65535).astype(np.uint16)
+
+
+def _read_png16(path):
+    data = open(path, "rb").read()
+    pos, idat, (w, h) = 8, b"", (0, 0)
+    while pos < len(data):
+        n, = struct.unpack(">I", data[pos:pos + 4])
+        kind, body = data[pos + 4:pos + 8], data[pos + 8:pos + 8 + n]
+        if kind == b"IHDR":
+            w, h, depth, ctype = struct.unpack(">IIBB", body[:10])
+            assert (depth, ctype) == (16, 2)
+        elif kind == b"IDAT":
+            idat += body
+        pos += 12 + n
+    lines = np.frombuffer(zlib.decompress(idat), np.uint8).reshape(h, 1 + w * 6)
+    assert (lines[:, 0] == 2).all()
+    raw = np.cumsum(lines[:, 1:], axis=0, dtype=np.uint8)    # undo "Up"
+    return raw.view(">u2").reshape(h, w, 3).astype(np.uint16)
+
+
+def _read_tiff16(path):
+    data = open(path, "rb").read()
+    ifd, = struct.unpack("<I", data[4:8])
+    n, = struct.unpack("<H", data[ifd:ifd + 2])
+    tags = {}
+    for i in range(n):
+        tag, typ, count, value = struct.unpack("<HHII", data[ifd + 2 + 12 * i:ifd + 14 + 12 * i])
+        if typ == 3 and count == 1:
+            value &= 0xFFFF
+        tags[tag] = (count, value)
+    w, h = tags[256][1], tags[257][1]
+    count, offs = tags[273]
+    _, cnts = tags[279]
+    if count > 1:
+        offs = struct.unpack(f"<{count}I", data[offs:offs + 4 * count])
+        cnts = struct.unpack(f"<{count}I", data[cnts:cnts + 4 * count])
+    else:
+        offs, cnts = [offs], [cnts]
+    body = b"".join(data[o:o + c] for o, c in zip(offs, cnts))
+    return np.frombuffer(body, "<u2").reshape(h, w, 3)
+
+
+@pytest.mark.parametrize("rows", [1, 16, 1000])
+def test_writers_round_trip(tmp_path, rows):
+    rgb = _rgb16()
+    image_writers.write_png16(str(tmp_path / "a.png"), rgb, rows=rows)
+    image_writers.write_tiff16(str(tmp_path / "a.tif"), rgb, rows=rows)
+    assert np.array_equal(_read_png16(tmp_path / "a.png"), rgb)
+    assert np.array_equal(_read_tiff16(tmp_path / "a.tif"), rgb)
+
+
+def test_pillow_reads_the_files(tmp_path):
+    from PIL import Image
+    rgb = _rgb16(33, 47)
+    for fmt in image_writers.FORMATS:
+        path = image_writers.write(str(tmp_path / "x"), rgb, fmt)
+        assert np.array_equal(np.array(Image.open(path)), (rgb >> 8).astype(np.uint8))
+
+
+def test_writers_reject_8bit(tmp_path):
+    with pytest.raises(ValueError):
+        image_writers.write_png16(str(tmp_path / "a.png"), np.zeros((4, 4, 3), np.uint8))
+
+
+def test_render_keeps_16_bits():
+    # a smooth gradient: 16-bit output must hold more than 256 levels
+    ramp = np.linspace(0, 65535, 4000).astype(np.uint16)
+    src = np.repeat(np.repeat(ramp[None, :, None], 4, axis=0), 3, axis=2)
+    adj = dict(DEFAULTS, exposure=0.1, contrast=0.1)
+    out16 = process_image_fast(src, adj, out_dtype=np.uint16)
+    out8 = process_image_fast(src, adj)
+    assert out16.dtype == np.uint16
+    assert len(np.unique(out16[..., 1])) > 1000
+    assert np.abs((out16.astype(np.int32) + 128) // 257 - out8).max() <= 1
+
+
+def test_transforms_and_resize_in_16_bit():
+    rgb = _rgb16(60, 80)
+    adj = dict(DEFAULTS, angle=3.0, rotate=90, flip_h=True,
+               crop={"x": 0.1, "y": 0.1, "w": 0.8, "h": 0.8}, export_sharpen=0.3)
+    out = apply_transforms(rgb, adj)
+    assert out.dtype == np.uint16
+    ref8 = apply_transforms((rgb >> 8).astype(np.uint8), adj)
+    assert out.shape == ref8.shape
+    small = resize_long_edge(out, 40)
+    assert small.dtype == np.uint16 and max(small.shape[:2]) == 40
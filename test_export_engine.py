@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import export_engine
+from imaging import DEFAULTS
+
+
+def _items(n, size=(40, 60)):
+    rng = np.random.default_rng(0)
+    return [{"name": f"/photos/IMG_{i:04d}.CR3", "settings": dict(DEFAULTS, exposure=0.1 * (i % 3)),
+             "full": (rng.random(size + (3,)) * 255).astype(np.uint8)} for i in range(n)]
+
+
+def test_end_to_end_jpeg(tmp_path):
+    seen = []
+    res = export_engine.run(_items(5), str(tmp_path), {"fmt": "JPEG", "quality": 90}, workers=3,
+                            progress=lambda d, t: seen.append((d, t)))
+    assert res["cancelled"] is False
+    assert [os.path.basename(p) for p in res["outputs"]] == [f"IMG_{i:04d}.jpg" for i in range(5)]
+    assert all(os.path.getsize(p) > 0 for p in res["outputs"])
+    assert seen == [(i, 5) for i in range(1, 6)]
+    assert res["stats"]["written"] == 5
+
+
+def test_sequence_names_follow_input_order(tmp_path, monkeypatch):
+    # later items finish first
+    def slow_render(it, opts, loader=None):
+        time.sleep(0.02 * (5 - int(it["name"][-8:-4])))
+        return it["full"]
+    monkeypatch.setattr(export_engine, "render_item", slow_render)
+    items = _items(5)
+    opts = {"fmt": "PNG", "naming_mode": "Custom Name + Sequence", "custom_text": "Wed", "start_num": 7}
+    res = export_engine.run(items, str(tmp_path), opts, workers=5)
+    assert [os.path.basename(p) for p in res["outputs"]] == [f"Wed-{7 + i:03d}.png" for i in range(5)]
+    from PIL import Image
+    for it, p in zip(items, res["outputs"]):
+        assert np.array_equal(np.array(Image.open(p)), it["full"])
+
+
+def test_queue_bounds_images_in_flight(tmp_path, monkeypatch):
+    alive, peak, lock = [0], [0], threading.Lock()
+
+    def render(it, opts, loader=None):
+        with lock:
+            alive[0] += 1
+            peak[0] = max(peak[0], alive[0])
+        return it["full"]
+
+    def write(arr, stem, opts, stats=None):
+        time.sleep(0.01)        # slow encoder
+        with lock:
+            alive[0] -= 1
+        return stem
+    monkeypatch.setattr(export_engine, "render_item", render)
+    monkeypatch.setattr(export_engine, "write_output", write)
+    export_engine.run(_items(30, (4, 4)), str(tmp_path), {}, workers=3, queue_size=2)
+    assert peak[0] <= 3 + 2 + 1
+
+
+def test_cancel_stops_between_images(tmp_path, monkeypatch):
+    cancel = threading.Event()
+
+    def progress(done, total):
+        if done == 2:
+            cancel.set()
+    res = export_engine.run(_items(10), str(tmp_path), {"fmt": "PNG"}, workers=1,
+                            progress=progress, cancel=cancel)
+    assert res["cancelled"] is True
+    written = [p for p in res["outputs"] if p]
+    assert 2 <= len(written) < 10
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(p) for p in written)
+
+
+def test_first_error_is_raised(tmp_path, monkeypatch):
+    def render(it, opts, loader=None):
+        if it["name"].endswith("0003.CR3"):
+            raise RuntimeError("decode failed")
+        return it["full"]
+    monkeypatch.setattr(export_engine, "render_item", render)
+    with pytest.raises(RuntimeError, match="decode failed"):
+        export_engine.run(_items(8), str(tmp_path), {"fmt": "PNG"}, workers=2)
+
+
+def test_16bit_formats(tmp_path):
+    items = _items(2)
+    res = export_engine.run(items, str(tmp_path), {"fmt": "TIFF 16-bit"}, workers=2)
+    assert [os.path.splitext(p)[1] for p in res["outputs"]] == [".tif", ".tif"]
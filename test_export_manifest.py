@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pytest
+
+import export_engine
+import export_manifest
+from export_manifest import ExportManifest
+from imaging import DEFAULTS
+
+
+@pytest.fixture
+def job(tmp_path, monkeypatch):
+    """(items, out_dir, project_dir, rendered names list)"""
+    rng = np.random.default_rng(0)
+    src_dir = tmp_path / "src"; src_dir.mkdir()
+    items = []
+    for i in range(6):
+        path = src_dir / f"IMG_{i}.jpg"
+        path.write_bytes(b"raw%d" % i)
+        items.append({"name": str(path), "settings": dict(DEFAULTS, exposure=0.1 * i),
+                      "full": (rng.random((24, 32, 3)) * 255).astype(np.uint8)})
+    rendered = []
+    real = export_engine.render_item
+
+    def render(it, opts, loader=None):
+        rendered.append(os.path.basename(it["name"]))
+        return real(it, opts, loader)
+    monkeypatch.setattr(export_engine, "render_item", render)
+    out_dir = tmp_path / "out"; out_dir.mkdir()
+    return items, str(out_dir), str(tmp_path / "project"), rendered
+
+
+def _run(items, out_dir, project, opts=None, **kw):
+    opts = opts or {"fmt": "PNG"}
+    return export_engine.run(items, out_dir, opts, workers=2,
+                             manifest=ExportManifest(project, out_dir, opts), **kw)
+
+
+def test_rerun_skips_everything(job):
+    items, out_dir, project, rendered = job
+    first = _run(items, out_dir, project)
+    assert len(rendered) == 6
+    with open(os.path.join(project, export_manifest.MANIFEST_NAME)) as f:
+        data = json.load(f)
+    (entry_job,) = data["jobs"].values()
+    assert entry_job["complete"] is True and len(entry_job["entries"]) == 6
+    rendered.clear()
+    seen = []
+    second = _run(items, out_dir, project, progress=lambda d, t: seen.append(d))
+    assert rendered == [] and second["stats"]["skipped"] == 6
+    assert second["outputs"] == [os.path.abspath(p) for p in first["outputs"]]
+    assert seen == [6]
+
+
+def test_only_changed_or_missing_outputs_rerender(job):
+    items, out_dir, project, rendered = job
+    outs = _run(items, out_dir, project)["outputs"]
+    rendered.clear()
+    items[1]["settings"] = dict(items[1]["settings"], saturation=0.5)     # edited
+    os.remove(outs[2])                                                   # deleted output
+    with open(outs[3], "ab") as f:                                       # tampered output
+        f.write(b"x")
+    with open(items[4]["name"], "wb") as f:                              # new source file
+        f.write(b"re-shot")
+    res = _run(items, out_dir, project)
+    assert sorted(rendered) == ["IMG_1.jpg", "IMG_2.jpg", "IMG_3.jpg", "IMG_4.jpg"]
+    assert res["stats"]["skipped"] == 2
+
+
+def test_resume_after_cancel(job):
+    items, out_dir, project, rendered = job
+    cancel = threading.Event()
+    res = export_engine.run(items, out_dir, {"fmt": "PNG"}, workers=1, cancel=cancel,
+                            progress=lambda d, t: d == 2 and cancel.set(),
+                            manifest=ExportManifest(project, out_dir, {"fmt": "PNG"}))
+    assert res["cancelled"]
+    m = ExportManifest(project, out_dir, {"fmt": "PNG"})
+    assert m.job["complete"] is False
+    done_first = set(os.path.basename(n) for n in m.entries())
+    rendered.clear()
+    res = _run(items, out_dir, project)
+    assert not res["cancelled"] and all(res["outputs"])
+    assert set(rendered) == {f"IMG_{i}.jpg" for i in range(6)} - done_first
+    assert ExportManifest(project, out_dir, {"fmt": "PNG"}).job["complete"] is True
+
+
+def test_resume_after_error(job, monkeypatch):
+    items, out_dir, project, rendered = job
+    real = export_engine.write_output
+
+    def write(arr, stem, opts, stats=None):
+        if stem.endswith("IMG_4"):
+            raise OSError("disk full")
+        return real(arr, stem, opts, stats)
+    monkeypatch.setattr(export_engine, "write_output", write)
+    with pytest.raises(OSError):
+        export_engine.run(items, out_dir, {"fmt": "PNG"}, workers=1,
+                          manifest=ExportManifest(project, out_dir, {"fmt": "PNG"}))
+    monkeypatch.setattr(export_engine, "write_output", real)
+    rendered.clear()
+    _run(items, out_dir, project)
+    assert "IMG_0.jpg" not in rendered and "IMG_4.jpg" in rendered
+
+
+def test_options_define_the_job(job):
+    items, out_dir, project, rendered = job
+    _run(items, out_dir, project)
+    rendered.clear()
+    _run(items, out_dir, project, {"fmt": "PNG", "workers": 8})        # same job
+    assert rendered == []
+    _run(items, out_dir, project, {"fmt": "JPEG", "quality": 80})      # new job
+    assert len(rendered) == 6
+    rendered.clear()
+    _run(items, out_dir, project, {"fmt": "PNG", "incremental": False})
+    assert len(rendered) == 6
+    with open(os.path.join(project, export_manifest.MANIFEST_NAME)) as f:
+        assert len(json.load(f)["jobs"]) == 2
+
+
+def test_sequence_names_follow_item_order(job):
+    items, out_dir, project, rendered = job
+    opts = {"fmt": "PNG", "naming_mode": "Custom Name + Sequence", "custom_text": "Set"}
+    _run(items, out_dir, project, opts)
+    rendered.clear()
+    _run(items[1:], out_dir, project, opts)         # every sequence number shifts
+    assert len(rendered) == 5
+
+
+def test_damaged_manifest_starts_fresh(job):
+    items, out_dir, project, rendered = job
+    os.makedirs(project)
+    with open(os.path.join(project, export_manifest.MANIFEST_NAME), "w") as f:
+        f.write("{not json")
+    _run(items, out_dir, project)
+    assert len(rendered) == 6
+    rendered.clear()
+    _run(items, out_dir, project)
+    assert rendered == []
+
+
+def test_settings_hash_handles_arrays():
+    a = dict(DEFAULTS, curve_lut=np.linspace(0, 1, 16, dtype=np.float32))
+    b = dict(a, curve_lut=a["curve_lut"].copy())
+    assert export_manifest.settings_hash(a) == export_manifest.settings_hash(b)
+    b["curve_lut"][3] = 0.0
+    assert export_manifest.settings_hash(a) != export_manifest.settings_hash(b)
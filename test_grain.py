@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+import fused_pipeline
+import grain
+import tile_engine
+from imaging import DEFAULTS, apply_film_grain, apply_preset_settings, is_edited, preset_settings
+
+
+@pytest.fixture(autouse=True)
+def grain_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(grain, "GRAIN_DIR", tmp_path)
+    grain.clear_cache()
+    yield tmp_path
+    grain.clear_cache()
+
+
+def _rgb(h, w, seed=0):
+    return np.random.default_rng(seed).random((h, w, 3)).astype(np.float32)
+
+
+def test_texture_cached_in_memory_and_on_disk(grain_dir):
+    a = grain.texture(0.5, 0.7)
+    assert a.shape == (grain.TEXTURE_SIZE, grain.TEXTURE_SIZE) and a.dtype == np.float32
+    assert grain.texture(0.5, 0.7) is a
+    assert len(list(grain_dir.glob("*.npy"))) == 1
+    grain.clear_cache()
+    loads = grain.stats["loads"]
+    assert np.array_equal(grain.texture(0.5, 0.7), a)
+    assert grain.stats["loads"] == loads + 1
+
+
+def test_grain_is_deterministic_per_seed():
+    rgb = _rgb(64, 96)
+    a = apply_film_grain(rgb, 0.5, 0.3, 0.5, seed=7)
+    assert np.array_equal(a, apply_film_grain(rgb, 0.5, 0.3, 0.5, seed=7))
+    assert not np.array_equal(a, apply_film_grain(rgb, 0.5, 0.3, 0.5, seed=8))
+
+
+def test_preview_is_a_decimated_view_of_export_grain():
+    tex = grain.texture(0.2, 0.5)
+    full = grain.sample(tex, 3, 0, 1200, 0, 1600, 1200, 1600)
+    preview = grain.sample(tex, 3, 0, 300, 0, 400, 300, 400)
+    assert np.array_equal(preview, full[::4, ::4])
+
+
+def test_region_matches_whole_frame():
+    rgb = _rgb(90, 120, seed=2)
+    whole = apply_film_grain(rgb, 0.6, 0.5, 0.5, seed=1)
+    part = apply_film_grain(rgb[20:70, 30:100], 0.6, 0.5, 0.5, seed=1, frame=(90, 120, 20, 30))
+    assert np.array_equal(part, whole[20:70, 30:100])
+
+
+def test_fused_grain_matches_reference_and_tiles():
+    adj = dict(DEFAULTS, grain_amount=0.4, grain_size=0.6, grain_roughness=0.8, grain_seed=11)
+    rgb = _rgb(150, 70, seed=5)
+    ref = np.clip(apply_film_grain(rgb, 0.4, 0.6, 0.8, seed=11), 0, 1)
+    fused = fused_pipeline.run(rgb, adj, tile_rows=16)
+    assert np.abs(fused - ref).max() < 1e-5
+    tiled = tile_engine.render(rgb, adj, workers=3, min_rows=16)
+    assert np.array_equal(tiled, fused)
+
+
+def test_seeded_unedited_image_still_decodes_as_proxy():
+    # main._needs_real_decode -> is_edited: seeding grain must not force a full decode
+    seeded = dict(DEFAULTS, grain_seed=grain.seed_for("/shoot/IMG_0001.CR3"))
+    assert not is_edited(seeded)
+    assert is_edited(dict(seeded, exposure=0.3))
+
+
+def test_presets_keep_each_images_grain_pattern():
+    source = dict(DEFAULTS, grain_amount=0.4, exposure=0.2, grain_seed=111, rotate=90)
+    preset = preset_settings(source)
+    assert "grain_seed" not in preset and "rotate" not in preset
+    target = dict(DEFAULTS, grain_seed=222, rotate=180)
+    applied = apply_preset_settings(target, preset)
+    assert applied["grain_seed"] == 222 and applied["rotate"] == 180 and applied["grain_amount"] == 0.4
+    # presets saved before the seed was stripped do not leak it either
+    assert apply_preset_settings(target, source)["grain_seed"] == 222
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from imaging import (DEFAULTS, apply_hsl_mixer, apply_hsl_mixer_reference,
+                     _rgb_to_hsv_flat, _hsv_to_rgb_flat)
+
+
+def _rgb(seed=0):
+    return np.random.default_rng(seed).random((80, 120, 3), dtype=np.float32)
+
+
+@pytest.mark.parametrize("overrides", [
+    {"h_red": 25.0},
+    {"s_blue": -0.6, "l_green": 0.4},
+    {"h_orange": -10.0, "s_yellow": 0.8, "l_purple": -0.3, "h_magenta": 30.0},
+])
+def test_matches_reference(overrides):
+    adj = dict(DEFAULTS, **overrides)
+    rgb = _rgb()
+    diff = np.abs(apply_hsl_mixer(rgb, adj) - apply_hsl_mixer_reference(rgb, adj))
+    assert diff.max() < 2e-3
+
+
+def test_neutral_settings_are_a_no_op():
+    rgb = _rgb(1)
+    assert apply_hsl_mixer(rgb, DEFAULTS) is rgb
+
+
+def test_hsv_round_trip():
+    rgb = _rgb(2)
+    rgb[0, :4] = [[0.5, 0.5, 0.5], [1, 0, 0], [0, 0, 0], [0.2, 0.2, 0.9]]  # grey, pure, black, ties
+    h, s, v = _rgb_to_hsv_flat(rgb)
+    assert np.abs(_hsv_to_rgb_flat(h, s, v) - rgb).max() < 1e-5
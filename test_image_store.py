@@ -0,0 +1,38 @@
+import numpy as np
+from image_store import ImageStore
+
+
+def _img(mb):
+    return np.zeros((mb, 1024, 1024), dtype=np.uint8)
+
+
+def test_evicts_least_recently_viewed():
+    evicted = []
+    store = ImageStore(budget_bytes=3 * 1024 * 1024, on_evict=evicted.append)
+    store.put("a", _img(1)); store.put("b", _img(1)); store.put("c", _img(1))
+    assert store.get("a", reload=False) is not None  # a becomes most recent
+    store.put("d", _img(1))
+
+    assert evicted == ["b"]
+    assert not store.contains("b")
+    assert store.resident_bytes == 3 * 1024 * 1024
+    st = store.stats()
+    assert st["evictions"] == 1 and st["hits"] == 1
+
+
+def test_most_recent_image_is_never_evicted():
+    store = ImageStore(budget_bytes=1024)
+    store.put("big", _img(2))
+    assert store.contains("big")
+    store.put("bigger", _img(3))
+    assert store.contains("bigger") and not store.contains("big")
+
+
+def test_admit_never_evicts():
+    evicted = []
+    store = ImageStore(budget_bytes=2 * 1024 * 1024, on_evict=evicted.append)
+    store.put("viewed", _img(1))
+    assert store.admit("neighbour", _img(1))
+    assert not store.admit("far", _img(1))
+    assert evicted == [] and not store.contains("far")
+    assert store.admit("viewed", _img(1))  # already resident
@@ -0,0 +1,93 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import export_engine
+import jpeg_size
+from imaging import DEFAULTS
+
+KW = {"quality": 92, "progressive": True, "optimize": True, "subsampling": "4:2:0"}
+
+
+def _photo(noise, h=1200, w=1800, seed=0):
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:h, 0:w]
+    base = 0.5 + 0.3 * np.sin(xx / 37.0) * np.cos(yy / 53.0) + 0.1 * ((xx // 90 + yy // 90) % 2)
+    img = base[..., None] * np.array([1.0, 0.8, 0.6]) + rng.normal(0, noise, (h, w, 3))
+    return (np.clip(img, 0, 1) * 255).astype(np.uint8)
+
+
+def _best_quality(arr, target):
+    img = Image.fromarray(arr)
+    for q in range(KW["quality"], 0, -1):
+        if len(jpeg_size.encode(img, q, KW)) <= target:
+            return q
+    return 0
+
+
+@pytest.mark.parametrize("noise,kb", [(0.02, 150), (0.02, 400), (0.08, 300), (0.08, 800)])
+def test_fits_with_one_full_encode(noise, kb):
+    arr = _photo(noise)
+    stats = {}
+    data = jpeg_size.fit(arr, kb * 1024, KW, stats)
+    assert len(data) <= kb * 1024
+    assert stats["encodes"] == 1 and stats["probes"] <= jpeg_size.MAX_PROBES
+    assert stats["resized"] is None
+    # close to the best quality an exhaustive search finds
+    assert stats["quality"] >= _best_quality(arr, kb * 1024) - 15
+    assert Image.open(io.BytesIO(data)).size == (1800, 1200)
+
+
+def test_generous_limit_keeps_requested_quality():
+    stats = {}
+    jpeg_size.fit(_photo(0.0), 5000 * 1024, KW, stats)
+    assert stats == {"encodes": 1, "probes": 1, "resized": None, "quality": 92}
+
+
+def test_resizes_when_lowest_quality_is_too_large():
+    stats = {}
+    data = jpeg_size.fit(_photo(0.15), 8 * 1024, KW, stats)
+    assert len(data) <= 8 * 1024
+    assert stats["resized"] is not None and stats["encodes"] == 1
+    w, h = Image.open(io.BytesIO(data)).size
+    assert (h, w) == tuple(stats["resized"]) and w < 1800
+
+
+def test_sample_covers_image():
+    arr = _photo(0.02, 2000, 3000)
+    mosaic, ratio = jpeg_size.sample(arr)
+    assert mosaic.shape[0] % jpeg_size.TILE == 0 and mosaic.shape[1] % jpeg_size.TILE == 0
+    assert ratio == pytest.approx(arr.shape[0] * arr.shape[1] / (mosaic.shape[0] * mosaic.shape[1]))
+    small = arr[:300, :400]
+    assert jpeg_size.sample(small)[0] is small
+
+
+def test_quality_scale_round_trip():
+    for q in (1, 10, 49, 50, 75, 99):
+        assert jpeg_size.quality_for_scale(jpeg_size.quality_scale(q)) == pytest.approx(q)
+
+
+def test_engine_writes_encoded_bytes(tmp_path, monkeypatch):
+    arr = _photo(0.08)
+    written = {}
+    real_fit = jpeg_size.fit
+
+    def fit(*a, **k):
+        written["data"] = real_fit(*a, **k)
+        return written["data"]
+    monkeypatch.setattr(jpeg_size, "fit", fit)
+    stats = {}
+    path = export_engine.write_output(arr, str(tmp_path / "out"), {"fmt": "JPEG", "limit_size_kb": 300}, stats)
+    with open(path, "rb") as f:
+        assert f.read() == written["data"]
+    assert stats["encodes"] >= 1 and "quality" in stats
+
+
+def test_engine_reports_encode_counts(tmp_path):
+    items = [{"name": f"/p/IMG_{i}.jpg", "settings": dict(DEFAULTS), "full": _photo(0.05, 300, 450, i)}
+             for i in range(3)]
+    res = export_engine.run(items, str(tmp_path), {"fmt": "JPEG", "limit_size_kb": 20}, workers=2)
+    per_item = [s["encodes"] for s in res["stats"]["items"]]
+    assert res["stats"]["encodes"] == sum(per_item) and per_item == [1, 1, 1]
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+import fused_pipeline
+import lut3d
+from imaging import DEFAULTS
+
+
+def _img8(h=120, w=90, seed=0):
+    return (np.random.default_rng(seed).random((h, w, 3)) * 255).astype(np.uint8)
+
+
+@pytest.mark.parametrize("fn", [lut3d.apply_tetrahedral, lut3d.apply_trilinear])
+def test_identity_lut_is_exact(fn):
+    rgb = np.random.default_rng(1).random((50, 40, 3), dtype=np.float32)
+    assert np.abs(fn(rgb, lut3d.identity(17)) - rgb).max() < 1e-5
+
+
+def test_baked_render_close_to_exact():
+    adj = dict(DEFAULTS, exposure=0.3, temperature=0.2, saturation=0.4, vibrance=0.3,
+               contrast=0.3, shadows=0.3, vignette=0.4)
+    src = _img8()
+    exact = fused_pipeline.run(src, adj, out_dtype=np.uint8).astype(int)
+    baked = fused_pipeline.run(src, adj, out_dtype=np.uint8,
+                               steps=lut3d.baked_plan(adj)).astype(int)
+    diff = np.abs(baked - exact)
+    assert diff.mean() < 0.5 and diff.max() <= 8
+
+
+def test_tables_cached_by_colour_settings():
+    lut3d.clear_cache()
+    adj = dict(DEFAULTS, saturation=0.2, clarity=0.3)
+    lut3d.baked_plan(adj)
+    bakes = lut3d.stats["bakes"]
+    lut3d.baked_plan(dict(adj, clarity=0.6, rotate=90))  # same colour chain
+    assert lut3d.stats["bakes"] == bakes
+    lut3d.baked_plan(dict(adj, saturation=0.25))
+    assert lut3d.stats["bakes"] == bakes + 1
+
+
+def test_cube_round_trip(tmp_path):
+    table = lut3d.cube_table(dict(DEFAULTS, contrast=0.2, h_red=15.0), size=9)
+    path = tmp_path / "look.cube"
+    lut3d.write_cube(str(path), table, title="look")
+    lines = path.read_text().splitlines()
+    assert "LUT_3D_SIZE 9" in lines
+    # Red varies fastest: the second entry is (r=1, g=0, b=0)
+    first = lines.index("DOMAIN_MAX 1.0 1.0 1.0") + 1
+    assert lines[first + 1] == " ".join(f"{v:.6f}" for v in np.clip(table[1, 0, 0], 0, 1))
+    assert np.abs(lut3d.read_cube(str(path)) - np.clip(table, 0, 1)).max() < 1e-5
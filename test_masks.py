@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+import masks
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    masks.clear_cache()
+    yield
+    masks.clear_cache()
+
+
+def _ogrid_r2(h, w):
+    # the field apply_vignette used to build on every call
+    y, x = np.ogrid[:h, :w]
+    cy, cx = (h - 1) / 2.0, (w - 1) / 2.0
+    dy = (y - cy) / max(cy, 1.0); dx = (x - cx) / max(cx, 1.0)
+    return dx * dx + dy * dy
+
+
+def test_radial_r2_matches_ogrid_and_is_cached():
+    r2 = masks.radial_r2(41, 60)
+    assert r2.dtype == np.float32 and not r2.flags.writeable
+    assert np.allclose(r2, _ogrid_r2(41, 60), atol=1e-6)
+    builds = masks.stats["builds"]
+    assert masks.radial_r2(41, 60) is r2
+    assert masks.stats["builds"] == builds
+
+
+def test_window_equals_slice_of_whole_field():
+    whole = masks.radial_r2(120, 90)
+    assert np.array_equal(masks.r2_window(120, 90, 10, 50, 5, 80), whole[10:50, 5:80])
+
+
+def test_large_frames_compute_the_window_only(monkeypatch):
+    monkeypatch.setattr(masks, "MAX_BYTES", 1024)
+    builds = masks.stats["builds"]
+    win = masks.r2_window(400, 300, 100, 110, 0, 300)
+    assert win.shape == (10, 300)
+    assert np.allclose(win, _ogrid_r2(400, 300)[100:110], atol=1e-6)
+    assert masks.stats["builds"] == builds
+
+
+def test_eviction_bounds():
+    for n in range(masks.MAX_ENTRIES + 3):
+        masks.radial_r2(10 + n, 10)
+    assert len(masks._cache) == masks.MAX_ENTRIES
+    assert masks._resident == sum(a.nbytes for a in masks._cache.values())
+
+
+def test_radial_mask_feather():
+    m = masks.radial_mask(101, 101, radius=0.8, feather=0.5)
+    assert m[50, 50] == 1.0 and m[0, 0] == 0.0
+    assert 0.0 < m[50, 85] < 1.0
+    assert masks.radial_mask(101, 101, radius=0.8, feather=0.5) is m
@@ -0,0 +1,145 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import export_engine
+import grain
+import ninlab
+from catalog import save_catalog
+from imaging import DEFAULTS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture
+def project(tmp_path):
+    """Project with three PNG sources: A (starred), B (unchecked), C"""
+    src = tmp_path / "shoot"; src.mkdir()
+    rng = np.random.default_rng(0)
+    names = []
+    for n in "ABC":
+        path = str(src / f"{n}.png")
+        Image.fromarray((rng.random((40, 60, 3)) * 255).astype(np.uint8)).save(path)
+        names.append(path)
+    proj = tmp_path / "proj"
+    catalog = {
+        names[0]: {"settings": dict(DEFAULTS, exposure=0.5), "star": True, "checked": True},
+        names[1]: {"settings": dict(DEFAULTS), "star": False, "checked": False},
+        names[2]: {"settings": dict(DEFAULTS, rotate=90), "star": False},
+        "__presets__": {"Warm": {"temperature": 0.4, "saturation": 0.2}},
+        "__ui__": {"preview_size": "1600"},
+    }
+    save_catalog(catalog, proj)
+    return {"proj": str(proj), "src": str(src), "names": names, "out": str(tmp_path / "out")}
+
+
+def _outs(p):
+    return sorted(os.listdir(p["out"]))
+
+
+def test_renders_catalog(project):
+    code = ninlab.main(["render", "--project", project["proj"], "--out", project["out"], "--workers", "2"])
+    assert code == ninlab.EXIT_OK
+    assert _outs(project) == ["A.jpg", "B.jpg", "C.jpg"]
+    # catalog settings applied (rotate=90 swaps the output size)
+    assert Image.open(os.path.join(project["out"], "C.jpg")).size == (40, 60)
+
+
+def test_filters(project):
+    assert ninlab.main(["render", "--project", project["proj"], "--out", project["out"], "--starred"]) == 0
+    assert _outs(project) == ["A.jpg"]
+    assert ninlab.main(["render", "--project", project["proj"], "--out", project["out"], "--checked",
+                        "--format", "png"]) == 0
+    assert "B.png" not in _outs(project) and {"A.png", "C.png"} <= set(_outs(project))
+
+
+def test_folder_with_preset(project):
+    code = ninlab.main(["render", project["src"], "--project", project["proj"], "--preset", "Warm",
+                        "--out", project["out"], "--name", "Warm", "--start", "5"])
+    assert code == 0
+    assert _outs(project) == ["Warm-005.jpg", "Warm-006.jpg", "Warm-007.jpg"]
+    items = ninlab.collect_items({"__presets__": {}}, [project["src"]], {"temperature": 0.4})
+    assert [it["settings"]["temperature"] for it in items] == [0.4] * 3
+    assert all(it["settings"]["grain_seed"] is not None for it in items)
+
+
+def test_preset_does_not_share_grain_pattern(project):
+    preset = dict(DEFAULTS, grain_amount=0.5, grain_seed=4242)      # saved by an older GUI
+    catalog = {project["names"][0]: {"settings": dict(DEFAULTS, grain_seed=7)}}
+    items = ninlab.collect_items(catalog, [project["src"]], preset)
+    seeds = [it["settings"]["grain_seed"] for it in items]
+    assert seeds[0] == 7 and 4242 not in seeds and len(set(seeds)) == 3
+    assert seeds[1] == grain.seed_for(project["names"][1])
+
+
+def test_preset_keeps_rotation_only(project):
+    catalog = {project["names"][0]: {"settings": dict(DEFAULTS, rotate=90, flip_h=True)}}
+    (it,) = ninlab.collect_items(catalog, [project["names"][0]], {"exposure": 1.0})
+    assert it["settings"]["rotate"] == 90 and it["settings"]["flip_h"] is False
+    (it,) = ninlab.collect_items(catalog, [project["names"][0]], {"exposure": 1.0}, keep_transforms=True)
+    assert it["settings"]["flip_h"] is True
+
+
+def test_json_stream_and_incremental_rerun(project, capsys):
+    args = ["render", "--project", project["proj"], "--out", project["out"], "--json", "--long-edge", "30"]
+    assert ninlab.main(args) == 0
+    events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert events[0] == {"event": "start", "total": 3, "workers": export_engine.default_workers(),
+                         "out_dir": os.path.abspath(project["out"])}
+    assert [e["done"] for e in events if e["event"] == "progress"] == [1, 2, 3]
+    assert events[-1]["event"] == "done" and events[-1]["written"] == 3 and len(events[-1]["outputs"]) == 3
+
+    assert ninlab.main(args) == 0
+    done = json.loads(capsys.readouterr().out.splitlines()[-1])
+    assert done["written"] == 0 and done["skipped"] == 3
+
+
+def test_default_workers_keep_the_memory_cap(monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 64)
+    args = ninlab.build_parser().parse_args(["render", "--out", "o"])
+    assert ninlab.export_options(args)["workers"] == export_engine.MAX_DEFAULT_WORKERS
+    args = ninlab.build_parser().parse_args(["render", "--out", "o", "--workers", "12"])
+    assert ninlab.export_options(args)["workers"] == 12
+
+
+def test_exit_codes(project, monkeypatch, capsys):
+    out = ["--out", project["out"]]
+    assert ninlab.main(["render", "--project", project["proj"], "--preset", "Nope"] + out) == ninlab.EXIT_USAGE
+    assert ninlab.main(["render", os.path.join(project["src"], "missing.png")] + out) == ninlab.EXIT_USAGE
+    assert ninlab.main(["render", "--bogus"]) == ninlab.EXIT_USAGE
+    empty = os.path.join(project["src"], "empty"); os.mkdir(empty)
+    assert ninlab.main(["render", empty, "--project", project["proj"]] + out) == ninlab.EXIT_NO_IMAGES
+
+    def fail(*a, **k):
+        raise OSError("disk full")
+    monkeypatch.setattr(export_engine, "write_output", fail)
+    assert ninlab.main(["render", "--project", project["proj"], "--json"] + out) == ninlab.EXIT_FAILED
+    last = json.loads(capsys.readouterr().out.splitlines()[-1])
+    assert last == {"event": "error", "message": "disk full"}
+
+
+def test_undecodable_source_fails(project):
+    bad = os.path.join(project["src"], "broken.jpg")
+    with open(bad, "wb") as f:
+        f.write(b"not a jpeg")
+    assert ninlab.main(["render", bad, "--project", project["proj"], "--out", project["out"]]) == ninlab.EXIT_FAILED
+
+
+def test_module_entry_point_without_qt(project):
+    code = ("import sys, runpy; sys.argv = ['ninlab'] + sys.argv[1:]; "
+            "rc = 0\n"
+            "try:\n    runpy.run_module('ninlab', run_name='__main__')\n"
+            "except SystemExit as e:\n    rc = e.code\n"
+            "assert not any(m.startswith('PySide6') for m in sys.modules), 'PySide6 imported'\n"
+            "sys.exit(rc)")
+    res = subprocess.run([sys.executable, "-c", code, "render", "--project", project["proj"], "--out",
+                          project["out"], "--json"], cwd=HERE, capture_output=True, text=True)
+    assert res.returncode == 0, res.stderr
+    assert json.loads(res.stdout.splitlines()[-1])["event"] == "done"
+    res = subprocess.run([sys.executable, "-m", "ninlab", "--help"], cwd=HERE, capture_output=True, text=True)
+    assert res.returncode == 0 and "render" in res.stdout
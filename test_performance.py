@@ -108,6 +108,111 @@ if peak_mb < 300:  # Should be reasonable for 12MP processing
 else:
     print(f"  ⚠ HIGH - Memory usage could be optimized further")
 
+# Test 7: HSL mixer, lookup tables vs. per-pixel reference
+print("\n[Test 7] HSL mixer performance (LUT vs reference)")
+from imaging import apply_hsl_mixer, apply_hsl_mixer_reference
+rgb = np.random.rand(2000, 3000, 3).astype(np.float32)
+adj = DEFAULTS.copy()
+adj.update({"h_red": 15.0, "s_blue": -0.4, "l_green": 0.2, "s_orange": 0.3})
+
+start = time.time()
+ref = apply_hsl_mixer_reference(rgb, adj)
+t_ref = time.time() - start
+start = time.time()
+result = apply_hsl_mixer(rgb, adj)
+t_lut = time.time() - start
+
+print(f"  Reference: {t_ref:.3f}s  LUT: {t_lut:.3f}s  ({t_ref / max(t_lut, 1e-9):.1f}x)")
+print(f"  Max difference: {np.abs(result - ref).max():.2e}")
+if t_lut < t_ref:
+    print(f"  ✓ PASS - LUT mixer is faster")
+else:
+    print(f"  ⚠ SLOW - Expected LUT mixer to beat the reference")
+
+# Test 8: Denoise quality ladder, cost vs. amount
+print("\n[Test 8] Denoise methods (cost at amount 0.2 / 1.0)")
+import denoise
+rgb = np.random.rand(2000, 3000, 3).astype(np.float32)
+for method in denoise.METHODS:
+    times = []
+    for amount in (0.2, 1.0):
+        start = time.time()
+        denoise.denoise(rgb, amount, method)
+        times.append(time.time() - start)
+    print(f"  {method:14s} {times[0]:.3f}s / {times[1]:.3f}s  (halo {denoise.halo(method, 1.0)} rows)")
+
+# Test 9: Stage cache, later-stage edit on a denoised image
+print("\n[Test 9] Stage cache (vignette edit after denoise)")
+from stage_cache import StageCache
+src = (np.random.rand(1000, 1500, 3) * 255).astype(np.uint8)
+adj = DEFAULTS.copy()
+adj.update({"denoise": 0.6, "vignette": 0.2})
+cache = StageCache()
+start = time.time()
+cache.render(src, adj, out_dtype=np.uint8)
+t_cold = time.time() - start
+adj["vignette"] = 0.4
+start = time.time()
+cache.render(src, adj, out_dtype=np.uint8)
+t_warm = time.time() - start
+print(f"  First render: {t_cold:.3f}s  After vignette edit: {t_warm:.3f}s")
+if t_warm < t_cold:
+    print(f"  ✓ PASS - Denoise reused from the stage cache")
+else:
+    print(f"  ⚠ SLOW - Expected the edit to skip denoise")
+
+# Test 10: Bytes per pixel per stage (float32 working precision)
+print("\n[Test 10] Peak bytes per pixel by stage (3 MP, float32 in)")
+import fused_pipeline
+import imaging
+import precision
+rgb = np.random.rand(1500, 2000, 3).astype(np.float32)
+stages = [
+    ("white_balance", lambda x: imaging.apply_white_balance(x, 0.2, -0.1)),
+    ("tone_regions", lambda x: imaging.apply_tone_regions(x, -0.3, 0.4, 0.1, -0.1)),
+    ("dehaze", lambda x: imaging.apply_dehaze(x, 0.3)),
+    ("denoise (bilateral)", lambda x: imaging.apply_denoise(x, 0.5)),
+    ("denoise (guided)", lambda x: denoise.denoise(x, 0.5, "guided")),
+    ("saturation_vibrance", lambda x: imaging.apply_saturation_vibrance(x, 0.2, 0.3)),
+    ("contrast_gamma", lambda x: imaging.apply_contrast_gamma(x, 0.2, 1.1)),
+    ("mid_contrast", lambda x: imaging.apply_mid_contrast(x, 0.3)),
+    ("clarity", lambda x: imaging.apply_clarity(x, 0.4)),
+    ("texture", lambda x: imaging.apply_texture(x, 0.4)),
+    ("hsl_mixer", lambda x: imaging.apply_hsl_mixer(x, dict(DEFAULTS, h_red=10.0))),
+    ("vignette", lambda x: imaging.apply_vignette(x, 0.5)),
+    ("defringe", lambda x: imaging.apply_defringe(x, 0.5)),
+    ("film_grain", lambda x: imaging.apply_film_grain(x, 0.3, 0.5, 0.5, seed=1)),
+    ("fused pipeline (u8 out)", lambda x: fused_pipeline.run(
+        x, dict(DEFAULTS, saturation=0.2, vignette=0.3), out_dtype=np.uint8)),
+]
+promoted = []
+for name, fn in stages:
+    out, bpp = precision.footprint(fn, rgb)
+    print(f"  {name:24s} {bpp:6.1f} B/px  -> {out.dtype}")
+    if out.dtype == np.float64:
+        promoted.append(name)
+if promoted:
+    print(f"  ⚠ float64 promotion in: {', '.join(promoted)}")
+else:
+    print(f"  ✓ PASS - No stage promotes to float64")
+
+# Test 11: Web export, resize before render vs full resolution
+print("\n[Test 11] 2048 px export of a 24 MP image (denoise + clarity + grain)")
+import render_scale
+src = (np.random.rand(4000, 6000, 3) * 255).astype(np.uint8)
+adj = dict(DEFAULTS, denoise=0.5, clarity=0.3, grain_amount=0.3, grain_seed=1)
+start = time.time()
+imaging.resize_long_edge(imaging.apply_transforms(imaging.process_image_fast(src, adj), adj), 2048)
+t_full = time.time() - start
+start = time.time()
+render_scale.render(src, adj, 2048)
+t_small = time.time() - start
+print(f"  Full resolution: {t_full:.3f}s  Resize first: {t_small:.3f}s  ({t_full / max(t_small, 1e-6):.1f}x)")
+if t_small < t_full:
+    print(f"  ✓ PASS - Resize-first export is faster")
+else:
+    print(f"  ⚠ SLOW - Expected resize-first to skip full-size work")
+
 print("\n" + "=" * 60)
 print("ALL TESTS COMPLETED")
 print("=" * 60)
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+import fused_pipeline
+import imaging
+import precision
+from imaging import DEFAULTS
+from stage_cache import StageCache
+
+# (stage, fn(rgb)) in reference-pipeline order, every stage switched on
+STAGES = [
+    ("white_balance", lambda x: imaging.apply_white_balance(x, 0.2, -0.1)),
+    ("tone_regions", lambda x: imaging.apply_tone_regions(x, -0.3, 0.4, 0.1, -0.1)),
+    ("dehaze", lambda x: imaging.apply_dehaze(x, 0.3)),
+    ("denoise", lambda x: imaging.apply_denoise(x, 0.5)),
+    ("saturation_vibrance", lambda x: imaging.apply_saturation_vibrance(x, 0.2, 0.3)),
+    ("contrast_gamma", lambda x: imaging.apply_contrast_gamma(x, 0.2, 1.1)),
+    ("tone_curve", lambda x: imaging.apply_tone_curve(x, 0.3)),
+    ("curve_lut", lambda x: imaging.apply_curve_lut(x, list(range(256)))),
+    ("mid_contrast", lambda x: imaging.apply_mid_contrast(x, 0.3)),
+    ("clarity", lambda x: imaging.apply_clarity(x, 0.4)),
+    ("texture", lambda x: imaging.apply_texture(x, 0.4)),
+    ("hsl_mixer", lambda x: imaging.apply_hsl_mixer(x, dict(DEFAULTS, h_red=10.0, s_blue=-0.3))),
+    ("vignette", lambda x: imaging.apply_vignette(x, 0.5)),
+    ("defringe", lambda x: imaging.apply_defringe(x, 0.5)),
+    ("film_grain", lambda x: imaging.apply_film_grain(x, 0.3, 0.5, 0.5, seed=1)),
+]
+
+
+@pytest.fixture
+def audit():
+    precision.set_audit(True)
+    yield
+    precision.set_audit(False)
+
+
+def _rgb(h=48, w=64):
+    return np.random.default_rng(0).random((h, w, 3)).astype(np.float32)
+
+
+@pytest.mark.parametrize("stage,fn", STAGES, ids=[s for s, _ in STAGES])
+def test_stages_stay_float32(stage, fn, audit):
+    precision.check(fn(_rgb()), stage)
+
+
+def test_audit_catches_promotion(audit):
+    with pytest.raises(precision.DtypeAuditError):
+        precision.check(_rgb().astype(np.float64), "promoting stage")
+    steps = [("full", fused_pipeline._full("leaky", lambda x: x * np.float64(1.0)), 0)]
+    with pytest.raises(precision.DtypeAuditError, match="leaky"):
+        fused_pipeline.run(_rgb(), DEFAULTS, steps=steps)
+
+
+def test_full_plan_passes_audit(audit):
+    adj = dict(DEFAULTS, denoise=0.5, clarity=0.3, texture=0.2, vignette=0.4, grain_amount=0.2)
+    assert fused_pipeline.run(_rgb(), adj).dtype == np.float32
+
+
+def test_float16_preview_checkpoints():
+    src = (_rgb(80, 60) * 255).astype(np.uint8)
+    adj = dict(DEFAULTS, denoise=0.6, vignette=0.3)
+    exact = StageCache(preview=True).render(src, adj, out_dtype=np.uint8)
+    precision.set_precision("float16")
+    try:
+        cache = StageCache(preview=True)
+        half = cache.render(src, adj, out_dtype=np.uint8)
+        assert all(x.dtype == np.float16 for x in cache._entries.values())
+        assert np.array_equal(cache.render(src, dict(adj), out_dtype=np.uint8), half)
+        export = StageCache()
+        export.render(src, adj, out_dtype=np.uint8)
+        assert all(x.dtype == np.float32 for x in export._entries.values())
+    finally:
+        precision.set_precision("float32")
+    assert np.abs(half.astype(int) - exact).max() <= 1
+
+
+def test_unknown_precision():
+    with pytest.raises(ValueError):
+        precision.set_precision("float8")
+
+
+def test_footprint_counts_temporaries():
+    rgb = _rgb(200, 200)
+    out, bpp = precision.footprint(lambda x: x.astype(np.float64) * 2.0, rgb)
+    assert out.dtype == np.float64 and bpp >= 24
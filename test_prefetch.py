@@ -0,0 +1,35 @@
+import numpy as np
+
+from imaging import DEFAULTS
+from pyramid import build_pyramid
+import prefetch
+
+
+def test_neighbours_nearest_first_in_filmstrip_order():
+    order = ["a", "b", "c", "d", "e", "f"]
+    assert prefetch.neighbour_names(order, "c", 2) == ["d", "b", "e", "a"]
+    assert prefetch.neighbour_names(order, "a", 2) == ["b", "c"]
+    assert prefetch.neighbour_names(order, "f", 1) == ["e"]
+    assert prefetch.neighbour_names(order, "zz", 2) == []
+
+
+def test_preview_base_from_pyramid():
+    full = np.random.default_rng(0).integers(0, 65535, (1200, 1800, 3), dtype=np.uint16)
+    base = prefetch.make_preview_base(full, build_pyramid(full), 400)
+    assert base.dtype == np.uint8
+    assert max(base.shape[:2]) == 400
+
+    small = np.zeros((100, 150, 3), dtype=np.uint8)
+    assert prefetch.make_preview_base(small, [], 400) is small
+
+
+def test_render_is_keyed_by_settings():
+    base = np.full((60, 90, 3), 128, dtype=np.uint8)
+    settings = dict(DEFAULTS)
+    out = prefetch.render_preview(base, settings, 0.0)
+    assert out.shape == base.shape and out.dtype == np.uint8
+
+    key = prefetch.render_key(settings, 900, 0.0)
+    assert key == prefetch.render_key(dict(settings), 900, 0.0)
+    assert key != prefetch.render_key(dict(settings, exposure=0.5), 900, 0.0)
+    assert key != prefetch.render_key(settings, 1200, 0.0)
@@ -0,0 +1,24 @@
+import numpy as np
+from pyramid import MIN_LEVEL_EDGE, build_pyramid, downsample2x, select_level
+
+
+def test_downsample2x_box_average():
+    arr = np.array([[[0], [4], [9]], [[8], [12], [9]], [[1], [1], [1]]], dtype=np.uint16)
+    out = downsample2x(arr)
+    assert out.shape == (1, 1, 1)
+    assert out.dtype == np.uint16
+    assert out[0, 0, 0] == 6
+
+
+def test_select_smallest_covering_level():
+    full = np.zeros((3000, 4000, 3), dtype=np.uint8)
+    levels = build_pyramid(full)
+    # halving stops before the long edge would drop under MIN_LEVEL_EDGE (256): no 250 px level
+    assert MIN_LEVEL_EDGE == 256
+    assert [l.shape for l in levels] == [(1500, 2000, 3), (750, 1000, 3), (375, 500, 3)]
+
+    assert select_level(full, levels, 1200) is levels[0]
+    assert select_level(full, levels, 900) is levels[1]
+    assert select_level(full, levels, 2400) is full
+    assert select_level(full, levels, None) is full
+    assert select_level(full, [], 500) is full
@@ -0,0 +1,150 @@
+import struct
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+import rawfile
+
+
+def _jpeg(w, h, color=(200, 40, 40)):
+    buf = BytesIO()
+    Image.new("RGB", (w, h), color).save(buf, "JPEG", quality=80)
+    return buf.getvalue()
+
+
+def _ifd(entries, next_ifd=0):
+    """Little-endian IFD from [(tag, type, count, value)] with inline values."""
+    out = struct.pack("<H", len(entries))
+    for tag, typ, count, value in sorted(entries):
+        fmt = "<HHIH2x" if typ == 3 else "<HHII"
+        out += struct.pack(fmt, tag, typ, count, value)
+    return out + struct.pack("<I", next_ifd)
+
+
+def _nef_like(small, large, orientation=6):
+    """TIFF RAW: IFD0 -> small preview + SubIFD -> large JpgFromRaw."""
+    ifd0_off = 8
+    ifd0_len = 2 + 4 * 12 + 4
+    sub_off = ifd0_off + ifd0_len
+    sub_len = 2 + 2 * 12 + 4
+    small_off = sub_off + sub_len
+    large_off = small_off + len(small)
+    ifd0 = _ifd([
+        (rawfile.TAG_ORIENTATION, 3, 1, orientation),
+        (rawfile.TAG_SUBIFDS, 4, 1, sub_off),
+        (rawfile.TAG_JPEG_OFFSET, 4, 1, small_off),
+        (rawfile.TAG_JPEG_LENGTH, 4, 1, len(small)),
+    ])
+    sub = _ifd([
+        (rawfile.TAG_JPEG_OFFSET, 4, 1, large_off),
+        (rawfile.TAG_JPEG_LENGTH, 4, 1, len(large)),
+    ])
+    return b"II*\x00" + struct.pack("<I", ifd0_off) + ifd0 + sub + small + large
+
+
+def test_tiff_previews_largest_first(tmp_path):
+    small, large = _jpeg(160, 120), _jpeg(640, 480)
+    path = tmp_path / "DSC_0001.NEF"
+    path.write_bytes(_nef_like(small, large))
+
+    previews = rawfile.find_previews(path.read_bytes())
+    assert [(p.width, p.height) for p in previews] == [(640, 480), (160, 120)]
+
+    data, orientation = rawfile.extract_preview(str(path))
+    assert data == large
+    assert orientation == 6
+
+    # Thumbnail use: the smallest preview that still covers the request
+    data, _ = rawfile.extract_preview(str(path), min_long_edge=150)
+    assert data == small
+
+
+def test_lossless_strip_is_not_a_preview():
+    # SOF3 (lossless JPEG) is raw sensor data, not something PIL can show
+    lossless = b"\xff\xd8\xff\xc3\x00\x0b\x08\x00\x10\x00\x10\x01\x01\x11\x00\xff\xd9"
+    assert rawfile.jpeg_dimensions(lossless) is None
+    assert rawfile.jpeg_dimensions(_jpeg(32, 16)) == (32, 16)
+
+
+def test_raf_header_preview():
+    jpg = _jpeg(300, 200)
+    header = bytearray(b"FUJIFILMCCD-RAW 0201FF383501".ljust(100, b"\x00"))
+    header[84:92] = struct.pack(">II", len(header), len(jpg))
+    previews = rawfile.find_previews(bytes(header) + jpg)
+    assert [(p.width, p.height) for p in previews] == [(300, 200)]
+
+
+def test_cr3_prvw_and_orientation():
+    jpg = _jpeg(400, 300)
+    cmt1 = b"II*\x00" + struct.pack("<I", 8) + _ifd([(rawfile.TAG_ORIENTATION, 3, 1, 8)])
+    ftyp = struct.pack(">I4s", 16, b"ftyp") + b"crx \x00\x00\x00\x01"
+    cmt_box = struct.pack(">I4s", 8 + len(cmt1), b"CMT1") + cmt1
+    prvw_box = struct.pack(">I4s", 8 + 16 + len(jpg), b"PRVW") + b"\x00" * 16 + jpg
+    buf = ftyp + cmt_box + prvw_box
+
+    previews = rawfile.find_previews(buf)
+    assert [(p.width, p.height) for p in previews] == [(400, 300)]
+    assert rawfile.read_orientation(buf) == 8
+
+
+def test_cr3_boxes_are_found_by_walking_the_box_tree():
+    jpg = _jpeg(400, 300)
+    cmt1 = b"II*\x00" + struct.pack("<I", 8) + _ifd([(rawfile.TAG_ORIENTATION, 3, 1, 6)])
+
+    def box(typ, payload):
+        return struct.pack(">I4s", 8 + len(payload), typ) + payload
+
+    ftyp = box(b"ftyp", b"crx \x00\x00\x00\x01")
+    # a PRVW-looking byte run ahead of the real boxes fools a plain byte search
+    decoy = box(b"free", struct.pack(">I4s", 24, b"PRVW") + b"\x00" * 16)
+    moov = box(b"moov", box(b"uuid", b"\x85" * 16 + box(b"CMT1", cmt1)))
+    prvw = box(b"uuid", b"\xea" * 16 + b"\x00" * 8 + box(b"PRVW", b"\x00" * 16 + jpg))
+    buf = ftyp + decoy + moov + prvw + box(b"mdat", b"\x00" * 64)
+
+    previews = rawfile.find_previews(buf)
+    assert [(p.width, p.height) for p in previews] == [(400, 300)]
+    assert rawfile.read_orientation(buf) == 6
+
+
+def test_garbage_has_no_previews():
+    assert rawfile.find_previews(b"II*\x00\xff\xff\xff\xff" + b"\x00" * 64) == []
+    assert rawfile.find_previews(np.zeros(256, dtype=np.uint8).tobytes()) == []
+
+
+def _exif_block():
+    from PIL import TiffImagePlugin
+    exif = Image.Exif()
+    exif[0x010F] = "NIKON CORPORATION"
+    exif[0x0110] = "NIKON Z 6"
+    exif[0x0112] = 8
+    sub = exif.get_ifd(0x8769)
+    sub[0x829A] = TiffImagePlugin.IFDRational(1, 250)
+    sub[0x829D] = TiffImagePlugin.IFDRational(28, 10)
+    sub[0x8827] = 800
+    sub[0x9003] = "2024:05:01 10:20:30"
+    sub[0xA434] = "NIKKOR Z 24-70mm f/4 S"
+    return exif
+
+
+def test_read_exif_from_tiff_structure():
+    data = _exif_block().tobytes()
+    if data.startswith(b"Exif\x00\x00"):
+        data = data[6:]
+    tags = rawfile.read_exif(data)
+    assert tags["Model"] == "NIKON Z 6"
+    assert tags["Orientation"] == 8
+    assert tags["ISO"] == 800
+    assert abs(tags["ExposureTime"] - 1 / 250) < 1e-9
+    assert abs(tags["FNumber"] - 2.8) < 1e-9
+    assert tags["LensModel"] == "NIKKOR Z 24-70mm f/4 S"
+    assert tags["DateTimeOriginal"] == "2024:05:01 10:20:30"
+
+
+def test_read_exif_from_jpeg_app1(tmp_path):
+    path = tmp_path / "photo.jpg"
+    Image.new("RGB", (64, 48)).save(path, "JPEG", exif=_exif_block())
+    tags = rawfile.read_exif_file(str(path))
+    assert tags["Make"] == "NIKON CORPORATION"
+    assert tags["Orientation"] == 8
+    assert rawfile.read_exif_file(str(tmp_path / "missing.NEF")) == {}
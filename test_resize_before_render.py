@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+import export_engine
+import render_scale
+from imaging import DEFAULTS, apply_transforms, process_image_fast, resize_long_edge
+
+
+@pytest.fixture(scope="module")
+def photo():
+    # smooth gradients and hard edges plus sensor-like noise
+    rng = np.random.default_rng(1)
+    h, w = 900, 1350
+    yy, xx = np.mgrid[0:h, 0:w]
+    base = 0.5 + 0.3 * np.sin(xx / 37.0) * np.cos(yy / 53.0) + 0.1 * ((xx // 90 + yy // 90) % 2)
+    img = base[..., None] * np.array([1.0, 0.8, 0.6]) + rng.normal(0, 0.06, (h, w, 3))
+    return (np.clip(img, 0, 1) * 255).astype(np.uint8)
+
+
+def _full_res(img, adj, long_edge):
+    return resize_long_edge(apply_transforms(process_image_fast(img, adj), adj), long_edge)
+
+
+def _diff(a, b):
+    assert a.shape == b.shape
+    return float(np.abs(a.astype(np.float32) - b.astype(np.float32)).mean())
+
+
+@pytest.mark.parametrize("extra", [
+    {},
+    {"exposure": 0.4, "saturation": 0.3, "vignette": 0.4},
+    {"denoise": 0.8},
+    {"clarity": 0.8, "texture": 0.6},
+    {"export_sharpen": 1.0},
+])
+def test_matches_full_resolution(photo, extra):
+    adj = dict(DEFAULTS, **extra)
+    ref = _full_res(photo, adj, 450)
+    assert _diff(render_scale.render(photo, adj, 450), ref) < 2.0
+
+
+@pytest.mark.parametrize("extra", [{"denoise": 0.8}, {"clarity": 0.8, "texture": 0.6}, {"export_sharpen": 1.0}])
+def test_scaled_parameters_beat_unscaled(photo, extra, monkeypatch):
+    adj = dict(DEFAULTS, **extra)
+    ref = _full_res(photo, adj, 450)
+    scaled = _diff(render_scale.render(photo, adj, 450), ref)
+    monkeypatch.setattr(render_scale, "scale_settings", lambda adj, s, edge: adj)
+    assert scaled < _diff(render_scale.render(photo, adj, 450), ref)
+
+
+def test_grain_strength_preserved(photo):
+    flat = np.full_like(photo, 128)
+    adj = dict(DEFAULTS, grain_amount=0.7, grain_size=0.3, grain_seed=5)
+    ref = _full_res(flat, adj, 450).astype(np.float32).std()
+    out = render_scale.render(flat, adj, 450).astype(np.float32).std()
+    assert ref > 0.5
+    assert abs(out - ref) / ref < 0.35
+
+
+def test_crop_and_rotation_give_full_res_size(photo):
+    adj = dict(DEFAULTS, angle=3.0, rotate=90, crop={"x": 0.1, "y": 0.2, "w": 0.5, "h": 0.6})
+    ref = _full_res(photo, adj, 300)
+    out = render_scale.render(photo, adj, 300)
+    assert out.shape == ref.shape
+    assert _diff(out, ref) < 6.0
+
+
+def test_uses_pyramid_level(photo):
+    from pyramid import build_pyramid
+    levels = build_pyramid(photo, min_edge=64)
+    small = render_scale.downsample_source(photo, levels, 0.3)
+    assert small.shape[:2] == (270, 405)
+
+
+def test_no_gain_renders_full_size():
+    assert render_scale.scale_for(1000, 1500, DEFAULTS, 1400) == 1.0
+    assert render_scale.scale_for(1000, 1500, DEFAULTS, 600) < 1.0
+    assert render_scale.scale_for(1000, 1500, DEFAULTS, None) == 1.0
+
+
+def test_web_sizes_default_to_resize_first():
+    assert export_engine.render_mode({"long_edge": 2048}) == "resize_first"
+    assert export_engine.render_mode({"long_edge": 3840}) == "full"
+    assert export_engine.render_mode({"long_edge": None}) == "full"
+    assert export_engine.render_mode({"long_edge": 1200, "render_mode": "full"}) == "full"
@@ -0,0 +1,72 @@
+import numpy as np
+
+import stage_cache
+import tile_engine
+from imaging import DEFAULTS
+from stage_cache import StageCache
+
+
+def _img8(h=120, w=90, seed=0):
+    return (np.random.default_rng(seed).random((h, w, 3)) * 255).astype(np.uint8)
+
+
+def _counting(monkeypatch):
+    calls = []
+    import denoise
+    real = denoise.denoise
+
+    def counted(*a, **k):
+        calls.append(1)
+        return real(*a, **k)
+    monkeypatch.setattr(denoise, "denoise", counted)
+    return calls
+
+
+def test_every_setting_belongs_to_a_stage():
+    declared = {k for _, keys in stage_cache.STAGES for k in keys}
+    assert set(DEFAULTS) - declared <= set(stage_cache.IGNORED_KEYS)
+
+
+def test_cached_render_matches_plain_render():
+    cache = StageCache()
+    src = _img8()
+    adj = dict(DEFAULTS, denoise=0.7, clarity=0.4, texture=0.3, vignette=0.5, saturation=0.2)
+    want = tile_engine.render(src, adj, out_dtype=np.uint8)
+    assert np.array_equal(cache.render(src, adj, out_dtype=np.uint8), want)
+    assert np.array_equal(cache.render(src, adj, out_dtype=np.uint8), want)
+    assert cache.hits == 1 and cache.misses == 1
+
+
+def test_later_edits_skip_denoise(monkeypatch):
+    calls = _counting(monkeypatch)
+    cache = StageCache()
+    src = _img8(seed=1)
+    adj = dict(DEFAULTS, denoise=0.8, vignette=0.2)
+    cache.render(src, adj)
+    for v in (0.3, 0.4, 0.5):
+        adj2 = dict(adj, vignette=v, saturation=v)
+        out = cache.render(src, adj2)
+        assert np.allclose(out, tile_engine.render(src, dict(adj2, denoise=0.8)), atol=0)
+    assert len(calls) == 1 + 3   # first render + the three reference renders
+
+
+def test_earlier_edits_and_new_pixels_invalidate(monkeypatch):
+    calls = _counting(monkeypatch)
+    cache = StageCache()
+    src = _img8(seed=2)
+    adj = dict(DEFAULTS, denoise=0.5)
+    cache.render(src, adj)
+    cache.render(src, dict(adj, exposure=0.3))
+    src2 = src.copy(); src2[0, 0] ^= 1
+    cache.render(src2, adj)
+    assert len(calls) == 3
+
+
+def test_budget_evicts_oldest():
+    src = _img8(64, 64)
+    one = 64 * 64 * 3 * 4
+    cache = StageCache(budget_bytes=2 * one)
+    for i in range(4):
+        cache.render(src, dict(DEFAULTS, denoise=0.1 * (i + 1)))
+    assert cache.resident_bytes() <= 2 * one
+    assert len(cache._entries) == 2
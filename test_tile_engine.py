@@ -0,0 +1,46 @@
+import numpy as np
+
+import fused_pipeline
+import tile_engine
+from imaging import DEFAULTS
+
+
+def _img8(h, w, seed=0):
+    return (np.random.default_rng(seed).random((h, w, 3)) * 255).astype(np.uint8)
+
+
+def test_strips_cover_frame_with_room_for_halo():
+    parts = tile_engine.strips(1000, 4, halo=5, min_rows=16)
+    assert parts[0][0] == 0 and parts[-1][1] == 1000
+    assert all(a[1] == b[0] for a, b in zip(parts, parts[1:]))
+    assert all(r1 - r0 >= 20 for r0, r1 in parts[:-1])
+
+
+def test_threaded_render_is_seamless():
+    # Neighbourhood stages (denoise, clarity, texture) straddle the strip seams
+    adj = dict(DEFAULTS, denoise=0.8, clarity=0.5, texture=0.4, saturation=0.3, vignette=0.5)
+    src = _img8(301, 157)
+    single = fused_pipeline.run(src, adj, out_dtype=np.uint8)
+    tiled = tile_engine.render(src, adj, out_dtype=np.uint8, workers=4, min_rows=16)
+    assert np.array_equal(single, tiled)
+
+
+def test_region_keeps_vignette_in_frame_coordinates():
+    adj = dict(DEFAULTS, vignette=0.7, exposure=0.2)
+    src = _img8(120, 160, seed=3)
+    whole = tile_engine.render(src, adj, out_dtype=np.uint8, workers=2, min_rows=16)
+    patch = tile_engine.render(src[30:90, 50:130], adj, out_dtype=np.uint8, workers=2,
+                               frame=(120, 160, 30, 50), min_rows=16)
+    assert np.array_equal(patch, whole[30:90, 50:130])
+
+
+def test_changing_workers_keeps_pool_of_renders_in_flight():
+    # A render on another thread may hold the old pool while Low Spec Mode is toggled
+    before = tile_engine.get_workers()
+    pool = tile_engine._get_executor()
+    try:
+        tile_engine.set_workers(before + 1)
+        assert pool.submit(lambda: 7).result() == 7
+        assert tile_engine._get_executor() is not pool
+    finally:
+        tile_engine.set_workers(before)
@@ -0,0 +1,114 @@
+"""
+Tile Engine
+
+Multi-threaded rendering on top of fused_pipeline. The frame is cut into
+horizontal strips; each strip is rendered with enough extra rows around it
+(the halo) for every neighbourhood stage in the plan: 1 row each for
+clarity and texture, and whatever the selected denoise method reads
+(denoise.halo). The halo rows are thrown away afterwards, so the stitched result
+is identical to a single-threaded render.
+
+Strips run on a shared ThreadPoolExecutor. NumPy ufuncs and most SciPy
+filters release the GIL on large arrays, so the strips really run in
+parallel. A stage that needs the whole frame (halo None in the plan)
+would run once on the stitched image after the parallel part.
+
+The worker count follows Low Spec Mode (see MainWindow.toggle_low_spec_mode).
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import fused_pipeline
+
+# Strips are never thinner than this, so halo overhead stays small
+MIN_STRIP_ROWS = 64
+# Strips per worker: a little oversubscription evens out uneven strips
+STRIPS_PER_WORKER = 2
+
+_workers = os.cpu_count() or 1
+_executor = None
+_lock = threading.Lock()
+
+
+def get_workers():
+    return _workers
+
+
+def set_workers(n=None):
+    """Threads used per render (None: all CPUs). Takes effect for the next render."""
+    global _workers, _executor
+    n = max(1, int(n or os.cpu_count() or 1))
+    with _lock:
+        if n != _workers:
+            # Not shut down: a render on another thread may still be submitting
+            # to the old pool. Its idle threads exit once it is garbage-collected.
+            _executor = None
+        _workers = n
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_workers, thread_name_prefix="tile")
+        return _executor
+
+
+def strips(height, workers, halo=0, min_rows=MIN_STRIP_ROWS):
+    """[(r0, r1)] covering ``height`` rows, about STRIPS_PER_WORKER per worker"""
+    count = max(1, int(workers) * STRIPS_PER_WORKER)
+    rows = max(int(min_rows), 4 * int(halo), -(-height // count))
+    rows += rows % 2    # even starts keep 2x2 blocks (denoise.guided) aligned
+    return [(r0, min(height, r0 + rows)) for r0 in range(0, height, rows)]
+
+
+def split_plan(steps):
+    """(tileable head, whole-frame tail, halo rows the head needs)"""
+    cut = next((i for i, step in enumerate(steps) if step[2] is None), len(steps))
+    head, tail = steps[:cut], steps[cut:]
+    return head, tail, sum(step[2] for step in head)
+
+
+def render(src, adj, fast_mode=False, out_dtype=np.float32, workers=None, frame=None,
+           min_rows=MIN_STRIP_ROWS, lut_size=None, denoise_method=None, steps=None):
+    """
+    fused_pipeline.run() spread over ``workers`` threads (default: the
+    engine setting). ``frame`` is (frame_h, frame_w, y0, x0) when ``src``
+    is a crop of a larger image, e.g. the visible patch at 1:1 zoom.
+    ``lut_size`` replaces the colour/tone stages with baked 3D LUTs (lut3d.py).
+    ``denoise_method`` picks the denoise algorithm (denoise.py).
+    ``steps`` renders part of a plan instead (see stage_cache.py).
+    """
+    h, w = src.shape[:2]
+    frame = frame or (h, w, 0, 0)
+    workers = int(workers or _workers)
+    if steps is None and lut_size:
+        import lut3d
+        steps = lut3d.baked_plan(adj, fast_mode, lut_size, denoise_method=denoise_method)
+    elif steps is None:
+        steps = fused_pipeline.plan(adj, fast_mode, denoise_method)
+    head, tail, halo = split_plan(steps)
+    parts = strips(h, workers, halo, min_rows)
+    if workers <= 1 or len(parts) <= 1:
+        return fused_pipeline.run(src, adj, fast_mode, out_dtype, steps=steps, frame=frame)
+
+    fh, fw, fy, fx = frame
+    head_dtype = np.float32 if tail else out_dtype
+    out = np.empty((h, w, 3), dtype=head_dtype)
+
+    def job(r0, r1):
+        lo, hi = max(0, r0 - halo), min(h, r1 + halo)
+        res = fused_pipeline.run(src[lo:hi], adj, fast_mode, head_dtype, steps=head,
+                                 frame=(fh, fw, fy + lo, fx))
+        out[r0:r1] = res[r0 - lo:r1 - lo]
+
+    pool = _get_executor()
+    for f in [pool.submit(job, r0, r1) for r0, r1 in parts]:
+        f.result()
+    if tail:
+        return fused_pipeline.run_steps(out, tail, out_dtype, frame=frame)
+    return out
@@ -1,23 +1,39 @@
 import os
+import threading
 import numpy as np
 from PIL import Image
 from PySide6.QtCore import QObject, Signal, QRunnable, QMutex
-from imaging import decode_image, pipeline, apply_transforms, preview_sharpen, process_image_fast
+from imaging import decode_image, decode_proxy, load_thumbnail, pipeline, apply_transforms, preview_sharpen, process_image_fast, resize_long_edge
+import export_engine
+from pyramid import select_level
+from prefetch import make_preview_base, render_preview
+from lut3d import PREVIEW_LUT_SIZE
+from denoise import PREVIEW_METHOD
+from stage_cache import preview_cache
 
 class DecodeSignals(QObject):
     done=Signal(dict); error=Signal(str)
 
 class DecodeWorker(QRunnable):
-    def __init__(self, path, thumb_w=72, thumb_h=48):
+    def __init__(self, path, thumb_w=72, thumb_h=48, proxy=False, pool=None):
         super().__init__()
         self.path=path; self.thumb_w=thumb_w; self.thumb_h=thumb_h
+        self.proxy=proxy  # allow the embedded-JPEG proxy instead of a demosaic
+        self.pool=pool    # optional decode_pool.DecodePool: decode in a worker process
         self.signals=DecodeSignals()
         # Prevent the QRunnable from being auto-deleted before signals are emitted
         # self.setAutoDelete(False)
     def run(self):
         try:
-            full, thumb = decode_image(self.path, (self.thumb_w, self.thumb_h))
-            self.signals.done.emit({"name":self.path,"full":full,"thumb":thumb})
+            if self.pool is not None:
+                # This thread only waits; pixels come back through the disk cache
+                full, thumb, levels, is_proxy = self.pool.decode(self.path, (self.thumb_w, self.thumb_h), self.proxy)
+            elif self.proxy:
+                full, thumb, levels, is_proxy = decode_proxy(self.path, (self.thumb_w, self.thumb_h))
+            else:
+                full, thumb, levels = decode_image(self.path, (self.thumb_w, self.thumb_h), return_levels=True)
+                is_proxy = False
+            self.signals.done.emit({"name":self.path,"full":full,"thumb":thumb,"pyramid":levels,"proxy":is_proxy})
         except Exception as e:
             import traceback
             error_details = traceback.format_exc()
@@ -27,6 +43,49 @@ class DecodeWorker(QRunnable):
             print(f"   Traceback:\n{error_details}")
             self.signals.error.emit(f"Decode error: {self.path}\n{e}")
 
+class ThumbWorker(QRunnable):
+    """Phase one of ingest: thumbnail only (cache / embedded JPEG), no demosaic"""
+    def __init__(self, path, thumb_w=256, thumb_h=170, pool=None):
+        super().__init__()
+        self.path=path; self.thumb_w=thumb_w; self.thumb_h=thumb_h
+        self.pool=pool
+        self.signals=DecodeSignals()
+    def run(self):
+        try:
+            if self.pool is not None:
+                thumb = self.pool.thumbnail(self.path, (self.thumb_w, self.thumb_h))
+            else:
+                thumb = load_thumbnail(self.path, (self.thumb_w, self.thumb_h))
+            self.signals.done.emit({"name":self.path,"thumb":thumb})
+        except Exception as e:
+            print(f"❌ Thumbnail failed: {self.path}: {e}")
+            self.signals.error.emit(f"Thumbnail error: {self.path}\n{e}")
+
+class PrefetchWorker(QRunnable):
+    """Neighbour prefetch (see prefetch.py): map in, build preview base, render"""
+    def __init__(self, path, loader, settings, use_edge, sharpen_amt, base=None, render=True):
+        super().__init__()
+        self.path=path; self.loader=loader  # loader(name) -> (full, levels) or None
+        self.settings=dict(settings); self.use_edge=use_edge; self.sharpen_amt=sharpen_amt
+        self.base=base      # already cached preview base, if any
+        self.render=render  # False in split view: only the base is reusable
+        self.signals=DecodeSignals()
+    def run(self):
+        try:
+            loaded = self.loader(self.path)
+            if loaded is None:
+                # Never decoded: the window queues a real decode instead
+                self.signals.done.emit({"name":self.path,"full":None})
+                return
+            full, levels = loaded
+            base = self.base if self.base is not None else make_preview_base(full, levels, self.use_edge)
+            out = render_preview(base, self.settings, self.sharpen_amt) if self.render else None
+            self.signals.done.emit({"name":self.path,"full":full,"pyramid":levels,"base":base,"render":out,
+                                    "settings":self.settings,"use_edge":self.use_edge,"sharpen":self.sharpen_amt})
+        except Exception as e:
+            print(f"⚠️  Prefetch failed: {self.path}: {e}")
+            self.signals.error.emit(f"Prefetch error: {self.path}\n{e}")
+
 class PreviewSignals(QObject):
     ready=Signal(np.ndarray)
 
@@ -34,9 +93,10 @@ class PreviewWorker(QRunnable):
     _mutex = QMutex()
     _latest_id = 0
 
-    def __init__(self, full_rgb, adj, long_edge, sharpen_amt, mode, req_id, live=False, base_override=None, is_zoomed=False, zoom_point=None, preview_size=None, processed_cache=None, low_spec=False, **kwargs):
+    def __init__(self, full_rgb, adj, long_edge, sharpen_amt, mode, req_id, live=False, base_override=None, is_zoomed=False, zoom_point=None, preview_size=None, processed_cache=None, low_spec=False, levels=None, **kwargs):
         super().__init__()
         self.full_rgb=full_rgb
+        self.levels = levels or []  # image pyramid of full_rgb (see pyramid.py)
         self.adj=adj
         self.long_edge=long_edge
         self.sharpen_amt=sharpen_amt
@@ -63,6 +123,10 @@ class PreviewWorker(QRunnable):
     def is_stale(cls, rid):
         cls._mutex.lock(); stale = rid < cls._latest_id; cls._mutex.unlock(); return stale
 
+    def _lut_size(self):
+        """Baked 3D LUTs while a slider is dragged; exact render once it settles"""
+        return PREVIEW_LUT_SIZE if self.live else None
+
     def _resize_long(self, arr, long_edge, use_fast=False):
         """Resize image maintaining aspect ratio
         use_fast: Use NEAREST resampling (faster) instead of LANCZOS (better quality)
@@ -89,14 +153,8 @@ class PreviewWorker(QRunnable):
                  if step < 1: step = 1
                  return arr[::step, ::step].copy()
             
-             # High quality 16-bit resize: Process per channel using PIL "I;16"
-             chans = []
-             for c in range(3):
-                 im = Image.fromarray(arr[..., c], mode="I;16")
-                 im = im.resize((nw, nh), Image.LANCZOS)
-                 chans.append(np.array(im, dtype=np.uint16))
-             
-             return np.dstack(chans)
+             # High quality 16-bit resize: per channel in PIL float mode
+             return resize_long_edge(arr, long_edge)
 
         # Use faster resampling for live preview, higher quality for final
         resample = Image.BILINEAR if use_fast else Image.LANCZOS
@@ -149,9 +207,9 @@ class PreviewWorker(QRunnable):
                 raw_patch = transformed_raw[y0:y0+crop_h, x0:x0+crop_w].copy()
                 
                 # 3. Process the Patch
-                # Disable vignette for patch processing to avoid mini-vignette
-                patch_adj = self.adj.copy()
-                patch_adj["vignette"] = 0.0
+                # The patch's place in the frame keeps the vignette where it
+                # belongs instead of drawing a mini-vignette around the patch
+                region = (h_full, w_full, y0, x0)
                 
                 # Process color/effects on the small patch (Fast!)
                 # Enable fast mode if live dragging OR panning
@@ -162,7 +220,8 @@ class PreviewWorker(QRunnable):
                 if self.long_edge >= 900 and not self.low_spec:
                     is_fast = False
 
-                out = process_image_fast(raw_patch, patch_adj, fast_mode=is_fast)
+                out = process_image_fast(raw_patch, self.adj, fast_mode=is_fast, region=region,
+                                         lut_size=self._lut_size(), denoise_method=PREVIEW_METHOD)
                 
                 # Apply preview sharpening
                 out = preview_sharpen(out, self.sharpen_amt)
@@ -183,10 +242,13 @@ class PreviewWorker(QRunnable):
                     target_long_edge = 240  # Fast Mode: super small for speed
                 # Normal live mode: keep full quality, just use fast_mode for processing
                 
-                # Use fast resize during live preview, quality resize otherwise
-                base = self.base_override if self.base_override is not None else self._resize_long(\
-                    self.full_rgb, target_long_edge, use_fast=self.live
-                )
+                # Use fast resize during live preview, quality resize otherwise.
+                # Start from the smallest pyramid level that covers the target.
+                if self.base_override is not None:
+                    base = self.base_override
+                else:
+                    src = select_level(self.full_rgb, self.levels, target_long_edge)
+                    base = self._resize_long(src, target_long_edge, use_fast=self.live)
 
             if self.mode == "split":
                 # copy to keep base intact
@@ -202,7 +264,8 @@ class PreviewWorker(QRunnable):
                 if self.long_edge >= 900 and not self.low_spec:
                     is_fast = False
                     
-                a = process_image_fast(base_local, self.adj, fast_mode=is_fast)
+                a = process_image_fast(base_local, self.adj, fast_mode=is_fast, lut_size=self._lut_size(),
+                                       denoise_method=PREVIEW_METHOD, stage_cache=preview_cache)
                 a = apply_transforms(a, self.adj)
 
                 if not self.live:
@@ -235,7 +298,8 @@ class PreviewWorker(QRunnable):
             if self.long_edge >= 900 and not self.low_spec:
                 is_fast = False
 
-            out = process_image_fast(base, self.adj, fast_mode=is_fast)
+            out = process_image_fast(base, self.adj, fast_mode=is_fast, lut_size=self._lut_size(),
+                                       denoise_method=PREVIEW_METHOD, stage_cache=preview_cache)
             out = apply_transforms(out, self.adj)
             
             # Apply sharpening in live mode too
@@ -253,109 +317,33 @@ class PreviewWorker(QRunnable):
             print(f"❌ PreviewWorker failed: {e}")
 
 class ExportSignals(QObject):
-    progress=Signal(int,int); done=Signal(str); error=Signal(str)
+    progress=Signal(int,int); done=Signal(str); error=Signal(str); cancelled=Signal(str)
 
 class ExportWorker(QRunnable):
-    def __init__(self, items, out_dir, opts):
+    """Runs an export_engine job off the GUI thread and reports through ExportSignals"""
+    def __init__(self, items, out_dir, opts, loader=None, manifest=None):
         super().__init__()
         self.items=items; self.out_dir=out_dir; self.opts=opts
+        self.loader = loader  # name -> (full, levels) or None, e.g. ImageStore.load
+        self.manifest = manifest  # export_manifest.ExportManifest: skip unchanged, resume
         self.signals=ExportSignals()
-        # Prevent the QRunnable from being auto-deleted before signals are emitted
+        self._cancel = threading.Event()
+        self.result = None
         # Prevent the QRunnable from being auto-deleted before signals are emitted
         # self.setAutoDelete(False)
 
-    def _resize_long_edge(self, arr, long_edge):
-        if not long_edge or long_edge<=0: return arr
-        from PIL import Image
-        h,w,_=arr.shape; cur=max(h,w)
-        if cur<=long_edge: return arr
-        s=long_edge/float(cur); nw,nh=int(w*s),int(h*s)
-        return np.array(Image.fromarray(arr).resize((nw,nh), Image.LANCZOS), dtype=np.uint8)
+    def cancel(self):
+        self._cancel.set()
 
     def run(self):
         try:
-            total=len(self.items)
-            from PIL import Image
-            fmt=self.opts.get("fmt","JPEG").upper()
-            quality=int(self.opts.get("quality",92))
-            progressive=bool(self.opts.get("progressive",True))
-            optimize=bool(self.opts.get("optimize",True))
-            long_edge=self.opts.get("long_edge",None)
-            naming_mode = self.opts.get("naming_mode", "Original Name")
-            custom_text = self.opts.get("custom_text", "Photo")
-            start_num = int(self.opts.get("start_num", 1))
-            limit_size_kb = int(self.opts.get("limit_size_kb", 0))
-            
-            for i,it in enumerate(self.items, start=1):
-                # full01=it["full"].astype(np.float32)/255.0
-                # out01=pipeline(full01, it["settings"])
-                # out=(np.clip(out01,0,1)*255.0 + 0.5).astype(np.uint8)
-                out = process_image_fast(it["full"], it["settings"])
-                out=apply_transforms(out, it["settings"])
-                out=self._resize_long_edge(out, long_edge)
-                
-                # Determine filename
-                if naming_mode == "Custom Name + Sequence":
-                    # Use sequence number: start_num + current index (0-based)
-                    seq = start_num + (i - 1)
-                    filename = f"{custom_text}-{seq:03d}"
-                else:
-                    # Original Name mode - use original filename without suffix
-                    base=os.path.splitext(os.path.basename(it["name"]))[0]
-                    filename = base
-                
-                out_path = os.path.join(self.out_dir, filename)
-                
-                if fmt=="PNG":
-                    Image.fromarray(out).save(f"{out_path}.png","PNG",compress_level=6,optimize=True)
-                else:
-                    # JPEG with optional size limit
-                    save_kwargs = {
-                        "quality": max(1,min(100,quality)),
-                        "progressive": progressive,
-                        "optimize": optimize,
-                        "subsampling": "4:2:0"
-                    }
-                    
-                    if limit_size_kb > 0:
-                        # Try to fit within limit
-                        target_bytes = limit_size_kb * 1024
-                        img_pil = Image.fromarray(out)
-                        
-                        # Binary search for quality if needed, or just iterative
-                        # Simple approach: Try current quality, if too big, reduce.
-                        
-                        import io
-                        buf = io.BytesIO()
-                        img_pil.save(buf, "JPEG", **save_kwargs)
-                        size = buf.tell()
-                        
-                        if size > target_bytes:
-                            # Reduce quality
-                            q_min, q_max = 1, quality
-                            best_q = 1
-                            
-                            # Binary search
-                            while q_min <= q_max:
-                                q_mid = (q_min + q_max) // 2
-                                buf.seek(0); buf.truncate(0)
-                                save_kwargs["quality"] = q_mid
-                                img_pil.save(buf, "JPEG", **save_kwargs)
-                                size = buf.tell()
-                                
-                                if size <= target_bytes:
-                                    best_q = q_mid
-                                    q_min = q_mid + 1
-                                else:
-                                    q_max = q_mid - 1
-                            
-                            # Save with best quality found
-                            save_kwargs["quality"] = best_q
-                            # If best_q is 1 and still too big, we just save it (can't do much more without resize)
-                    
-                    Image.fromarray(out).save(f"{out_path}.jpg","JPEG", **save_kwargs)
-                self.signals.progress.emit(i,total)
-            self.signals.done.emit(self.out_dir)
+            self.result = export_engine.run(self.items, self.out_dir, self.opts, loader=self.loader,
+                                            progress=self.signals.progress.emit, cancel=self._cancel,
+                                            manifest=self.manifest)
+            if self.result["cancelled"]:
+                self.signals.cancelled.emit(self.out_dir)
+            else:
+                self.signals.done.emit(self.out_dir)
         except Exception as e:
             self.signals.error.emit(str(e))
 